@@ -0,0 +1,124 @@
+# Import necessary modules
+import collections
+
+import crptr.base_functions as base_functions
+
+# =============================================================================
+
+class AhoCorasick():
+  """Aho-Corasick automaton which finds all occurrences of a set of key
+     strings in a string in a single scan, in time linear in the length of the
+     string plus the number of matches, however many keys there are.
+
+     The automaton is a trie of the keys with a failure link for every state
+     (to the state of the longest proper suffix of its string that is also a
+     prefix of a key), and for every state the lengths of the keys which end
+     in it (including those reached through failure links).
+
+     The automaton is a plain object, it can therefore be pickled (for example
+     as part of a corruptor sent to worker processes).
+  """
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, key_list):
+    """Constructor, build the automaton for the given list of (non-empty)
+       key strings.
+    """
+
+    base_functions.check_is_list('key_list', key_list)
+
+    # State 0 is the root, each state has a dictionary of transitions to
+    # other states, a failure link, and a list of the lengths of the keys
+    # ending in it
+    #
+    self.goto_list = [{}]
+    self.fail_list = [0]
+    self.out_list =  [[]]
+
+    for key in key_list:
+      base_functions.check_is_non_empty_string('key', key)
+
+      state = 0
+      for char in key:
+        next_state = self.goto_list[state].get(char)
+        if (next_state == None):
+          next_state = len(self.goto_list)
+          self.goto_list[state][char] = next_state
+          self.goto_list.append({})
+          self.fail_list.append(0)
+          self.out_list.append([])
+        state = next_state
+
+      if (len(key) not in self.out_list[state]):
+        self.out_list[state].append(len(key))
+
+    # Set the failure links in breadth first order, so the link of a state's
+    # parent is known before the state's own link
+    #
+    state_queue = collections.deque(self.goto_list[0].values())
+
+    while (len(state_queue) > 0):
+      state = state_queue.popleft()
+
+      for (char, next_state) in self.goto_list[state].items():
+        state_queue.append(next_state)
+
+        fail_state = self.fail_list[state]
+        while ((fail_state != 0) and \
+               (char not in self.goto_list[fail_state])):
+          fail_state = self.fail_list[fail_state]
+        fail_state = self.goto_list[fail_state].get(char, 0)
+
+        self.fail_list[next_state] = fail_state
+        self.out_list[next_state] = self.out_list[next_state] + \
+                                    self.out_list[fail_state]
+
+  # ---------------------------------------------------------------------------
+
+  def find_all(self, in_str):
+    """Return a list of (start position, key length) pairs of all occurrences
+       of the keys in the given string, ordered by the position where they
+       end (and the longest key first for the same end position).
+    """
+
+    goto_list = self.goto_list
+    fail_list = self.fail_list
+    out_list =  self.out_list
+
+    match_list = []
+    state = 0
+
+    for (pos, char) in enumerate(in_str):
+      while ((state != 0) and (char not in goto_list[state])):
+        state = fail_list[state]
+      state = goto_list[state].get(char, 0)
+
+      for key_len in out_list[state]:
+        match_list.append((pos - key_len + 1, key_len))
+
+    return match_list
+
+  # ---------------------------------------------------------------------------
+
+  def has_match(self, in_str):
+    """Check if any key occurs in the given string.
+    """
+
+    goto_list = self.goto_list
+    fail_list = self.fail_list
+    out_list =  self.out_list
+
+    state = 0
+
+    for char in in_str:
+      while ((state != 0) and (char not in goto_list[state])):
+        state = fail_list[state]
+      state = goto_list[state].get(char, 0)
+
+      if (out_list[state] != []):
+        return True
+
+    return False
+
+# =============================================================================
@@ -0,0 +1,141 @@
+# Import necessary modules
+import bisect
+import collections
+import itertools
+import random
+
+import crptr.base_functions as base_functions
+
+# =============================================================================
+
+class CandidateCache():
+  """Bounded cache of the candidate values of corruptors: for a (corruptor,
+     value) pair, all the values the corruptor can return for the value with
+     their probabilities (see method 'candidates' of class 'CorruptValue').
+
+     Population data is very repetitive (a few thousand distinct names,
+     occupations and places cover millions of records), so for corruptors
+     whose work per value is large (such as phonetic, OCR and keyboard
+     corruptors) a value is corrupted by a single random draw from its cached
+     candidates, and the candidates are only computed for values not in the
+     cache. A cache can be shared by several corruptors.
+
+     At most 'max_size' entries are kept, once the cache is full the least
+     recently used entry is evicted for a new one. The number of hits,
+     misses and evictions are counted, so the size can be tuned.
+
+     A cache is pickled without its entries and counts, so worker processes
+     start with an empty cache of their own.
+  """
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, max_size=10000):
+    """Constructor, create an empty cache for at most the given number of
+       entries.
+    """
+
+    base_functions.check_is_integer('max_size', max_size)
+    base_functions.check_is_positive('max_size', max_size)
+
+    self.max_size = max_size
+
+    self.clear()
+
+  # ---------------------------------------------------------------------------
+
+  def clear(self):
+    """Remove all entries and reset the counts.
+    """
+
+    # Keys are (corruptor, value) pairs, values are (tuple of candidate
+    # values, tuple of cumulative probabilities) pairs, with the least
+    # recently used entry first
+    #
+    self.entry_dict = collections.OrderedDict()
+
+    self.num_hits =      0
+    self.num_misses =    0
+    self.num_evictions = 0
+
+  # ---------------------------------------------------------------------------
+
+  def __getstate__(self):
+    """Pickle the size of the cache only.
+    """
+
+    return {'max_size': self.max_size}
+
+  # ---------------------------------------------------------------------------
+
+  def __setstate__(self, state):
+    """Restore an empty cache.
+    """
+
+    self.max_size = state['max_size']
+
+    self.clear()
+
+  # ---------------------------------------------------------------------------
+
+  def lookup(self, corruptor, in_str):
+    """Return the (tuple of candidate values, tuple of cumulative
+       probabilities) pair of the given corruptor for the given value, from
+       the cache or computed with the 'candidates' method of the corruptor.
+    """
+
+    key = (corruptor, in_str)
+
+    entry = self.entry_dict.get(key)
+
+    if (entry != None):
+      self.num_hits += 1
+      self.entry_dict.move_to_end(key)
+
+      return entry
+
+    self.num_misses += 1
+
+    candidate_list = corruptor.candidates(in_str)
+
+    entry = (tuple([cand_val for (cand_val, cand_prob) in candidate_list]),
+             tuple(itertools.accumulate([cand_prob for (cand_val, cand_prob) \
+                                         in candidate_list])))
+
+    self.entry_dict[key] = entry
+
+    if (len(self.entry_dict) > self.max_size):
+      self.entry_dict.popitem(last=False)
+      self.num_evictions += 1
+
+    return entry
+
+  # ---------------------------------------------------------------------------
+
+  def draw(self, corruptor, in_str, rng=None):
+    """Return a value randomly drawn from the candidates of the given
+       corruptor for the given value, using the given random number generator
+       (or the 'random' module if none is given).
+    """
+
+    if (rng == None):
+      rng = random
+
+    (cand_val_tuple, cum_prob_tuple) = self.lookup(corruptor, in_str)
+
+    if (len(cand_val_tuple) == 1):  # Only one possible value
+      return cand_val_tuple[0]
+
+    i = bisect.bisect_right(cum_prob_tuple, rng.random() * cum_prob_tuple[-1])
+
+    return cand_val_tuple[min(i, len(cand_val_tuple)-1)]
+
+  # ---------------------------------------------------------------------------
+
+  def counts(self):
+    """Return a list with the number of hits, misses and evictions.
+    """
+
+    return [self.num_hits, self.num_misses, self.num_evictions]
+
+# =============================================================================
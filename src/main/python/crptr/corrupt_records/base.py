@@ -1,4 +1,5 @@
 import crptr.base_functions as base_functions
+import crptr.random_streams as random_streams
 
 
 # ===============================================================================
@@ -26,6 +27,11 @@ class CorruptRecord:
                         function is assumed to be a string and its return value
                         an integer number in the range of the length of the
                         given input string.
+
+     Several records can be corrupted with a single call of 'corrupt_values'
+     (see the same method of 'CorruptValue'). The batched corruption mode
+     of 'Crptr' uses 'corrupt_fields' instead, as it only needs the changed
+     values.
   """
 
   # ---------------------------------------------------------------------------
@@ -67,10 +73,64 @@ class CorruptRecord:
 
   # ---------------------------------------------------------------------------
 
-  def corrupt_value(self, list):
+  def corrupt_value(self, list, rng=None):
     """Method which corrupts the given input list of strings and returns the modified
-       list.
+       list, drawing random numbers from the given random number generator
+       (or the global 'random' module if none is given).
        See implementations in derived classes for details.
     """
 
     raise Exception('Override abstract method in derived class')
+
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_rec):
+    """Method which returns False if 'corrupt_fields' is certain to return no
+       changes for the given record, and True if it may modify it (see
+       'can_corrupt' of 'CorruptValue'). This implementation always returns
+       True.
+    """
+
+    return True
+
+  # ---------------------------------------------------------------------------
+
+  def corrupt_fields(self, in_rec, rng=None):
+    """Method which corrupts the given record (a list of strings, or a
+       'DuplicateRecord') and returns only the changes made, as a dictionary
+       with the indices of the modified values as keys and the new values as
+       values.
+
+       This implementation applies 'corrupt_value' to a copy of the record
+       and compares the result to it, derived classes which only modify a
+       few values can override it to avoid copying the record.
+    """
+
+    in_list = in_rec[:]
+    new_list = self.corrupt_value(in_list[:], rng)
+
+    field_dict = {}
+    for (attr_index, new_val) in enumerate(new_list):
+      if (new_val != in_list[attr_index]):
+        field_dict[attr_index] = new_val
+
+    return field_dict
+
+  # ---------------------------------------------------------------------------
+
+  def corrupt_values(self, in_list_list, rng=None):
+    """Method which corrupts each record (list of strings) in the given list
+       and returns a list with the modified records. The random number
+       generator can be a single generator used for all records in turn, a
+       list with a generator for each record, or None (see
+       'random_streams.rng_list').
+
+       This implementation calls 'corrupt_value' for each record, derived
+       classes can provide faster implementations which must return the same
+       records.
+    """
+
+    corrupt_value = self.corrupt_value
+
+    return [corrupt_value(in_list, rec_rng) for (in_list, rec_rng) in \
+            zip(in_list_list, random_streams.rng_list(rng, len(in_list_list)))]
@@ -1,4 +1,5 @@
 from crptr import base_functions
+from crptr import position_functions
 from crptr.corrupt_records.base import CorruptRecord
 
 
@@ -27,9 +28,6 @@ class CorruptClearRecord(CorruptRecord):
     self.clear_val = ' '
     self.name =        'Clear record'
 
-    def dummy_position(s):  # Define a dummy position function
-      return 0
-
     # Process all keyword arguments
     #
     base_kwargs = {}  # Dictionary, will contain unprocessed arguments
@@ -43,13 +41,13 @@ class CorruptClearRecord(CorruptRecord):
       else:
         base_kwargs[keyword] = value
 
-    base_kwargs['position_function'] = dummy_position
+    base_kwargs['position_function'] = position_functions.position_mod_none
 
     CorruptRecord.__init__(self, base_kwargs)  # Process base arguments
 
   # ---------------------------------------------------------------------------
 
-  def corrupt_value(self, in_list):
+  def corrupt_value(self, in_list, rng=None):
     """Simply return the missing value string.
     """
     new_list = in_list[:]
@@ -57,6 +55,24 @@ class CorruptClearRecord(CorruptRecord):
         new_list[idx] = self.clear_val
     return new_list
 
+  # ---------------------------------------------------------------------------
+
+  def corrupt_fields(self, in_rec, rng=None):
+    """Return the missing value string for all values, without copying the
+       record.
+    """
+    return dict((idx, self.clear_val) for idx in range(len(in_rec)))
+
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_rec):
+    """A record can be cleared unless all its values are cleared already.
+    """
+    for value in in_rec:
+      if (value != self.clear_val):
+        return True
+    return False
+
 # =============================================================================
 #clear_rec = CorruptClearRecord(\
 #       clear_val=' ')
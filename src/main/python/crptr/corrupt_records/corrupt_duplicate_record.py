@@ -1,3 +1,4 @@
+from crptr import position_functions
 from crptr.corrupt_records.base import CorruptRecord
 
 
@@ -25,9 +26,6 @@ class CorruptDuplicateRecord(CorruptRecord):
 
     self.name =        'Missing record'
 
-    def dummy_position(s):  # Define a dummy position function
-      return 0
-
     # Process all keyword arguments
     #
     base_kwargs = {}  # Dictionary, will contain unprocessed arguments
@@ -35,17 +33,25 @@ class CorruptDuplicateRecord(CorruptRecord):
     for (keyword, value) in list(kwargs.items()):
         base_kwargs[keyword] = value
 
-    base_kwargs['position_function'] = dummy_position
+    base_kwargs['position_function'] = position_functions.position_mod_none
 
     CorruptRecord.__init__(self, base_kwargs)  # Process base arguments
 
   # ---------------------------------------------------------------------------
 
-  def corrupt_value(self, in_list):
+  def corrupt_value(self, in_list, rng=None):
     """Simply return the missing value string.
     """
     new_list = in_list[:]
     new_list[0]=('duplicate')
     return new_list
 
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_rec):
+    """A record can be modified unless its first value is 'duplicate'
+       already.
+    """
+    return (in_rec[0] != 'duplicate')
+
 # =============================================================================
\ No newline at end of file
@@ -1,3 +1,4 @@
+from crptr import position_functions
 from crptr.corrupt_records.base import CorruptRecord
 
 
@@ -26,9 +27,6 @@ class CorruptMissingRecord(CorruptRecord):
     #self.missing_val = 'missing'
     self.name =        'Missing record'
 
-    def dummy_position(s):  # Define a dummy position function
-      return 0
-
     # Process all keyword arguments
     #
     base_kwargs = {}  # Dictionary, will contain unprocessed arguments
@@ -36,13 +34,13 @@ class CorruptMissingRecord(CorruptRecord):
     for (keyword, value) in list(kwargs.items()):
         base_kwargs[keyword] = value
 
-    base_kwargs['position_function'] = dummy_position
+    base_kwargs['position_function'] = position_functions.position_mod_none
 
     CorruptRecord.__init__(self, base_kwargs)  # Process base arguments
 
   # ---------------------------------------------------------------------------
 
-  def corrupt_value(self, in_list):
+  def corrupt_value(self, in_list, rng=None):
     """Simply return the missing value string.
     """
     new_list = in_list[:]
@@ -50,6 +48,16 @@ class CorruptMissingRecord(CorruptRecord):
         new_list[idx] = 'missing'
     return new_list
 
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_rec):
+    """A record can be modified unless all its values are 'missing' already.
+    """
+    for value in in_rec:
+      if (value != 'missing'):
+        return True
+    return False
+
 # =============================================================================
 #missing_rec = CorruptMissingRecord()
 
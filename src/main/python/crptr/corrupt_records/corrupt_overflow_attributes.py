@@ -1,4 +1,5 @@
 from crptr import base_functions
+from crptr import position_functions
 from crptr.corrupt_records.base import CorruptRecord
 
 
@@ -31,9 +32,6 @@ class CorruptOverflowAttributes(CorruptRecord):
     self.start_pos = None
     self.name =        'Overflow Attributes'
 
-    def dummy_position(s):  # Define a dummy position function
-      return 0
-
     # Process all keyword arguments
     #
     base_kwargs = {}  # Dictionary, will contain unprocessed arguments
@@ -63,13 +61,13 @@ class CorruptOverflowAttributes(CorruptRecord):
       else:
         base_kwargs[keyword] = value
 
-    base_kwargs['position_function'] = dummy_position
+    base_kwargs['position_function'] = position_functions.position_mod_none
 
     CorruptRecord.__init__(self, base_kwargs)  # Process base arguments
 
   # ---------------------------------------------------------------------------
 
-  def corrupt_value(self, in_list):
+  def corrupt_value(self, in_list, rng=None):
     """Simply return the missing value string.
     """
     attr1_idx = self.attr_name_list.index(self.attr1)
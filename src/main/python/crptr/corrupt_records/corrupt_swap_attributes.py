@@ -1,4 +1,5 @@
 from crptr import base_functions
+from crptr import position_functions
 from crptr.corrupt_records.base import CorruptRecord
 
 
@@ -30,9 +31,6 @@ class CorruptSwapAttributes(CorruptRecord):
     self.attr2 = None
     self.name =        'Swap Attributes'
 
-    def dummy_position(s):  # Define a dummy position function
-      return 0
-
     # Process all keyword arguments
     #
     base_kwargs = {}  # Dictionary, will contain unprocessed arguments
@@ -54,13 +52,13 @@ class CorruptSwapAttributes(CorruptRecord):
       else:
         base_kwargs[keyword] = value
 
-    base_kwargs['position_function'] = dummy_position
+    base_kwargs['position_function'] = position_functions.position_mod_none
 
     CorruptRecord.__init__(self, base_kwargs)  # Process base arguments
 
   # ---------------------------------------------------------------------------
 
-  def corrupt_value(self, in_list):
+  def corrupt_value(self, in_list, rng=None):
     """Simply return the missing value string.
     """
     attr1_idx = self.attr_name_list.index(self.attr1)
@@ -73,6 +71,26 @@ class CorruptSwapAttributes(CorruptRecord):
 
     return new_list
 
+  # ---------------------------------------------------------------------------
+
+  def corrupt_fields(self, in_rec, rng=None):
+    """Return the two swapped values only, without copying the record.
+    """
+    attr1_idx = self.attr_name_list.index(self.attr1)
+    attr2_idx = self.attr_name_list.index(self.attr2)
+
+    return {attr1_idx: in_rec[attr2_idx], attr2_idx: in_rec[attr1_idx]}
+
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_rec):
+    """Swapping only modifies a record if the two values differ.
+    """
+    attr1_idx = self.attr_name_list.index(self.attr1)
+    attr2_idx = self.attr_name_list.index(self.attr2)
+
+    return (in_rec[attr1_idx] != in_rec[attr2_idx])
+
 # =============================================================================
 # =============================================================================
 #swap_attr = CorruptSwapAttributes(\
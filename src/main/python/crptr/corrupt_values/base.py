@@ -1,8 +1,11 @@
 # -----------------------------------------------------------------------------
 # Import necessary modules
 
+import inspect
 import random
 import crptr.base_functions as base_functions
+import crptr.candidate_cache as candidate_cache
+import crptr.random_streams as random_streams
 
 # =============================================================================
 # Base class for classes which corrupt a value in a single attribute (field) of
@@ -23,11 +26,54 @@ class CorruptValue:
      position_function  A function that (somehow) determines the location
                         within a string value of where a modification
                         (corruption) is to be applied. The input of this
-                        function is assumed to be a string and its return value
-                        an integer number in the range of the length of the
-                        given input string.
+                        function is assumed to be a string (and optionally a
+                        random number generator, see below) and its return
+                        value an integer number in the range of the length of
+                        the given input string. A function which only takes
+                        the string is called without the generator, so it
+                        draws its random numbers from the global 'random'
+                        module (and its positions are not reproducible from
+                        the keyed random number streams of a Crptr object).
+
+     The following variable is optional:
+
+     candidate_cache    A 'CandidateCache' object (see module
+                        'candidate_cache'), which can be shared by several
+                        corruptors. If given, a value is corrupted by a
+                        random draw from its candidate values (see method
+                        'candidates') kept in the cache. This is only
+                        possible for corruptors which set 'has_candidates'.
+                        The candidate values are drawn with the same
+                        probabilities as they are returned by 'corrupt_value'
+                        without a cache, but the random numbers drawn differ.
+                        Default is None (no cache).
+
+     All random numbers needed to corrupt a value are drawn from the random
+     number generator (a 'random.Random' instance) given to 'corrupt_value'.
+     If no generator is given the global 'random' module is used.
+
+     Several values can be corrupted with a single call of 'corrupt_values',
+     which avoids the overhead of a method call per value. Derived classes
+     provide faster implementations of it where possible, but for the same
+     values and random numbers it must return the same as calling
+     'corrupt_value' for each value in turn.
+
+     The method 'can_corrupt' tells if a corruptor can possibly modify a
+     given value, so corruptors which cannot are not selected for it (see
+     module 'corruptor_filter').
   """
 
+  # If True, empty values are returned unmodified by 'corrupt_values' without
+  # calling 'corrupt_value' (for corruptors which cannot modify empty values
+  # and draw no random numbers for them)
+  #
+  skip_empty_values = False
+
+  # If True, the derived class implements 'candidates', so a candidate cache
+  # can be used with it
+  #
+  has_candidates = False
+
   # ---------------------------------------------------------------------------
 #AHMAD# in the initiation (__init__) arguments inserted are checked, valedated and procssed to be used
   def __init__(self, base_kwargs):
@@ -37,6 +83,9 @@ class CorruptValue:
     # General attributes for all attribute corruptors.
     #
     self.position_function = None
+    self.candidate_cache =   None
+
+    cache = None
 
     # Process the keyword argument (all keywords specific to a certain data
     # generator type were processed in the derived class constructor)
@@ -50,6 +99,9 @@ class CorruptValue:
         #-----# in this case one of the functions (position_mod_normal or position_mod_uniform)
         self.position_function = value
 
+      elif (keyword.startswith('candidate')):
+        cache = value
+
       else:
         raise Exception('Illegal constructor argument keyword: "%s"' % \
               (str(keyword)))
@@ -57,19 +109,42 @@ class CorruptValue:
     base_functions.check_is_function_or_method('position_function',
                                               self.position_function)
 
-    # Check if the position function does return an integer value
+    # Check if the position function takes a random number generator (see
+    # 'select_position'), and if it does return an integer value when called
+    # as it is when values are corrupted
     #
-    pos = self.position_function('test')
+    self.position_takes_rng = position_function_takes_rng(
+                                                    self.position_function)
+
+    pos = self.select_position('test', random)
     if ((not isinstance(pos, int)) or (pos < 0) or (pos > 3)):
       raise Exception('Position function returns an illegal value (either' + \
                        'not an integer or and integer out of range: %s' % \
                        (str(pos)))
 
+    # Set once the position function is known, which the candidates of some
+    # corruptors depend on
+    #
+    self.set_candidate_cache(cache)
+
   # ---------------------------------------------------------------------------
 
-  def corrupt_value(self, str):
+  def select_position(self, in_str, rng=None):
+    """Return the position of the given string to modify, selected by the
+       position function with the given random number generator (or without
+       it if the position function only takes the string).
+    """
+
+    if (self.position_takes_rng == True):
+      return self.position_function(in_str, rng)
+
+    return self.position_function(in_str)
+
+  # ---------------------------------------------------------------------------
+
+  def corrupt_value(self, str, rng=None):
     """Method which corrupts the given input string and returns the modified
-       string.
+       string, drawing random numbers from the given random number generator.
        See implementations in derived classes for details.
     """
 
@@ -80,4 +155,88 @@ class CorruptValue:
 
 
 
-  
\ No newline at end of file
+  
+
+  # ---------------------------------------------------------------------------
+
+  def candidates(self, in_str):
+    """Method which returns a list of (value, probability) pairs with all the
+       values 'corrupt_value' can return for the given input string (possibly
+       the input string itself) and the probabilities that it returns them,
+       which sum to 1.0. See implementations in derived classes which set
+       'has_candidates'.
+    """
+
+    raise Exception('Corruptor "%s" does not provide candidate values' % \
+                    (type(self).__name__))
+
+  # ---------------------------------------------------------------------------
+
+  def set_candidate_cache(self, cache):
+    """Set the candidate cache (a 'CandidateCache' object, or None for no
+       cache) used by 'corrupt_value'.
+    """
+
+    if (cache != None):
+      if (not isinstance(cache, candidate_cache.CandidateCache)):
+        raise Exception('Value of "candidate_cache" is not a CandidateCache ' + \
+                        'object: %s' % (type(cache)))
+      if (self.has_candidates == False):
+        raise Exception('Corruptor "%s" does not provide candidate values ' % \
+                        (type(self).__name__) + 'for a candidate cache')
+
+    self.candidate_cache = cache
+
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_str):
+    """Method which returns False if 'corrupt_value' is certain to return the
+       given input string unchanged (whatever random numbers are drawn), and
+       True if it may modify it. It is called once per distinct value, so it
+       should be cheap but does not need to be exact.
+
+       This implementation returns False only for empty values if
+       'skip_empty_values' is set.
+    """
+
+    return ((self.skip_empty_values == False) or (in_str != ''))
+
+  # ---------------------------------------------------------------------------
+
+  def corrupt_values(self, in_str_list, rng=None):
+    """Method which corrupts each string in the given list and returns a list
+       with the modified strings. The random number generator can be a single
+       generator used for all values in turn, a list with a generator for
+       each value, or None (see 'random_streams.rng_list').
+
+       This implementation calls 'corrupt_value' for each value (except empty
+       values if 'skip_empty_values' is set).
+    """
+
+    corrupt_value = self.corrupt_value
+    value_rng_list = random_streams.rng_list(rng, len(in_str_list))
+
+    if (self.skip_empty_values == True):
+      return [corrupt_value(in_str, value_rng) if (in_str != '') else in_str \
+              for (in_str, value_rng) in zip(in_str_list, value_rng_list)]
+
+    return [corrupt_value(in_str, value_rng) for (in_str, value_rng) in \
+            zip(in_str_list, value_rng_list)]
+
+# =============================================================================
+
+def position_function_takes_rng(position_function):
+  """Check if the given position function can be called with a string and
+     a random number generator, rather than with the string only. Functions
+     whose signature cannot be inspected are assumed to take a generator.
+  """
+
+  try:
+    inspect.signature(position_function).bind('test', random)
+  except TypeError:
+    return False
+  except ValueError:
+    return True
+
+  return True
+
@@ -1,3 +1,4 @@
+from crptr import position_functions
 from crptr.corrupt_values.base import CorruptValue
 from crptr import base_functions
 
@@ -12,9 +13,6 @@ class CorruptAbbreviatedNameForms(CorruptValue):
     self.num_of_char =  None
     self.name =            'Abbreviated Name Forms'
 
-    def dummy_position(s):  # Define a dummy position function
-      return 0
-
     # Process all keyword arguments
     #
     base_kwargs = {}  # Dictionary, will contain unprocessed arguments
@@ -26,14 +24,14 @@ class CorruptAbbreviatedNameForms(CorruptValue):
         self.num_of_char = value
       else:
         base_kwargs[keyword] = value
-    base_kwargs['position_function'] = dummy_position
+    base_kwargs['position_function'] = position_functions.position_mod_none
     CorruptValue.__init__(self, base_kwargs)  # Process base arguments
 
     # Check if the necessary variables have been set
     #
     base_functions.check_is_integer('num_of_char',
                                               self.num_of_char)
-  def corrupt_value(self, in_str):
+  def corrupt_value(self, in_str, rng=None):
     """Method which corrupts the given input string and returns the modified
        string by randomly selecting an edit operation and position in the
        string where to apply this edit.
@@ -42,4 +40,23 @@ class CorruptAbbreviatedNameForms(CorruptValue):
     if (len(in_str) == 0) or (len(in_str) < self.num_of_char):  # Empty string, no modification possible
       return in_str
     new_str = in_str[:self.num_of_char]
-    return new_str
\ No newline at end of file
+    return new_str
+
+  def can_corrupt(self, in_str):
+    """A value can only be abbreviated if it is longer than the number of
+       characters kept.
+    """
+
+    return ((self.num_of_char < 0) or (len(in_str) > self.num_of_char))
+
+  def corrupt_values(self, in_str_list, rng=None):
+    """Abbreviate each of the given strings (a value shorter than the number
+       of characters is kept as it is, which is what slicing it does).
+    """
+
+    if (self.num_of_char < 0):
+      return CorruptValue.corrupt_values(self, in_str_list, rng)
+
+    num_of_char = self.num_of_char
+
+    return [in_str[:num_of_char] for in_str in in_str_list]
@@ -1,8 +1,10 @@
 
 import random
 
+from crptr import position_functions
 from crptr.corrupt_values.base import CorruptValue
 from crptr import base_functions
+from crptr import random_streams
 
 
 class CorruptCategoricalDomain(CorruptValue):
@@ -15,9 +17,6 @@ class CorruptCategoricalDomain(CorruptValue):
     self.categories_list =  None
     self.name =            'Categorical Domain'
 
-    def dummy_position(s):  # Define a dummy position function
-      return 0
-
     # Process all keyword arguments
     #
     base_kwargs = {}  # Dictionary, will contain unprocessed arguments
@@ -29,7 +28,7 @@ class CorruptCategoricalDomain(CorruptValue):
         self.categories_list = value
       else:
         base_kwargs[keyword] = value
-    base_kwargs['position_function'] = dummy_position
+    base_kwargs['position_function'] = position_functions.position_mod_none
 
     CorruptValue.__init__(self, base_kwargs)  # Process base arguments
 
@@ -37,16 +36,51 @@ class CorruptCategoricalDomain(CorruptValue):
     #
     base_functions.check_is_list('categories_list',
                                               self.categories_list)
-  def corrupt_value(self, in_str):
+  def corrupt_value(self, in_str, rng=None):
     """Method which corrupts the given input string and returns the modified
        string by randomly selecting an edit operation and position in the
        string where to apply this edit.
     """
+    if rng is None:
+      rng = random
     if in_str not in self.categories_list:
       return in_str
     #cat_list = self.categories_list
     if in_str in self.categories_list:
       new_str = in_str
       while new_str == in_str:
-        new_str = random.choice(self.categories_list)
-      return new_str
\ No newline at end of file
+        new_str = rng.choice(self.categories_list)
+      return new_str
+
+  def can_corrupt(self, in_str):
+    """A value can only be replaced if it is in the domain, and the domain
+       has another value.
+    """
+
+    if (in_str not in self.categories_list):
+      return False
+
+    for category in self.categories_list:
+      if (category != in_str):
+        return True
+
+    return False
+
+  def corrupt_values(self, in_str_list, rng=None):
+    """Replace each of the given strings which is in the domain with another
+       randomly selected value of the domain.
+    """
+
+    categories_list = self.categories_list
+    categories_set = set(categories_list)
+
+    new_str_list = []
+    for (in_str, value_rng) in \
+        zip(in_str_list, random_streams.rng_list(rng, len(in_str_list))):
+      new_str = in_str
+      if (in_str in categories_set):
+        while (new_str == in_str):
+          new_str = value_rng.choice(categories_list)
+      new_str_list.append(new_str)
+
+    return new_str_list
@@ -1,6 +1,8 @@
 import random
 
 from crptr import base_functions
+from crptr import random_streams
+from crptr import position_functions
 from crptr.corrupt_values.base import CorruptValue
 
 
@@ -49,9 +51,6 @@ class CorruptCategoricalValue(CorruptValue):
     self.misspell_dict =    {}  # The dictionary to hold the misspellings
     self.name =             'Categorial value'
 
-    def dummy_position(s):  # Define a dummy position function
-      return 0
-
     # Process all keyword arguments
     #
     base_kwargs = {}  # Dictionary, will contain unprocessed arguments
@@ -73,7 +72,7 @@ class CorruptCategoricalValue(CorruptValue):
       else:
         base_kwargs[keyword] = value
 
-    base_kwargs['position_function'] = dummy_position
+    base_kwargs['position_function'] = position_functions.position_mod_none
 
     CorruptValue.__init__(self, base_kwargs)  # Process base arguments
 
@@ -117,7 +116,7 @@ class CorruptCategoricalValue(CorruptValue):
 
   # ---------------------------------------------------------------------------
 
-  def corrupt_value(self, in_str):
+  def corrupt_value(self, in_str, rng=None):
     """Method which corrupts the given input string and replaces it with a
        misspelling, if there is a known misspelling for the given original
        value.
@@ -126,6 +125,9 @@ class CorruptCategoricalValue(CorruptValue):
        then one will be randomly selected.
     """
 
+    if (rng == None):
+      rng = random
+
     if (len(in_str) == 0):  # Empty string, no modification possible
       return in_str
 
@@ -134,4 +136,32 @@ class CorruptCategoricalValue(CorruptValue):
 
     misspell_list = self.misspell_dict[in_str]
 
-    return random.choice(misspell_list)
\ No newline at end of file
+    return rng.choice(misspell_list)
+
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_str):
+    """A value can only be replaced if there is a known misspelling for it.
+    """
+
+    return (in_str in self.misspell_dict)
+
+  # ---------------------------------------------------------------------------
+
+  def corrupt_values(self, in_str_list, rng=None):
+    """Replace each of the given strings with a misspelling, if there is a
+       known misspelling for it (the lookup file has no empty values).
+    """
+
+    misspell_dict = self.misspell_dict
+
+    new_str_list = []
+    for (in_str, value_rng) in \
+        zip(in_str_list, random_streams.rng_list(rng, len(in_str_list))):
+      misspell_list = misspell_dict.get(in_str)
+      if (misspell_list == None):  # No misspelling for this value
+        new_str_list.append(in_str)
+      else:
+        new_str_list.append(value_rng.choice(misspell_list))
+
+    return new_str_list
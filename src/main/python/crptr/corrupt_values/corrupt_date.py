@@ -1,5 +1,6 @@
 import random
 from crptr import base_functions
+from crptr import position_functions
 from crptr.corrupt_values.base import CorruptValue
 
 
@@ -16,9 +17,6 @@ class CorruptDate(CorruptValue):
     self.date_corruption_methods = None
     self.name =            'Date'
 
-    def dummy_position(s):  # Define a dummy position function
-      return 0
-
     # Process all keyword arguments
     #
     base_kwargs = {}  # Dictionary, will contain unprocessed arguments
@@ -43,7 +41,7 @@ class CorruptDate(CorruptValue):
 
       else:
         base_kwargs[keyword] = value
-    base_kwargs['position_function'] = dummy_position
+    base_kwargs['position_function'] = position_functions.position_mod_none
 
     CorruptValue.__init__(self, base_kwargs)  # Process base arguments
 
@@ -58,12 +56,15 @@ class CorruptDate(CorruptValue):
     base_functions.check_is_list('date_corruption_methods',
                                 self.date_corruption_methods)
 
-  def corrupt_value(self, in_str):
+  def corrupt_value(self, in_str, rng=None):
     """Method which corrupts the given input string and returns the modified
        string by randomly selecting an edit operation and position in the
        string where to apply this edit.
     """
 
+    if rng is None:
+      rng = random
+
     if in_str == "missing":
       return in_str  # i.e. previous corruption prevents this corruption
 
@@ -85,10 +86,10 @@ class CorruptDate(CorruptValue):
     else:
       print("date format and order is not correct")
 
-    comp_mod = random.choice(self.components_to_modify)
-    crpt_method = random.choice(self.date_corruption_methods)
+    comp_mod = rng.choice(self.components_to_modify)
+    crpt_method = rng.choice(self.date_corruption_methods)
 
-    ran_num = random.randint(1, 10)
+    ran_num = rng.randint(1, 10)
 
     if crpt_method == 'add':
       if comp_mod == 'day':
@@ -118,19 +119,19 @@ class CorruptDate(CorruptValue):
 
     elif crpt_method == "random":
       if comp_mod == "day":
-        ran_day = random.randint(1, 30)
+        ran_day = rng.randint(1, 30)
         day = ran_day
       elif comp_mod == "month":
-        ran_month = random.randint(1, 12)
+        ran_month = rng.randint(1, 12)
         month = ran_month
       elif comp_mod == "year":
-        ran_year = random.randint(1750, 2100)
+        ran_year = rng.randint(1750, 2100)
         year = ran_year
 
     elif crpt_method == "swap_comp":
       if comp_mod == "day":
         other_comp = ['month', 'year']
-        swap_attr = random.choice(other_comp)
+        swap_attr = rng.choice(other_comp)
         print(swap_attr)
         if swap_attr == "month":
           h_day = day
@@ -142,7 +143,7 @@ class CorruptDate(CorruptValue):
           year = h_day
       elif comp_mod == "month":
         other_comp = ['day', 'year']
-        swap_attr = random.choice(other_comp)
+        swap_attr = rng.choice(other_comp)
         print(swap_attr)
         if swap_attr == "day":
           h_month = month
@@ -154,7 +155,7 @@ class CorruptDate(CorruptValue):
           year = h_month
       elif comp_mod == "year":
         other_comp = ['day', 'month']
-        swap_attr = random.choice(other_comp)
+        swap_attr = rng.choice(other_comp)
         print(swap_attr)
         if swap_attr == "day":
           h_year = year
@@ -171,7 +172,7 @@ class CorruptDate(CorruptValue):
         print(comp_lst)
         index_lst = list(range(0, len(comp_lst)))
         print(index_lst)
-        swap_lst = sorted(random.sample(index_lst, 2))
+        swap_lst = sorted(rng.sample(index_lst, 2))
         print(swap_lst)
         fst_index = comp_lst[swap_lst[0]]
         print(fst_index)
@@ -189,7 +190,7 @@ class CorruptDate(CorruptValue):
         print(comp_lst)
         index_lst = list(range(0, len(comp_lst)))
         print(index_lst)
-        swap_lst = sorted(random.sample(index_lst, 2))
+        swap_lst = sorted(rng.sample(index_lst, 2))
         print(swap_lst)
         fst_index = comp_lst[swap_lst[0]]
         print(fst_index)
@@ -206,7 +207,7 @@ class CorruptDate(CorruptValue):
         print(comp_lst)
         index_lst = list(range(0, len(comp_lst)))
         print(index_lst)
-        swap_lst = sorted(random.sample(index_lst, 2))
+        swap_lst = sorted(rng.sample(index_lst, 2))
         print(swap_lst)
         fst_index = comp_lst[swap_lst[0]]
         print(fst_index)
@@ -249,3 +250,10 @@ class CorruptDate(CorruptValue):
       new_date = str(year) + self.separator + str(month) + self.separator + str(day)
 
     return new_date
+
+  def can_corrupt(self, in_str):
+    """A date can be modified unless a previous corruption set it to
+       missing.
+    """
+
+    return (in_str != "missing")
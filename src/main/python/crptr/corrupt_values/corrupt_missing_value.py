@@ -1,4 +1,5 @@
 from crptr import base_functions
+from crptr import position_functions
 from crptr.corrupt_values.base import CorruptValue
 
 
@@ -27,9 +28,6 @@ class CorruptMissingValue(CorruptValue):
     self.missing_val = ''
     self.name =        'Missing value'
 
-    def dummy_position(s):  # Define a dummy position function
-      return 0
-
     # Process all keyword arguments
     #
     base_kwargs = {}  # Dictionary, will contain unprocessed arguments
@@ -43,15 +41,31 @@ class CorruptMissingValue(CorruptValue):
       else:
         base_kwargs[keyword] = value
 
-    base_kwargs['position_function'] = dummy_position
+    base_kwargs['position_function'] = position_functions.position_mod_none
 
     CorruptValue.__init__(self, base_kwargs)  # Process base arguments
 
   # ---------------------------------------------------------------------------
 
-  def corrupt_value(self, in_str):
+  def corrupt_value(self, in_str, rng=None):
     """Simply return the missing value string.
     """
 
     return self.missing_val
+
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_str):
+    """A value can be modified unless it is the missing value already.
+    """
+
+    return (in_str != self.missing_val)
+
+  # ---------------------------------------------------------------------------
+
+  def corrupt_values(self, in_str_list, rng=None):
+    """Simply return the missing value string for each value.
+    """
+
+    return [self.missing_val] * len(in_str_list)
   
\ No newline at end of file
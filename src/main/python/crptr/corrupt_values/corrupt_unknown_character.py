@@ -1,4 +1,5 @@
 from crptr import base_functions
+from crptr import random_streams
 from crptr.corrupt_values.base import CorruptValue
 
 
@@ -31,7 +32,7 @@ class CorruptUnknownCharacter(CorruptValue):
     #
     base_functions.check_is_string('unknown_char',
                                               self.unknown_char)
-  def corrupt_value(self, in_str):
+  def corrupt_value(self, in_str, rng=None):
     """Method which corrupts the given input string and returns the modified
        string by randomly selecting an edit operation and position in the
        string where to apply this edit.
@@ -40,6 +41,36 @@ class CorruptUnknownCharacter(CorruptValue):
     if (len(in_str) == 0):  # Empty string, no modification possible
       return in_str
     
-    mod_pos = self.position_function(in_str)
+    mod_pos = self.select_position(in_str, rng)
     new_str = in_str[:mod_pos] + self.unknown_char + in_str[mod_pos + 1:]
-    return new_str
\ No newline at end of file
+    return new_str
+
+  def can_corrupt(self, in_str):
+    """A value can be modified unless it is empty or (for a single unknown
+       character) consists of unknown characters only.
+    """
+
+    if (len(self.unknown_char) != 1):
+      return (in_str != '')
+
+    return (in_str.replace(self.unknown_char, '') != '')
+
+  def corrupt_values(self, in_str_list, rng=None):
+    """Replace a character in each of the given strings with the unknown
+       character.
+    """
+
+    select_position = self.select_position
+    unknown_char = self.unknown_char
+
+    new_str_list = []
+    for (in_str, value_rng) in \
+        zip(in_str_list, random_streams.rng_list(rng, len(in_str_list))):
+      if (len(in_str) == 0):
+        new_str_list.append(in_str)
+      else:
+        mod_pos = select_position(in_str, value_rng)
+        new_str_list.append(in_str[:mod_pos] + unknown_char + \
+                            in_str[mod_pos + 1:])
+
+    return new_str_list
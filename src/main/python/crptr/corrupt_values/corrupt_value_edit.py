@@ -23,6 +23,10 @@ class CorruptValueEdit(CorruptValue):
      transpose_prob   the sum of these four values must be 1.0
   """
 
+  # Empty strings cannot be modified, so 'corrupt_values' skips them
+  #
+  skip_empty_values = True
+
   # ---------------------------------------------------------------------------
 
   def __init__(self, **kwargs):
@@ -99,12 +103,15 @@ class CorruptValueEdit(CorruptValue):
 
   # ---------------------------------------------------------------------------
 
-  def corrupt_value(self, in_str):
+  def corrupt_value(self, in_str, rng=None):
     """Method which corrupts the given input string and returns the modified
        string by randomly selecting an edit operation and position in the
        string where to apply this edit.
     """
 
+    if (rng == None):
+      rng = random
+
     if (len(in_str) == 0):  # Empty string, no modification possible
       return in_str
 
@@ -112,7 +119,7 @@ class CorruptValueEdit(CorruptValue):
 
     # Randomly select an edit operation
     #
-    r = random.random()
+    r = rng.random()
 
     if (r < self.insert_range[1]):
       edit_op = 'ins'
@@ -155,7 +162,7 @@ class CorruptValueEdit(CorruptValue):
       len_in_str = in_str+'x'
     else:
       len_in_str = in_str
-    mod_pos = self.position_function(len_in_str)
+    mod_pos = self.select_position(len_in_str, rng)
 
     # Get the set of possible characters that can be inserted or substituted
     #
@@ -165,14 +172,14 @@ class CorruptValueEdit(CorruptValue):
       return in_str
 
     if (edit_op == 'ins'):  # Insert a character
-      ins_char = random.choice(char_set)
+      ins_char = rng.choice(char_set)
       new_str = in_str[:mod_pos] + ins_char + in_str[mod_pos:]
 
     elif (edit_op == 'del'):  # Delete a character
       new_str = in_str[:mod_pos] + in_str[mod_pos+1:]
 
     elif (edit_op == 'sub'):  # Substitute a character
-      sub_char = random.choice(char_set)
+      sub_char = rng.choice(char_set)
       new_str = in_str[:mod_pos] + sub_char + in_str[mod_pos+1:]
 
     else:  # Transpose two characters
@@ -180,4 +187,14 @@ class CorruptValueEdit(CorruptValue):
       char2 = in_str[mod_pos+1]
       new_str = in_str[:mod_pos]+char2+char1+in_str[mod_pos+2:]
 
-    return new_str
\ No newline at end of file
+    return new_str
+
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_str):
+    """A value can only be modified if the character set function returns
+       characters for it (for example, with 'char_set_ascii' values of
+       letters, or of digits, possibly with whitespace).
+    """
+
+    return ((in_str != '') and (self.char_set_funct(in_str) != ''))
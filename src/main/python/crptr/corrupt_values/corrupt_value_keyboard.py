@@ -1,7 +1,10 @@
 
+import codecs
 import random
 
 from crptr import base_functions
+from crptr import candidate_cache
+from crptr import position_functions
 from crptr.corrupt_values.base import CorruptValue
 
 
@@ -25,8 +28,42 @@ class CorruptValueKeyboard(CorruptValue):
                column is selected.
 
      The sum of row_prob and col_prob must be 1.0.
+
+     The optional arguments are:
+
+     layout_file_name  Name of a keyboard layout file to use instead of the
+                       hard-coded keyboard, see 'load_layout'. Default is
+                       None.
+
+     unicode_encoding  The Unicode encoding (a string name) of the layout
+                       file. Default is 'utf-8'.
+
+     With a layout file, the neighbouring keys of upper case letters are
+     the upper case versions of those of the lower case letters, and the
+     position to modify is only selected among the characters which have
+     neighbouring keys (weighted by the probabilities of the position
+     function, see 'position_weights' in module 'position_functions'), with
+     a row or column neighbour selected with probabilities 'row_prob' and
+     'col_prob' (or the one that exists, if a character only has row or
+     column neighbours). A value with such a character is therefore always
+     modified with a single random draw, rather than with up to 10 tries.
+
+     A candidate cache (see base class argument 'candidate_cache') can only
+     be used with a position function with registered position weights (see
+     'position_weights' in module 'position_functions').
   """
 
+  # Empty strings cannot be modified, so 'corrupt_values' skips them
+  #
+  skip_empty_values = True
+
+  has_candidates = True
+
+  layout_cache_size = 10000  # Maximum number of values in the layout cache
+
+  max_try = 10  # Maximum number of tries to find a keyboard modification at a
+                # randomly selected position
+
   # ---------------------------------------------------------------------------
 
   def __init__(self, **kwargs):
@@ -34,9 +71,13 @@ class CorruptValueKeyboard(CorruptValue):
        class constructor.
     """
 
-    self.row_prob = None
-    self.col_prob = None
-    self.name =     'Keybord value'
+    self.row_prob =         None
+    self.col_prob =         None
+    self.layout_file_name = None
+    self.unicode_encoding = 'utf-8'
+    self.key_option_dict =  None  # Neighbouring keys compiled from a layout
+    self.layout_cache =     None  # Candidate cache for the layout
+    self.name =             'Keybord value'
 
     # Process all keyword arguments
     #
@@ -52,6 +93,14 @@ class CorruptValueKeyboard(CorruptValue):
         base_functions.check_is_normalised('col_prob', value)
         self.col_prob = value
 
+      elif (keyword.startswith('layout')):
+        base_functions.check_is_non_empty_string('layout_file_name', value)
+        self.layout_file_name = value
+
+      elif (keyword.startswith('unicode')):
+        base_functions.check_is_non_empty_string('unicode_encoding', value)
+        self.unicode_encoding = value
+
       else:
         base_kwargs[keyword] = value
 
@@ -87,9 +136,12 @@ class CorruptValueKeyboard(CorruptValue):
                  '1':'q',  '2':'qw', '3':'we', '4':'er', '5':'rt',  '6':'ty',
                  '7':'yu', '8':'ui', '9':'io', '0':'op'}
 
+    if (self.layout_file_name != None):
+      self.load_layout(self.layout_file_name, self.unicode_encoding)
+
   # ---------------------------------------------------------------------------
 
-  def corrupt_value(self, in_str):
+  def corrupt_value(self, in_str, rng=None):
     """Method which corrupts the given input string by replacing a single
        character with a neighbouring character given the defined keyboard
        layout at a position randomly selected by the position function.
@@ -97,11 +149,19 @@ class CorruptValueKeyboard(CorruptValue):
 
     #in_str = in_str.decode("UTF-8")
 
+    if (rng == None):
+      rng = random
+
     if (len(in_str) == 0):  # Empty string, no modification possible
       return in_str
 
-    max_try = 10  # Maximum number of tries to find a keyboard modification at
-                  # a randomly selected position
+    if (self.candidate_cache != None):
+      return self.candidate_cache.draw(self, in_str, rng)
+
+    if (self.key_option_dict != None):  # Layout file, see 'load_layout'
+      return self.layout_cache.draw(self, in_str, rng)
+
+    max_try = self.max_try
 
     done_key_mod = False  # A flag, set to true once a modification is done
     try_num =      0
@@ -110,10 +170,10 @@ class CorruptValueKeyboard(CorruptValue):
 
     while ((done_key_mod == False) and (try_num < max_try)):
 
-      mod_pos =  self.position_function(mod_str)
+      mod_pos =  self.select_position(mod_str, rng)
       mod_char = mod_str[mod_pos]
 
-      r = random.random()  # Create a random number between 0 and 1
+      r = rng.random()  # Create a random number between 0 and 1
 
       if (r <= self.row_prob):  # See if there is a row modification
         if (mod_char in self.rows):
@@ -134,10 +194,299 @@ class CorruptValueKeyboard(CorruptValue):
 
       # Randomly select one of the possible characters
       #
-      new_char = random.choice(key_mod_chars)
+      new_char = rng.choice(key_mod_chars)
 
       mod_str = mod_str[:mod_pos] + new_char + mod_str[mod_pos+1:]
 
     assert len(mod_str) == len(in_str)
 
-    return mod_str
\ No newline at end of file
+    return mod_str
+
+  # ---------------------------------------------------------------------------
+
+  def layout_modifications(self, in_str):
+    """Return a list of (position, new character, weight) triples of all
+       the modifications possible with the neighbouring keys compiled from a
+       layout file, where the weights are the position weights multiplied by
+       the probabilities of the neighbouring keys of the characters.
+    """
+
+    weight_list = position_functions.position_weights(self.position_function,
+                                                      in_str)
+    key_option_dict = self.key_option_dict
+
+    mod_list = []
+
+    for (mod_pos, mod_char) in enumerate(in_str):
+      key_option_list = key_option_dict.get(mod_char)
+
+      if ((key_option_list != None) and (weight_list[mod_pos] > 0.0)):
+        pos_weight = weight_list[mod_pos]
+        for (new_char, key_prob) in key_option_list:
+          mod_list.append((mod_pos, new_char, pos_weight*key_prob))
+
+    return mod_list
+
+  # ---------------------------------------------------------------------------
+
+  def load_layout(self, file_name, encoding='utf-8'):
+    """Load a keyboard layout file and compile it into the neighbouring
+       keys of each character, replacing the hard-coded keyboard.
+
+       A layout file lists the keys of a keyboard in rows, one row per line
+       with the keys separated by commas. Rows on consecutive lines form a
+       block (such as the letter keys, or a numeric keypad), blocks are
+       separated by comment lines (starting with '#') or empty lines, for
+       example:
+
+         1,2,3,4,5,6,7,8,9,0
+         q,w,e,r,t,y,u,i,o,p
+         a,s,d,f,g,h,j,k,l
+         z,x,c,v,b,n,m
+         #
+         7,8,9
+         4,5,6
+         1,2,3
+
+       The row neighbours of a key are the keys to its left and right, its
+       column neighbours the keys at the same index in the rows above and
+       below it in the same block (the rows are taken as aligned, the stagger
+       of the rows of a real keyboard is not modelled). A key listed in more
+       than one block (such as the digits of the numeric keypad) has the
+       neighbouring keys of all of them. For lower case letters
+       the upper case letters are added, with the upper case versions of
+       their neighbouring keys.
+
+       A value is corrupted by a random draw from its candidates (see
+       'candidates'), which are kept in a candidate cache of the corruptor
+       (see module 'candidate_cache') for at most 'layout_cache_size' values.
+    """
+
+    if (position_functions.has_position_weights(self.position_function) \
+        == False):
+      raise Exception('No position weights registered for the position ' + \
+                      'function, which are needed for "layout_file_name"')
+
+    block_list = read_layout_file(file_name, encoding)
+
+    row_dict = {}
+    col_dict = {}
+
+    for block in block_list:
+      for (row_num, key_list) in enumerate(block):
+        for (key_num, key) in enumerate(key_list):
+          row_neighbour_list = key_list[max(key_num-1, 0):key_num] + \
+                               key_list[key_num+1:key_num+2]
+
+          col_neighbour_list = []
+          for other_row_num in [row_num-1, row_num+1]:
+            if ((other_row_num >= 0) and (other_row_num < len(block)) and \
+                (key_num < len(block[other_row_num]))):
+              col_neighbour_list.append(block[other_row_num][key_num])
+
+          row_keys = ''.join(row_neighbour_list)
+          col_keys = ''.join(col_neighbour_list)
+
+          add_neighbour_keys(row_dict, key, row_keys)
+          add_neighbour_keys(col_dict, key, col_keys)
+
+          if (key.upper() != key):  # Upper case version of a letter key
+            add_neighbour_keys(row_dict, key.upper(), row_keys.upper())
+            add_neighbour_keys(col_dict, key.upper(), col_keys.upper())
+
+    # For each character the neighbouring keys with the probability that
+    # each is selected, given that the character is modified
+    #
+    key_option_dict = {}
+
+    for key in sorted(row_dict):
+      row_keys = row_dict[key]
+      col_keys = col_dict[key]
+
+      row_weight = self.row_prob if (row_keys != '') else 0.0
+      col_weight = self.col_prob if (col_keys != '') else 0.0
+
+      if (row_weight + col_weight > 0.0):
+        key_option_list = []
+        for new_char in row_keys:
+          key_option_list.append((new_char, row_weight / \
+                                  (row_weight+col_weight) / len(row_keys)))
+        for new_char in col_keys:
+          key_option_list.append((new_char, col_weight / \
+                                  (row_weight+col_weight) / len(col_keys)))
+        key_option_dict[key] = tuple(key_option_list)
+
+    self.rows = dict([(key, keys) for (key, keys) in row_dict.items() \
+                      if (keys != '')])
+    self.cols = dict([(key, keys) for (key, keys) in col_dict.items() \
+                      if (keys != '')])
+    self.key_option_dict =  key_option_dict
+    self.layout_file_name = file_name
+
+    # The candidates of a value are computed once and then drawn from (also
+    # without a 'candidate_cache', which is used instead if one is set)
+    #
+    self.layout_cache = candidate_cache.CandidateCache(self.layout_cache_size)
+
+  # ---------------------------------------------------------------------------
+
+  def candidates(self, in_str):
+    """Return the possible modified values of the given input string with
+       their probabilities (see the base class). At each try a position is
+       selected with the probability given by the position weights, and a row
+       or column modification is possible with probability 'row_prob' or
+       (1 - 'row_prob'), so the value is left unchanged if all tries fail.
+    """
+
+    if (len(in_str) == 0):
+      return [(in_str, 1.0)]
+
+    if (self.key_option_dict != None):
+      mod_list = self.layout_modifications(in_str)
+
+      if (mod_list == []):  # No character with neighbouring keys
+        return [(in_str, 1.0)]
+
+      prob_sum = sum([mod_prob for (mod_pos, new_char, mod_prob) in mod_list])
+
+      cand_prob_dict = {}
+      for (mod_pos, new_char, mod_prob) in mod_list:
+        mod_str = in_str[:mod_pos] + new_char + in_str[mod_pos+1:]
+        cand_prob_dict[mod_str] = cand_prob_dict.get(mod_str, 0.0) + \
+                                  mod_prob / prob_sum
+
+      return list(cand_prob_dict.items())
+
+    weight_list = position_functions.position_weights(self.position_function,
+                                                      in_str)
+    weight_sum =  sum(weight_list)
+
+    mod_list =  []   # (position, probability per try, neighbouring keys)
+    fail_prob = 0.0  # Probability that a try fails
+
+    for (mod_pos, mod_char) in enumerate(in_str):
+      pos_weight = weight_list[mod_pos] / weight_sum
+
+      if (mod_char in self.rows):
+        mod_list.append((mod_pos, pos_weight*self.row_prob,
+                         self.rows[mod_char]))
+      else:
+        fail_prob += pos_weight*self.row_prob
+
+      if (mod_char in self.cols):
+        mod_list.append((mod_pos, pos_weight*(1.0-self.row_prob),
+                         self.cols[mod_char]))
+      else:
+        fail_prob += pos_weight*(1.0-self.row_prob)
+
+    # Probability that a modification is done (at any of the tries) for a
+    # modification with probability 1.0 per try
+    #
+    if (fail_prob < 1.0):
+      done_factor = (1.0 - fail_prob**self.max_try) / (1.0 - fail_prob)
+    else:
+      done_factor = 0.0
+
+    cand_prob_dict = {}
+
+    for (mod_pos, try_prob, key_mod_chars) in mod_list:
+      char_prob = try_prob * done_factor / len(key_mod_chars)
+      for new_char in key_mod_chars:
+        mod_str = in_str[:mod_pos] + new_char + in_str[mod_pos+1:]
+        cand_prob_dict[mod_str] = cand_prob_dict.get(mod_str, 0.0) + char_prob
+
+    unchanged_prob = min(fail_prob, 1.0)**self.max_try
+    if (unchanged_prob > 0.0):
+      cand_prob_dict[in_str] = cand_prob_dict.get(in_str, 0.0) + unchanged_prob
+
+    cand_list = [(cand_val, cand_prob) for (cand_val, cand_prob) in \
+                 cand_prob_dict.items() if (cand_prob > 0.0)]
+
+    if (cand_list == []):  # No modification possible
+      return [(in_str, 1.0)]
+
+    return cand_list
+
+  # ---------------------------------------------------------------------------
+
+  def set_candidate_cache(self, cache):
+    """Set the candidate cache, the candidates need the position weights
+       of the position function.
+    """
+
+    if ((cache != None) and \
+        (position_functions.has_position_weights(self.position_function) \
+         == False)):
+      raise Exception('No position weights registered for the position ' + \
+                      'function, which are needed for "candidate_cache"')
+
+    CorruptValue.set_candidate_cache(self, cache)
+
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_str):
+    """A value can only be modified if it has a character with neighbouring
+       keys (with the hard-coded keyboard lower case letters and digits, so
+       for example values in upper case only cannot be modified).
+    """
+
+    for in_char in in_str:
+      if ((in_char in self.rows) or (in_char in self.cols)):
+        return True
+
+    return False
+
+# =============================================================================
+
+def add_neighbour_keys(key_dict, key, neighbour_keys):
+  """Add the given neighbouring keys of a key to the dictionary of
+     neighbouring keys, leaving out those it already has.
+  """
+
+  old_keys = key_dict.get(key, '')
+
+  key_dict[key] = old_keys + ''.join([neighbour for neighbour in \
+                                      neighbour_keys if neighbour not in \
+                                      old_keys])
+
+# =============================================================================
+
+def read_layout_file(file_name, encoding):
+  """Read a keyboard layout file (see method 'load_layout' of class
+     'CorruptValueKeyboard') and return a list of its blocks, each a list of
+     rows, each a list of keys.
+  """
+
+  base_functions.check_is_string('file_name', file_name)
+  base_functions.check_unicode_encoding_exists(encoding)
+
+  try:
+    in_file = codecs.open(file_name, encoding=encoding)
+  except:
+    raise IOError('Cannot read keyboard layout file "%s"' % (file_name))
+
+  block_list = []
+  block =      []
+
+  for line_str in in_file:
+    line_str = line_str.strip()
+
+    if ((line_str.startswith('#') == True) or (line_str == '')):
+      if (block != []):
+        block_list.append(block)
+        block = []
+
+    else:
+      key_list = [key.strip() for key in line_str.split(',')]
+      for key in key_list:
+        if (len(key) != 1):
+          raise Exception('Illegal key "%s" in keyboard layout file %s' % \
+                          (key, file_name))
+      block.append(key_list)
+
+  if (block != []):
+    block_list.append(block)
+
+  in_file.close()
+
+  return block_list
@@ -1,6 +1,8 @@
 import random
 
 from crptr import base_functions
+from crptr import position_functions
+from crptr.aho_corasick import AhoCorasick
 from crptr.corrupt_values.base import CorruptValue
 
 
@@ -37,8 +39,38 @@ class CorruptValueOCR(CorruptValue):
                        line or not.
 
      unicode_encoding  The Unicode encoding (a string name) of the file.
+
+     The optional argument is:
+
+     match_index       A flag, if set to True the OCR variations of one to
+                       three characters are compiled into an Aho-Corasick
+                       automaton (see module 'aho_corasick') which finds all
+                       positions where a variation can be applied in a single
+                       scan of a value. The position to modify is then
+                       sampled among these positions, weighted by the
+                       probabilities of the position function (see
+                       'position_weights' in module 'position_functions'),
+                       and a variation at this position is selected as
+                       before. This gives the same distribution of
+                       modifications as trying positions until a variation
+                       can be applied, but without giving up after 10 tries,
+                       so a value which has a variation is always modified.
+                       Default is False (positions are tried at most 10
+                       times).
+
+     A candidate cache (see base class argument 'candidate_cache') can only
+     be used with a position function with registered position weights.
   """
 
+  # Empty strings cannot be modified, so 'corrupt_values' skips them
+  #
+  skip_empty_values = True
+
+  has_candidates = True
+
+  max_try = 10  # Maximum number of tries to find an OCR modification at a
+                # randomly selected position (without the match index)
+
   # ---------------------------------------------------------------------------
 
   def __init__(self, **kwargs):
@@ -50,6 +82,8 @@ class CorruptValueOCR(CorruptValue):
     self.has_header_line =  None
     self.unicode_encoding = None
     self.ocr_val_dict =     {}  # The dictionary to hold the OCR variations
+    self.match_index =      False
+    self.automaton =        None
     self.name =             'OCR value'
 
     # Process all keyword arguments
@@ -70,6 +104,10 @@ class CorruptValueOCR(CorruptValue):
         base_functions.check_is_non_empty_string('unicode_encoding', value)
         self.unicode_encoding = value
 
+      elif (keyword.startswith('match')):
+        base_functions.check_is_flag('match_index', value)
+        self.match_index = value
+
       else:
         base_kwargs[keyword] = value
 
@@ -120,9 +158,22 @@ class CorruptValueOCR(CorruptValue):
       this_org_val_list.append(org_val)
       self.ocr_val_dict[var_val] = this_org_val_list
 
+    # Compile the match index, only values of one to three characters are
+    # ever looked up at a position
+    #
+    if (self.match_index == True):
+      if (position_functions.has_position_weights(self.position_function) \
+          == False):
+        raise Exception('No position weights registered for the position ' + \
+                        'function, which are needed for "match_index"')
+
+      self.automaton = AhoCorasick([ocr_org_val for ocr_org_val in \
+                                    self.ocr_val_dict if \
+                                    len(ocr_org_val) <= 3])
+
   # ---------------------------------------------------------------------------
 
-  def corrupt_value(self, in_str):
+  def corrupt_value(self, in_str, rng=None):
     """Method which corrupts the given input string by replacing a single
        character or a sequence of characters with an OCR variation at a
        position randomly selected by the position function.
@@ -130,11 +181,19 @@ class CorruptValueOCR(CorruptValue):
        If there are several OCR variations then one will be randomly chosen.
     """
 
+    if (rng == None):
+      rng = random
+
     if (len(in_str) == 0):  # Empty string, no modification possible
       return in_str
 
-    max_try = 10  # Maximum number of tries to find an OCR modification at a
-                  # randomly selected position
+    if (self.candidate_cache != None):
+      return self.candidate_cache.draw(self, in_str, rng)
+
+    if (self.automaton != None):
+      return self.corrupt_value_indexed(in_str, rng)
+
+    max_try = self.max_try
 
     done_ocr_mod = False  # A flag, set to True once a modification is done
     try_num =      0
@@ -143,16 +202,20 @@ class CorruptValueOCR(CorruptValue):
 
     while ((done_ocr_mod == False) and (try_num < max_try)):
 
-      mod_pos = self.position_function(mod_str)
+      mod_pos = self.select_position(mod_str, rng)
 
-      # Try one to three characters at selected position
+      # Try one to three characters at selected position (kept in this order,
+      # rather than in a set, so the result does not depend on string hashing)
       #
-      ocr_org_char_set = set([mod_str[mod_pos], mod_str[mod_pos:mod_pos+2], \
-                              mod_str[mod_pos:mod_pos+3]])
+      ocr_org_char_list = []
+      for ocr_org_char in [mod_str[mod_pos], mod_str[mod_pos:mod_pos+2],
+                           mod_str[mod_pos:mod_pos+3]]:
+        if (ocr_org_char not in ocr_org_char_list):
+          ocr_org_char_list.append(ocr_org_char)
 
       mod_options = []  # List of possible modifications that can be applied
 
-      for ocr_org_char in ocr_org_char_set:
+      for ocr_org_char in ocr_org_char_list:
         if ocr_org_char in self.ocr_val_dict:
           ocr_var_list = self.ocr_val_dict[ocr_org_char]
           for mod_val in ocr_var_list:
@@ -162,7 +225,7 @@ class CorruptValueOCR(CorruptValue):
 
         # Randomly select one of the possible modifications that can be applied
         #
-        mod_to_apply = random.choice(mod_options)
+        mod_to_apply = rng.choice(mod_options)
         assert mod_to_apply[0] in list(self.ocr_val_dict.keys())
         assert mod_to_apply[2] in list(self.ocr_val_dict.keys())
 
@@ -174,4 +237,152 @@ class CorruptValueOCR(CorruptValue):
       else:
         try_num += 1
 
-    return mod_str
\ No newline at end of file
+    return mod_str
+
+  # ---------------------------------------------------------------------------
+
+  def corrupt_value_indexed(self, in_str, rng):
+    """Corrupt the given (non-empty) input string using the match index:
+       find all (position, length) matches of OCR values, sample a position
+       with a match weighted by the position function, and apply one of the
+       variations of the values matching at this position.
+    """
+
+    pos_option_dict = {}  # Keys are positions, values lists of modifications
+
+    for (mod_pos, ocr_org_len) in self.automaton.find_all(in_str):
+      ocr_org_char = in_str[mod_pos:mod_pos+ocr_org_len]
+      mod_option_list = pos_option_dict.setdefault(mod_pos, [])
+      for mod_val in self.ocr_val_dict[ocr_org_char]:
+        mod_option_list.append([ocr_org_char, ocr_org_len, mod_val])
+
+    weight_list = position_functions.position_weights(self.position_function,
+                                                      in_str)
+
+    pos_list = [mod_pos for mod_pos in pos_option_dict if \
+                weight_list[mod_pos] > 0.0]
+
+    if (pos_list == []):  # No modification possible
+      return in_str
+
+    # Sort the positions, and the modifications by the length of their value
+    # (as when positions are tried), so the result only depends on the random
+    # numbers drawn
+    #
+    pos_list.sort()
+
+    mod_pos = rng.choices(pos_list, weights=[weight_list[mod_pos] for \
+                                             mod_pos in pos_list])[0]
+
+    mod_option_list = sorted(pos_option_dict[mod_pos], key=lambda mod_option: \
+                             mod_option[1])
+    mod_to_apply = rng.choice(mod_option_list)
+
+    return in_str[:mod_pos] + mod_to_apply[2] + \
+           in_str[mod_pos+mod_to_apply[1]:]
+
+  # ---------------------------------------------------------------------------
+
+  def candidates(self, in_str):
+    """Return the possible modified values of the given input string with
+       their probabilities (see the base class). At each try a position is
+       selected with the probability given by the position weights, and one
+       of the OCR variations of one to three characters at this position is
+       applied. Without the match index the value is left unchanged if all
+       tries fail, with it positions without variations are never selected.
+    """
+
+    if (len(in_str) == 0):
+      return [(in_str, 1.0)]
+
+    weight_list = position_functions.position_weights(self.position_function,
+                                                      in_str)
+    weight_sum =  sum(weight_list)
+
+    mod_list =  []   # (position, probability per try, list of modifications)
+    fail_prob = 0.0  # Probability that a try fails
+
+    for mod_pos in range(len(in_str)):
+      mod_option_list = []
+
+      for ocr_org_len in [1, 2, 3]:
+        ocr_org_char = in_str[mod_pos:mod_pos+ocr_org_len]
+        if ((len(ocr_org_char) == ocr_org_len) and \
+            (ocr_org_char in self.ocr_val_dict)):
+          for mod_val in self.ocr_val_dict[ocr_org_char]:
+            mod_option_list.append((ocr_org_len, mod_val))
+
+      if (mod_option_list != []):
+        mod_list.append((mod_pos, weight_list[mod_pos] / weight_sum,
+                         mod_option_list))
+      else:
+        fail_prob += weight_list[mod_pos] / weight_sum
+
+    # Probability that a modification is done (at any of the tries) for a
+    # modification with probability 1.0 per try
+    #
+    if (fail_prob >= 1.0):
+      done_factor =    0.0
+      unchanged_prob = 1.0
+    elif (self.automaton != None):
+      done_factor =    1.0 / (1.0 - fail_prob)
+      unchanged_prob = 0.0
+    else:
+      done_factor =    (1.0 - fail_prob**self.max_try) / (1.0 - fail_prob)
+      unchanged_prob = fail_prob**self.max_try
+
+    cand_prob_dict = {}
+
+    for (mod_pos, try_prob, mod_option_list) in mod_list:
+      option_prob = try_prob * done_factor / len(mod_option_list)
+      for (ocr_org_len, mod_val) in mod_option_list:
+        mod_str = in_str[:mod_pos] + mod_val + in_str[mod_pos+ocr_org_len:]
+        cand_prob_dict[mod_str] = cand_prob_dict.get(mod_str, 0.0) + \
+                                  option_prob
+
+    if (unchanged_prob > 0.0):
+      cand_prob_dict[in_str] = cand_prob_dict.get(in_str, 0.0) + \
+                               unchanged_prob
+
+    cand_list = [(cand_val, cand_prob) for (cand_val, cand_prob) in \
+                 cand_prob_dict.items() if (cand_prob > 0.0)]
+
+    if (cand_list == []):  # No modification possible
+      return [(in_str, 1.0)]
+
+    return cand_list
+
+  # ---------------------------------------------------------------------------
+
+  def set_candidate_cache(self, cache):
+    """Set the candidate cache, the candidates need the position weights
+       of the position function.
+    """
+
+    if ((cache != None) and \
+        (position_functions.has_position_weights(self.position_function) \
+         == False)):
+      raise Exception('No position weights registered for the position ' + \
+                      'function, which are needed for "candidate_cache"')
+
+    CorruptValue.set_candidate_cache(self, cache)
+
+  # ---------------------------------------------------------------------------
+
+  def can_corrupt(self, in_str):
+    """A value can only be modified if it contains a sequence of one to
+       three characters which has an OCR variation.
+    """
+
+    if (self.automaton != None):
+      return self.automaton.has_match(in_str)
+
+    ocr_val_dict = self.ocr_val_dict
+
+    for pos in range(len(in_str)):
+      for seq_len in [1, 2, 3]:
+        if ((pos + seq_len <= len(in_str)) and \
+            (in_str[pos:pos+seq_len] in ocr_val_dict)):
+          return True
+
+    return False
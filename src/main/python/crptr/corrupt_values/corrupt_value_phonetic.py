@@ -1,6 +1,11 @@
+import csv
+import gzip
+import hashlib
 import random
 
 from crptr import base_functions
+from crptr import position_functions
+from crptr.phonetic_rules import PhoneticRules
 from crptr.corrupt_values.base import CorruptValue
 
 
@@ -36,6 +41,11 @@ class CorruptValuePhonetic(CorruptValue):
      For a given input string, one of the possible phonetic modifications will
      be randomly selected without the use of the position function.
 
+     The rules are compiled when the look-up file is loaded (see module
+     'phonetic_rules'), so only the rules whose original character sequence
+     occurs in a string are checked, with the same result as checking all
+     rules of the table on it.
+
      The additional arguments (besides the base class argument
      'position_function') that have to be set when this attribute type is
      initialised are:
@@ -49,10 +59,27 @@ class CorruptValuePhonetic(CorruptValue):
 
      unicode_encoding  The Unicode encoding (a string name) of the file.
 
+     The optional argument is:
+
+     variant_table_file_name  Name of a phonetic variant table file written
+                              with 'save_variant_table' (for the same
+                              phonetic lookup file), which holds the values
+                              resulting from all modifications possible for
+                              a list of values (such as the distinct names
+                              of a population). For these values no rules
+                              need to be checked, for other values they are
+                              checked as usual. Default is None (no table).
+
      Note that the 'position_function' is not required by this corruptor
      method.
   """
 
+  # Empty strings cannot be modified, so 'corrupt_values' skips them
+  #
+  skip_empty_values = True
+
+  has_candidates = True
+
   # ---------------------------------------------------------------------------
 
   def __init__(self, **kwargs):
@@ -64,10 +91,11 @@ class CorruptValuePhonetic(CorruptValue):
     self.has_header_line =  None
     self.unicode_encoding = None
     self.replace_table =    []
+    self.rules =            None  # Compiled rules, see 'phonetic_rules'
+    self.variant_dict =     {}    # Variants of the values in a variant table
     self.name =             'Phonetic value'
 
-    def dummy_position(s):  # Define a dummy position function
-      return 0
+    variant_table_file_name = None
 
     # Process all keyword arguments
     #
@@ -87,10 +115,15 @@ class CorruptValuePhonetic(CorruptValue):
         base_functions.check_is_non_empty_string('unicode_encoding', value)
         self.unicode_encoding = value
 
+      elif (keyword.startswith('variant')):
+        base_functions.check_is_non_empty_string('variant_table_file_name',
+                                                 value)
+        variant_table_file_name = value
+
       else:
         base_kwargs[keyword] = value
 
-    base_kwargs['position_function'] = dummy_position
+    base_kwargs['position_function'] = position_functions.position_mod_none
 
     CorruptValue.__init__(self, base_kwargs)  # Process base arguments
 
@@ -125,17 +158,22 @@ class CorruptValuePhonetic(CorruptValue):
                            (self.lookup_file_name, str(rec_list)))
       self.replace_table.append(val_tuple)
 
+    self.rules = PhoneticRules(self.replace_table)
+
+    if (variant_table_file_name != None):
+      self.load_variant_table(variant_table_file_name)
+
   # ---------------------------------------------------------------------------
 
   def __apply_change__(self, in_str, ch):
-    """Helper function which will apply the selected change to the input
-       string.
+    """Helper function which will apply the selected change, an (original
+       pattern, new pattern, where) tuple, to the input string.
 
        Developed by Agus Pudjijono, ANU, 2008.
     """
 
     work_str = in_str
-    list_ch = ch.split('>')
+    list_ch = ch
     subs = list_ch[1]
     if (list_ch[1] == '@'): # @ is blank
       subs = ''
@@ -501,7 +539,34 @@ class CorruptValuePhonetic(CorruptValue):
 
   # ---------------------------------------------------------------------------
 
-  def corrupt_value(self, in_str):
+  def __change_list__(self, in_str):
+    """Helper function which returns the list of possible phonetic
+       modifications, as (original pattern, new pattern, where) tuples, for
+       the given (non-empty) input string, or [None] if no modification is
+       possible.
+
+       The modifications are found with the compiled rules, except for
+       strings with a comma, which '__get_transformation__' cannot tell
+       apart from the modifications it returns, and whose modifications are
+       therefore still taken from its result.
+    """
+
+    if (',' not in in_str):
+      return self.rules.changes(in_str) or [None]
+
+    # Get the possible phonetic modifications for this input string
+    #
+    phonetic_changes = self.__get_transformation__(in_str)
+
+    tmp_str = phonetic_changes.split(',')
+    pc = tmp_str[1][:-1] # Remove the last ';'
+
+    return [change_op.split('>') if (change_op != '') else None for \
+            change_op in pc.split(';')]
+
+  # ---------------------------------------------------------------------------
+
+  def corrupt_value(self, in_str, rng=None):
     """Method which corrupts the given input string by applying a phonetic
        modification.
 
@@ -509,25 +574,153 @@ class CorruptValuePhonetic(CorruptValue):
        selected.
     """
 
+    if (rng == None):
+      rng = random
+
     if (len(in_str) == 0):  # Empty string, no modification possible
       return in_str
 
-    # Get the possible phonetic modifications for this input string
-    #
-    phonetic_changes = self.__get_transformation__(in_str)
+    if (self.candidate_cache != None):
+      return self.candidate_cache.draw(self, in_str, rng)
+
+    variant_list = self.variant_dict.get(in_str)
+    if (variant_list != None):  # Value in the variant table
+      return rng.choice(variant_list)
+
+    list_pc = self.__change_list__(in_str)
 
     mod_str = in_str
 
-    if (',' in phonetic_changes):  # Several modifications possible
-      tmp_str = phonetic_changes.split(',')
-      pc = tmp_str[1][:-1] # Remove the last ';'
-      list_pc = pc.split(';')
-      change_op = random.choice(list_pc)
-      if (change_op != ''):
-        mod_str = self.__apply_change__(in_str, change_op)
-        #print in_str, mod_str, change_op
+    change_op = rng.choice(list_pc)
+    if (change_op != None):
+      mod_str = self.__apply_change__(in_str, change_op)
+      #print in_str, mod_str, change_op
 
     return mod_str
 
+  # ---------------------------------------------------------------------------
+
+  def candidates(self, in_str):
+    """Return the possible modified values of the given input string with
+       their probabilities (see the base class), each possible phonetic
+       modification is equally likely.
+    """
+
+    if (len(in_str) == 0):
+      return [(in_str, 1.0)]
+
+    variant_list = self.variants(in_str)
+
+    variant_prob = 1.0 / len(variant_list)
+
+    cand_prob_dict = {}
+
+    for mod_str in variant_list:
+      cand_prob_dict[mod_str] = cand_prob_dict.get(mod_str, 0.0) + variant_prob
+
+    return list(cand_prob_dict.items())
+
+  # ---------------------------------------------------------------------------
+
+  def variants(self, in_str):
+    """Return a tuple with the value resulting from each possible phonetic
+       modification of the given (non-empty) input string, in the order in
+       which 'corrupt_value' selects from them (a tuple with the input string
+       itself if no modification is possible), from the variant table if the
+       input string is in it.
+    """
+
+    variant_list = self.variant_dict.get(in_str)
+
+    if (variant_list != None):
+      return variant_list
+
+    return tuple([self.__apply_change__(in_str, change_op) if \
+                  (change_op != None) else in_str for change_op in \
+                  self.__change_list__(in_str)])
+
+  # ---------------------------------------------------------------------------
+
+  def rules_digest(self):
+    """Return a digest of the phonetic rules, stored in variant tables so a
+       table written for other rules is not used.
+    """
+
+    return hashlib.sha1(repr(self.replace_table).encode('utf-8')).hexdigest()
+
+  # ---------------------------------------------------------------------------
+
+  def save_variant_table(self, file_name, in_str_list):
+    """Write a variant table with the variants (see 'variants') of the
+       distinct values in the given list to the file with the given name (a
+       gzip compressed file if the name ends with '.gz'). Empty values, and
+       values with a comma (see '__change_list__'), are left out. Return the
+       number of values written.
+
+       The file is a CSV file whose first line holds the digest of the
+       phonetic rules, followed by a row per value with the value and its
+       variants (only the value if no modification is possible).
+    """
+
+    base_functions.check_is_non_empty_string('file_name', file_name)
+
+    in_str_set = set([in_str for in_str in in_str_list if \
+                      (in_str != '') and (',' not in in_str)])
+
+    with open_table_file(file_name, 'w') as out_file:
+      out_file.write('# %s\n' % (self.rules_digest()))
+
+      csv_writer = csv.writer(out_file, lineterminator='\n')
+
+      for in_str in sorted(in_str_set):
+        variant_list = self.variants(in_str)
+
+        if (variant_list == (in_str,)):  # No modification possible
+          csv_writer.writerow([in_str])
+        else:
+          csv_writer.writerow([in_str] + list(variant_list))
+
+    return len(in_str_set)
+
+  # ---------------------------------------------------------------------------
+
+  def load_variant_table(self, file_name):
+    """Load the variant table in the file with the given name (see
+       'save_variant_table'), which must have been written for the same
+       phonetic rules.
+    """
+
+    base_functions.check_is_non_empty_string('file_name', file_name)
+
+    with open_table_file(file_name, 'r') as in_file:
+      digest_line = in_file.readline().strip()
+
+      if (digest_line != '# ' + self.rules_digest()):
+        raise Exception('Phonetic variant table %s was not written for ' % \
+                        (file_name) + 'the phonetic lookup file %s' % \
+                        (self.lookup_file_name))
+
+      variant_dict = {}
+
+      for rec_list in csv.reader(in_file):
+        if (len(rec_list) == 1):
+          variant_dict[rec_list[0]] = (rec_list[0],)
+        else:
+          variant_dict[rec_list[0]] = tuple(rec_list[1:])
+
+    self.variant_dict = variant_dict
+
+# =============================================================================
+
+def open_table_file(file_name, mode):
+  """Open the variant table file with the given name for reading ('r') or
+     writing ('w'), compressed with gzip if the name ends with '.gz'.
+  """
+
+  if (file_name.endswith('.gz')):
+    return gzip.open(file_name, mode + 't', encoding='utf-8', newline='')
+
+  return open(file_name, mode, encoding='utf-8', newline='')
+
 def is_ascii(s):
   return all(ord(c) < 128 for c in s)
\ No newline at end of file
@@ -0,0 +1,108 @@
+# Import necessary modules
+import crptr.sampling as sampling
+
+# =============================================================================
+
+class CorruptorFilter():
+  """Selects the corruptor to apply to the value of an attribute only among
+     the corruptors of the attribute that can change the value (see method
+     'can_corrupt' of the corruptor base classes), with their probabilities
+     renormalised, so no tries are wasted on corruptors that are certain to
+     return the value unchanged.
+
+     For each attribute the corruptors that can change a value are kept as a
+     bitmap (an integer with one bit per (probability, corruptor) pair of the
+     attribute in the 'CorruptionPlan'), computed once per distinct value,
+     and an alias table is built once per distinct bitmap. If all corruptors
+     can change a value the alias table of the plan is used, so the same
+     corruptor is selected as without a filter.
+
+     Record level corruptors (see module 'corrupt_records') are checked for
+     each record, as records are not cached.
+
+     The arguments that can be set when a CorruptorFilter instance is
+     initialised are:
+
+     corruption_plan  The 'CorruptionPlan' (see module 'plan') the corruptor
+                      identifiers refer to.
+     max_cache_size   The maximum number of distinct values for which bitmaps
+                      are kept per attribute, default is 100000. Once reached
+                      the bitmaps of the attribute are dropped.
+  """
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, corruption_plan, max_cache_size=100000):
+    """Constructor, create empty caches.
+    """
+
+    self.plan = corruption_plan
+    self.max_cache_size = max_cache_size
+
+    self.value_mask_dict_list = [{} for attr_id in \
+                                 range(corruption_plan.num_attrs)]
+    self.full_mask_list = [(1 << len(prob_corruptor_tuple)) - 1 for \
+                           prob_corruptor_tuple in \
+                           corruption_plan.attr_corruptor_prob_tuple]
+    self.alias_table_dict = {}  # Keys are (attribute identifier, bitmap)
+
+  # ---------------------------------------------------------------------------
+
+  def applicable_mask(self, attr_id, value):
+    """Return the bitmap of the corruptors of the given attribute which can
+       change the given value (or record, for the record level attribute).
+    """
+
+    corruption_plan = self.plan
+
+    if (corruption_plan.attr_is_record_tuple[attr_id] == False):
+      value_mask_dict = self.value_mask_dict_list[attr_id]
+      mask = value_mask_dict.get(value)
+      if (mask != None):
+        return mask
+
+    corruptor_tuple = corruption_plan.corruptor_tuple
+
+    mask = 0
+    for (i, (corruptor_prob, corruptor_id)) in \
+        enumerate(corruption_plan.attr_corruptor_prob_tuple[attr_id]):
+      if (corruptor_tuple[corruptor_id].can_corrupt(value) == True):
+        mask |= (1 << i)
+
+    if (corruption_plan.attr_is_record_tuple[attr_id] == False):
+      if (len(value_mask_dict) >= self.max_cache_size):
+        value_mask_dict.clear()
+      value_mask_dict[value] = mask
+
+    return mask
+
+  # ---------------------------------------------------------------------------
+
+  def sample(self, attr_id, value, rng):
+    """Return the identifier of a corruptor of the given attribute that can
+       change the given value, sampled with renormalised probabilities using
+       one random number drawn from the given random number generator, or
+       None if no corruptor of the attribute can change the value (in which
+       case no random number is drawn).
+    """
+
+    mask = self.applicable_mask(attr_id, value)
+
+    if (mask == self.full_mask_list[attr_id]):
+      return self.plan.attr_corruptor_alias_tuple[attr_id].sample(rng)
+
+    if (mask == 0):
+      return None
+
+    alias_table = self.alias_table_dict.get((attr_id, mask))
+
+    if (alias_table == None):
+      alias_table = sampling.AliasTable([prob_corruptor_pair for \
+                      (i, prob_corruptor_pair) in \
+                      enumerate(self.plan.attr_corruptor_prob_tuple[attr_id]) \
+                      if (mask & (1 << i))])
+      self.alias_table_dict[(attr_id, mask)] = alias_table
+
+    return alias_table.sample(rng)
+
+# =============================================================================
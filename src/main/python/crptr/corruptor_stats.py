@@ -0,0 +1,285 @@
+# Import necessary modules
+import array
+import math
+
+# Call times are counted in a histogram of logarithmically spaced buckets,
+# each 'TIME_BUCKET_RATIO' times as wide as the previous one, starting at
+# 'MIN_BUCKET_TIME' seconds (so percentiles are accurate to within this
+# ratio, and histograms can be merged by adding them)
+#
+MIN_BUCKET_TIME =   1.0e-7
+TIME_BUCKET_RATIO = 1.25
+NUM_TIME_BUCKETS =  100  # Up to about 500 seconds
+
+LOG_BUCKET_RATIO = math.log(TIME_BUCKET_RATIO)
+
+# =============================================================================
+
+class CorruptorStats():
+  """Statistics of the corruptors applied while duplicates are generated,
+     kept in arrays with one slot per corruptor identifier of a
+     'CorruptionPlan' (see module 'plan'), so that counting a call costs a
+     few array updates only:
+
+     call_array       The number of calls of each corruptor.
+     unchanged_array  The number of calls which returned the value (or
+                      record) unchanged, i.e. tries that were wasted.
+     timed_array      The number of calls that were timed. If 'timer_every'
+                      is a number, one in so many calls of each corruptor is
+                      timed, if it is None no calls are timed.
+     time_array       The total time of the timed calls (in seconds).
+     time_histo_list  For each corruptor an array with the number of timed
+                      calls in each time bucket (see above).
+
+     Also counted are the number of attempts to generate a duplicate, and
+     the number of attempts that resulted in a duplicate which was the same
+     as the original record or another duplicate. For the candidate caches
+     of the corruptors (see module 'candidate_cache'), whose hits, misses
+     and evictions are counted by the caches themselves, the counts of
+     caches in worker processes are kept in 'cache_count_list'.
+
+     Statistics collected separately (for example in worker processes) can be
+     combined with 'merge'.
+  """
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, corruption_plan, timer_every=None, num_caches=0):
+    """Constructor, create empty statistics for the corruptors of the given
+       plan, and the given number of candidate caches.
+    """
+
+    num_corruptors = len(corruption_plan.corruptor_tuple)
+
+    self.timer_every = timer_every
+
+    self.call_array =      array.array('q', [0]) * num_corruptors
+    self.unchanged_array = array.array('q', [0]) * num_corruptors
+    self.timed_array =     array.array('q', [0]) * num_corruptors
+    self.time_array =      array.array('d', [0.0]) * num_corruptors
+    self.time_histo_list = [array.array('q', [0]) * NUM_TIME_BUCKETS \
+                            for i in range(num_corruptors)]
+
+    self.num_dup_attempts = 0
+    self.num_same_dups =    0
+
+    self.cache_count_list = [[0, 0, 0] for i in range(num_caches)]
+
+  # ---------------------------------------------------------------------------
+
+  def add_time(self, corruptor_id, call_time):
+    """Count a timed call of the given corruptor which took the given time
+       (in seconds).
+    """
+
+    self.add_batch_time(corruptor_id, call_time, 1)
+
+  # ---------------------------------------------------------------------------
+
+  def add_batch_time(self, corruptor_id, batch_time, num_values):
+    """Count a timed batch call of the given corruptor (see 'corrupt_values'
+       of the corruptor base classes) which corrupted the given number of
+       values in the given time (in seconds), as that number of calls which
+       each took the mean time per value.
+    """
+
+    if (num_values == 0):
+      return
+
+    call_time = batch_time / num_values
+
+    self.timed_array[corruptor_id] += num_values
+    self.time_array[corruptor_id] += batch_time
+
+    if (call_time <= MIN_BUCKET_TIME):
+      bucket = 0
+    else:
+      bucket = min(int(math.log(call_time / MIN_BUCKET_TIME) / \
+                       LOG_BUCKET_RATIO), NUM_TIME_BUCKETS-1)
+
+    self.time_histo_list[corruptor_id][bucket] += num_values
+
+  # ---------------------------------------------------------------------------
+
+  def add_cache_counts(self, cache_id, count_list):
+    """Add the given hits, misses and evictions of a candidate cache in a
+       worker process.
+    """
+
+    cache_count_list = self.cache_count_list[cache_id]
+
+    for (i, count) in enumerate(count_list):
+      cache_count_list[i] += count
+
+  # ---------------------------------------------------------------------------
+
+  def merge(self, other):
+    """Add the statistics of the given other object (for the same corruption
+       plan) to the statistics of this object.
+    """
+
+    for i in range(len(self.call_array)):
+      self.call_array[i] +=      other.call_array[i]
+      self.unchanged_array[i] += other.unchanged_array[i]
+      self.timed_array[i] +=     other.timed_array[i]
+      self.time_array[i] +=      other.time_array[i]
+
+      time_histo = self.time_histo_list[i]
+      for (bucket, count) in enumerate(other.time_histo_list[i]):
+        time_histo[bucket] += count
+
+    self.num_dup_attempts += other.num_dup_attempts
+    self.num_same_dups +=    other.num_same_dups
+
+    for (cache_id, count_list) in enumerate(other.cache_count_list):
+      self.add_cache_counts(cache_id, count_list)
+
+  # ---------------------------------------------------------------------------
+
+  def time_percentile(self, corruptor_id, percentile):
+    """Return the given percentile (between 0 and 100) of the time of the
+       timed calls of the given corruptor (the upper end of the time bucket
+       it falls into), or None if no calls were timed.
+    """
+
+    num_timed = self.timed_array[corruptor_id]
+
+    if (num_timed == 0):
+      return None
+
+    rank = max(1, int(math.ceil(num_timed * percentile / 100.0)))
+
+    count = 0
+    for (bucket, bucket_count) in enumerate(self.time_histo_list[corruptor_id]):
+      count += bucket_count
+      if (count >= rank):
+        return MIN_BUCKET_TIME * (TIME_BUCKET_RATIO ** (bucket+1))
+
+  # ---------------------------------------------------------------------------
+
+  def as_dict(self, corruption_plan, cache_list=None):
+    """Return the statistics as a dictionary, with the attempts to generate
+       duplicates and a list with a dictionary of statistics per corruptor of
+       the given plan (in the order of their identifiers), including the
+       attributes it is used for. Times are in seconds, the estimated total
+       time extrapolates the timed calls to all calls.
+
+       If a list of candidate caches is given (in the order of the counts in
+       'cache_count_list'), their sizes and counts (including those in
+       worker processes) are given in a list as well.
+    """
+
+    attr_name_list_list = [[] for corruptor in corruption_plan.corruptor_tuple]
+    for attr_id in corruption_plan.attr_id_col_order_tuple:
+      attr_name = corruption_plan.attr_name_tuple[attr_id]
+      for corruptor_id in \
+          corruption_plan.attr_corruptor_alias_tuple[attr_id].item_list:
+        attr_name_list_list[corruptor_id].append(attr_name)
+
+    corruptor_stats_list = []
+
+    for (corruptor_id, corruptor) in \
+        enumerate(corruption_plan.corruptor_tuple):
+      num_calls = self.call_array[corruptor_id]
+      num_timed = self.timed_array[corruptor_id]
+
+      if (num_timed > 0):
+        mean_time = self.time_array[corruptor_id] / num_timed
+        total_time = mean_time * num_calls
+      else:
+        mean_time =  None
+        total_time = None
+
+      if (num_calls > 0):
+        unchanged_ratio = float(self.unchanged_array[corruptor_id]) / num_calls
+      else:
+        unchanged_ratio = None
+
+      corruptor_stats_list.append({
+        'name':            getattr(corruptor, 'name', None),
+        'class':           type(corruptor).__name__,
+        'attributes':      attr_name_list_list[corruptor_id],
+        'calls':           num_calls,
+        'unchanged':       self.unchanged_array[corruptor_id],
+        'unchanged_ratio': unchanged_ratio,
+        'timed_calls':     num_timed,
+        'mean_time':       mean_time,
+        'total_time':      total_time,
+        'p50_time':        self.time_percentile(corruptor_id, 50),
+        'p90_time':        self.time_percentile(corruptor_id, 90),
+        'p99_time':        self.time_percentile(corruptor_id, 99)})
+
+    stats_dict = {'dup_attempts': self.num_dup_attempts,
+                  'same_dups':    self.num_same_dups,
+                  'corruptors':   corruptor_stats_list}
+
+    if (cache_list):
+      cache_stats_list = []
+
+      for (cache_id, cache) in enumerate(cache_list):
+        (num_hits, num_misses, num_evictions) = \
+                   [count + worker_count for (count, worker_count) in \
+                    zip(cache.counts(), self.cache_count_list[cache_id])]
+
+        if (num_hits + num_misses > 0):
+          hit_ratio = float(num_hits) / (num_hits + num_misses)
+        else:
+          hit_ratio = None
+
+        cache_stats_list.append({'max_size':  cache.max_size,
+                                 'hits':      num_hits,
+                                 'misses':    num_misses,
+                                 'evictions': num_evictions,
+                                 'hit_ratio': hit_ratio})
+
+      stats_dict['candidate_caches'] = cache_stats_list
+
+    return stats_dict
+
+# =============================================================================
+
+def format_stats(stats_dict):
+  """Return the given statistics dictionary (as returned by 'as_dict')
+     formatted as a human readable table, with the corruptors sorted by their
+     estimated total time (slowest first).
+  """
+
+  def sort_key(corruptor_stats):
+    return (corruptor_stats['total_time'] or 0.0, corruptor_stats['calls'])
+
+  line_list = ['Duplicate attempts: %d (%d same as an existing record)' % \
+               (stats_dict['dup_attempts'], stats_dict['same_dups']),
+               '%-24s %-26s %10s %10s %10s %10s %10s' % ('Corruptor',
+               'Attributes', 'Calls', 'Unchanged', 'Mean (us)', 'P99 (us)',
+               'Total (ms)')]
+
+  for corruptor_stats in sorted(stats_dict['corruptors'], key=sort_key,
+                                reverse=True):
+    attr_str = ', '.join(corruptor_stats['attributes'])
+    if (len(attr_str) > 26):
+      attr_str = attr_str[:23] + '...'
+
+    time_str_list = []
+    for (key, scale) in [('mean_time', 1.0e6), ('p99_time', 1.0e6),
+                         ('total_time', 1.0e3)]:
+      if (corruptor_stats[key] == None):
+        time_str_list.append('-')
+      else:
+        time_str_list.append('%.1f' % (corruptor_stats[key] * scale))
+
+    line_list.append('%-24s %-26s %10d %9.1f%% %10s %10s %10s' % \
+                     ((corruptor_stats['name'] or corruptor_stats['class'])[:24],
+                      attr_str, corruptor_stats['calls'],
+                      100.0 * (corruptor_stats['unchanged_ratio'] or 0.0),
+                      time_str_list[0], time_str_list[1], time_str_list[2]))
+
+  for cache_stats in stats_dict.get('candidate_caches', []):
+    line_list.append('Candidate cache (max size %d): %d hits, %d misses ' % \
+                     (cache_stats['max_size'], cache_stats['hits'],
+                      cache_stats['misses']) + '(%.1f%% hits), %d evictions' % \
+                     (100.0 * (cache_stats['hit_ratio'] or 0.0),
+                      cache_stats['evictions']))
+
+  return '\n'.join(line_list) + '\n'
+
+# =============================================================================
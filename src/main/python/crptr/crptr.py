@@ -1,10 +1,25 @@
 # -----------------------------------------------------------------------------
 # Import necessary modules
 
-import math
+import array
+import bisect
+import collections
+import concurrent.futures
+import itertools
 import random
+import time
 
 import crptr.base_functions as base_functions
+import crptr.corruptor_filter as corruptor_filter
+import crptr.corruptor_stats as corruptor_stats
+import crptr.distributions as distributions
+import crptr.dup_attempt as dup_attempt
+import crptr.dup_record as dup_record
+import crptr.event_log as event_log
+import crptr.manifest as manifest
+import crptr.plan as plan
+import crptr.random_streams as random_streams
+import crptr.sampling as sampling
 
 class Crptr:
   """Main Crptr class which provides methods to corrupt the records in a given
@@ -24,7 +39,10 @@ class Crptr:
 
      num_dup_dist           The probability distribution used to create 
                             duplicate records for a record (possible
-                            distributions are: 'uniform', 'poisson', 'zipf').
+                            distributions are: 'uniform', 'poisson', 'zipf',
+                            'geometric', 'negative_binomial', and any
+                            distribution registered in module
+                            'distributions').
 
      max_num_mod_per_attr   The maximum number of modifications to apply to a
                             single attribute.
@@ -55,6 +73,75 @@ class Crptr:
                             
                             An example of such a dictionary is given below.
 
+     The following arguments are optional:
+
+     event_log              An 'EventLog' object (see module 'event_log') to
+                            which the corruptions made are logged. If not given
+                            all events are logged as text to standard output.
+
+     manifest               A 'Manifest' object (see module 'manifest') to
+                            which the ground truth of each generated duplicate
+                            (its original, and the attribute, corruptor and
+                            values of each modification) is written. If not
+                            given no manifest is kept.
+
+     num_dup_params         A dictionary with parameters for the 'num_dup_dist'
+                            distribution, for example {'theta':0.5} for
+                            'zipf' or {'r':2.0, 'p':0.5} for
+                            'negative_binomial' (see module 'distributions').
+
+     max_dup_tries          The maximum number of attempts to generate a
+                            duplicate that is different from the original
+                            record and all its other duplicates, default 100.
+
+     stats_timer_every      Time one in this many calls of each corruptor for
+                            the corruptor statistics (see 'stats'), default
+                            100. If set to None no calls are timed (the calls
+                            are still counted).
+
+     dup_fail_policy        What to do if no different duplicate could be
+                            generated within 'max_dup_tries' attempts:
+                            'accept' (default) keeps the last attempt even
+                            though it is not different, 'skip' generates no
+                            further duplicates for the record, and 'log' does
+                            the same as 'skip' but also logs this at the
+                            'summary' level of the event log.
+
+     corruption_mode        How modifications are applied: 'interleaved'
+                            (default) selects and applies the modifications
+                            of one duplicate after the other, 'batched'
+                            selects the next modification of all duplicates
+                            of a shard of records and then applies each
+                            corruptor to all its values in a single call (see
+                            'generate_duplicates_batch'). With the same seed
+                            both modes generate the same duplicates.
+
+     attr_sampling          How the attributes to modify in a duplicate are
+                            selected: 'with_replacement' (default) samples
+                            attributes one after the other, skipping those
+                            already modified 'max_num_mod_per_attr' times,
+                            until 'num_mod_per_rec' attributes are modified or
+                            too many tries were made. 'without_replacement'
+                            instead draws a random order of all attributes
+                            (a weighted sample without replacement, see
+                            function 'weighted_order' in module 'sampling')
+                            and modifies each attribute once in this order
+                            until 'num_mod_per_rec' attributes are modified
+                            (attributes whose value is not changed are
+                            passed over), so no selections are rejected and
+                            fewer attributes are only modified if no further
+                            attributes can be.
+
+     filter_corruptors      If True, a corruptor is only selected for a value
+                            it can modify (see method 'can_corrupt' of the
+                            corruptors and module 'corruptor_filter'), with
+                            the probabilities of the other corruptors of the
+                            attribute renormalised. If no corruptor of the
+                            selected attribute can modify its value the try
+                            counts as unsuccessful. Default is False (so
+                            corruptors are selected as configured, even for
+                            values they cannot modify).
+
      Example for 'attr_mod_prob_dict':
 
      attr_mod_prob_dict = {'surname':0.4, 'address':0.6}
@@ -90,10 +177,19 @@ class Crptr:
     self.attribute_name_list =   None
     self.max_num_dup_per_rec =   None
     self.num_dup_dist =          None
+    self.num_dup_param_dict =    {}
     self.num_mod_per_rec =       None
     self.max_num_mod_per_attr =  None
     self.attr_mod_prob_dict =    None
     self.attr_mod_data_dict =    None
+    self.event_log =             None
+    self.manifest =              None
+    self.max_dup_tries =         100
+    self.dup_fail_policy =       'accept'
+    self.stats_timer_every =     100
+    self.corruption_mode =       'interleaved'
+    self.filter_corruptors =     False
+    self.attr_sampling =         'with_replacement'
 
     # Process the keyword arguments
     for (keyword, value) in list(kwargs.items()):
@@ -117,8 +213,12 @@ class Crptr:
         base_functions.check_is_positive('max_num_dup_per_rec', value)
         self.max_num_dup_per_rec = value
 
+      elif (keyword.startswith('num_dup_p')):
+        base_functions.check_is_dictionary('num_dup_params', value)
+        self.num_dup_param_dict = value
+
       elif (keyword.startswith('num_dup_')):
-        if (value not in ['uniform', 'poisson', 'zipf']):
+        if (value not in distributions.distribution_dict):
           raise Exception('Illegal value given for "num_dup_dist": %s' % \
                            (str(value)))
         self.num_dup_dist = value
@@ -141,6 +241,51 @@ class Crptr:
         base_functions.check_is_dictionary('attr_mod_data_dict', value)
         self.attr_mod_data_dict = value
 
+      elif (keyword.startswith('event_l')):
+        if (not isinstance(value, event_log.EventLog)):
+          raise Exception('Value of "event_log" is not an EventLog object: %s' \
+                          % (type(value)))
+        self.event_log = value
+
+      elif (keyword.startswith('manifest')):
+        if ((value != None) and (not isinstance(value, manifest.Manifest))):
+          raise Exception('Value of "manifest" is not a Manifest object: %s' \
+                          % (type(value)))
+        self.manifest = value
+
+      elif (keyword.startswith('max_dup_t')):
+        base_functions.check_is_integer('max_dup_tries', value)
+        base_functions.check_is_positive('max_dup_tries', value)
+        self.max_dup_tries = value
+
+      elif (keyword.startswith('stats_t')):
+        if (value != None):
+          base_functions.check_is_integer('stats_timer_every', value)
+          base_functions.check_is_positive('stats_timer_every', value)
+        self.stats_timer_every = value
+
+      elif (keyword.startswith('dup_fail')):
+        if (value not in ['accept', 'skip', 'log']):
+          raise Exception('Illegal value given for "dup_fail_policy": %s' % \
+                           (str(value)))
+        self.dup_fail_policy = value
+
+      elif (keyword.startswith('attr_s')):
+        if (value not in ['with_replacement', 'without_replacement']):
+          raise Exception('Illegal value given for "attr_sampling": %s' % \
+                           (str(value)))
+        self.attr_sampling = value
+
+      elif (keyword.startswith('filter_c')):
+        base_functions.check_is_flag('filter_corruptors', value)
+        self.filter_corruptors = value
+
+      elif (keyword.startswith('corruption_m')):
+        if (value not in ['interleaved', 'batched']):
+          raise Exception('Illegal value given for "corruption_mode": %s' % \
+                           (str(value)))
+        self.corruption_mode = value
+
       else:
         raise Exception('Illegal constructor argument keyword: "%s"' % (str(keyword)))
 
@@ -165,6 +310,9 @@ class Crptr:
     base_functions.check_is_dictionary('attr_mod_prob_dict', self.attr_mod_prob_dict)
     base_functions.check_is_dictionary('attr_mod_data_dict', self.attr_mod_data_dict)
 
+    if (self.event_log == None):
+      self.event_log = event_log.EventLog()
+
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     # Check if it is possible to generate the desired number of modified
     # (duplicate) corrupted records
@@ -180,69 +328,29 @@ class Crptr:
 
     # - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - - -
     # Create a distribution for the number of duplicates for an original record
-    num_dup = 1
-    prob_sum = 0.0
-    self.prob_dist_list = [(num_dup, prob_sum)]
-
-    if self.num_dup_dist == 'uniform' :
-      uniform_val = 1.0 / float(self.max_num_dup_per_rec)
-
-      for i in range(self.max_num_dup_per_rec-1):
-        num_dup += 1
-        self.prob_dist_list.append((num_dup,
-                                    uniform_val+self.prob_dist_list[-1][1]))
-
-    elif self.num_dup_dist == 'poisson' :
-
-      def fac(n):  # Factorial of an integer number (recursive calculation)
-        if (n > 1.0):
-          return n*fac(n - 1.0)
-        else:
-          return 1.0
-
-      poisson_num = []   # A list of poisson numbers
-      poisson_sum = 0.0  # The sum of all poisson number
-
-      # The mean (lambda) for the poisson numbers
-      mean = 1.0 + (float(self.number_of_mod_records) / float(self.number_of_org_records))
-
-      for i in range(self.max_num_dup_per_rec):
-        poisson_num.append((math.exp(-mean) * (mean ** i)) / fac(i))
-        poisson_sum += poisson_num[-1]
-
-      for i in range(self.max_num_dup_per_rec):  # Scale so they sum up to 1.0
-        poisson_num[i] = poisson_num[i] / poisson_sum
-
-      for i in range(self.max_num_dup_per_rec-1):
-        num_dup += 1
-        self.prob_dist_list.append((num_dup,
-                                    poisson_num[i]+self.prob_dist_list[-1][1]))
-
-    elif self.num_dup_dist == 'zipf' :
-      zipf_theta = 0.5
-
-      denom = 0.0
-      for i in range(self.number_of_org_records):
-        denom += (1.0 / (i+1) ** (1.0 - zipf_theta))
-
-      zipf_c = 1.0 / denom
-      zipf_num = []  # A list of Zipf numbers
-      zipf_sum = 0.0  # The sum of all Zipf number
-
-      for i in range(self.max_num_dup_per_rec):
-        zipf_num.append(zipf_c / ((i+1) ** (1.0 - zipf_theta)))
-        zipf_sum += zipf_num[-1]
-
-      for i in range(self.max_num_dup_per_rec):  # Scale so they sum up to 1.0
-        zipf_num[i] = zipf_num[i] / zipf_sum
-
-      for i in range(self.max_num_dup_per_rec-1):
-        num_dup += 1
-        self.prob_dist_list.append((num_dup,
-                                    zipf_num[i]+self.prob_dist_list[-1][1]))
+    # (as a list of pairs of number of duplicates and the probability of
+    # fewer duplicates)
+    dup_ratio = float(self.number_of_mod_records) / \
+                float(self.number_of_org_records)
+    num_dup_param_tuple = tuple(sorted(self.num_dup_param_dict.items()))
+
+    dup_count_pmf = distributions.dup_count_pmf(self.num_dup_dist,
+                                                self.max_num_dup_per_rec,
+                                                dup_ratio, num_dup_param_tuple)
+
+    self.prob_dist_list = [(1, 0.0)]
+    for num_dup in range(2, self.max_num_dup_per_rec+1):
+      self.prob_dist_list.append((num_dup, dup_count_pmf[num_dup-2] + \
+                                           self.prob_dist_list[-1][1]))
+
+    # Alias table to sample the number of duplicates in constant time
+    #
+    self.num_dup_alias_table = distributions.dup_count_alias_table(
+                                     self.num_dup_dist, self.max_num_dup_per_rec,
+                                     dup_ratio, num_dup_param_tuple)
 
-    print('Probability distribution for number of duplicates per record:')
-    print(self.prob_dist_list)
+    self.event_log.log(('distribution', self.prob_dist_list))
+    self.event_log.flush()
 
     # Check probability list for attributes and dictionary for attributes - - -
     # if they sum to 1.0
@@ -288,11 +396,86 @@ class Crptr:
       self.attr_mod_prob_list.append([prob_sum, attr_name])
     #print self.attr_mod_prob_list
 
+    # Compile the attributes and corruptors into a plan with column indices
+    # and alias tables to select attributes, and for each attribute its
+    # corruptors, with a single random number (attributes and corruptors
+    # with probability 0.0 are dropped)
+    #
+    self.plan = plan.CorruptionPlan(self.attribute_name_list,
+                                    self.attr_mod_prob_dict,
+                                    self.attr_mod_data_dict)
+
+    # Selection of corruptors among those that can modify a value
+    #
+    if (self.filter_corruptors == True):
+      self.corruptor_filter = corruptor_filter.CorruptorFilter(self.plan)
+    else:
+      self.corruptor_filter = None
+
+    # The distinct candidate caches of the corruptors (see module
+    # 'candidate_cache'), whose counts are part of the statistics
+    #
+    self.candidate_cache_list = []
+    for corruptor in self.plan.corruptor_tuple:
+      cache = getattr(corruptor, 'candidate_cache', None)
+      if ((cache != None) and (not any([cache is check_cache for check_cache \
+                                        in self.candidate_cache_list]))):
+        self.candidate_cache_list.append(cache)
+
+    # Counters of calls, unchanged values and call times per corruptor
+    #
+    self.corruptor_stats = corruptor_stats.CorruptorStats(self.plan,
+                                                          self.stats_timer_every,
+                                                len(self.candidate_cache_list))
+
+  # ---------------------------------------------------------------------------
+
+  def stats(self):
+    """Return a dictionary with the statistics of the corruptors applied so
+       far: for each corruptor how often it was called, how often it returned
+       the value unchanged (a wasted try), and the mean, percentile and
+       estimated total time of its calls, as well as the number of attempts
+       to generate a duplicate (see module 'corruptor_stats'), and the hits,
+       misses and evictions of the candidate caches of the corruptors.
+    """
+
+    return self.corruptor_stats.as_dict(self.plan, self.candidate_cache_list)
+
   # ---------------------------------------------------------------------------
 
-  def corrupt_records(self, rec_dict):
+  def corrupt_records(self, rec_dict, num_workers=None, seed=None,
+                      start_shard=0, shard_done_fn=None):
     """Method to corrupt modify the records in the given record dictionary
        according to the settings of the data set corruptor.
+
+       The record dictionary can also be a 'RecordTable' (see module
+       'record_table'), which stores the records column by column and needs
+       a fraction of the memory of a dictionary of lists.
+
+       If a 'seed' is given, all random numbers are drawn from keyed random
+       number streams (see module 'random_streams') rather than from the
+       global 'random' module: the random numbers used for the duplicates of
+       an original record are derived from the seed, the record identifier,
+       the duplicate number and the attribute being modified only. The same
+       seed therefore results in the same corrupted records and log output,
+       independent of the order in which records are processed.
+
+       If 'num_workers' is given the duplicates are generated by the sharded
+       engine (see 'corrupt_shards') using this number of worker processes.
+       The result does not depend on the number of workers used. In the
+       'batched' corruption mode the sharded engine is always used (in this
+       process if 'num_workers' is not given).
+
+       Runs can be checkpointed and resumed at shard boundaries (the sharded
+       engine is then always used): if 'shard_done_fn' is given it is called
+       once the results of each shard have been added (and the event log and
+       manifest flushed) with the number of shards done so far, the shard and
+       the duplicates generated for it (as yielded by 'corrupt_shards'). If
+       'start_shard' is given, the duplicates are planned as usual but the
+       first so many shards are not corrupted, as their duplicates, events
+       and manifest entries are assumed to be kept from an earlier run with
+       the same seed (which must be given). The histogram of the planned
+       duplicates, logged before the first shard, is then not logged again.
     """
 
     # Check if number of records given is what is expected
@@ -300,260 +483,1111 @@ class Crptr:
     assert self.number_of_org_records == len(rec_dict), \
            'Illegal number of records to modify given'
 
-    # First generate for each original record the number of duplicates that are
-    # to be generated for it.
-    #
-    dup_rec_num_dict = {}  # Keys are the record identifiers of the original
-                           # records, value their number of duplicates
-    total_num_dups = 0     # Total number of duplicates generated
+    (num_workers, seed) = self.choose_engine(num_workers, seed, start_shard,
+                                             shard_done_fn)
+
+    (rec_index_array, num_dups_array) = self.plan_duplicates(seed)
 
     org_rec_id_list = list(rec_dict.keys())
-    random.shuffle(org_rec_id_list)
 
-    org_rec_i = 0  # Loop counter over which record to assign duplicates to
+    num_dup_rec_created = 0  # Count how many duplicate records have been
+                             # generated
+
+    if (num_workers != None):
+      shard_list = self.make_shards(
+                     ((org_rec_id_list[rec_index], num_dups,
+                       rec_dict[org_rec_id_list[rec_index]]) for \
+                      (rec_index, num_dups) in zip(rec_index_array,
+                                                   num_dups_array)))
+
+      if (start_shard > 0):
+        self.event_log.take_events()  # Histogram logged by 'plan_duplicates'
+        shard_list = itertools.islice(shard_list, start_shard, None)
+
+      for (num_shards_done, (shard, dup_rec_list_list)) in \
+          enumerate(self.corrupt_shards(shard_list, num_workers, seed),
+                    start_shard+1):
+        for ((org_rec_id, num_dups, rec_list), new_dup_rec_list) in \
+            zip(shard, dup_rec_list_list):
+          for (dup_rec_id, dup_rec) in new_dup_rec_list:
+
+            # Refer to the original record of this process rather than to
+            # the copy returned by the worker process
+            #
+            dup_rec.org_rec_list = rec_list
+            rec_dict[dup_rec_id] = dup_rec
 
-    while ((org_rec_i < self.number_of_org_records) and \
-           (total_num_dups < self.number_of_mod_records)):
+        if (shard_done_fn != None):
+          self.shard_done(shard_done_fn, num_shards_done, shard,
+                          dup_rec_list_list)
 
-      # Randomly choose how many duplicates to create for this original record
-      #
-      r = random.random()  # Random number between 0.0 and 1.0
-      ind = -1
-      while (self.prob_dist_list[ind][1] > r):
-        ind -= 1
-      num_dups = self.prob_dist_list[ind][0]
+      self.event_log.flush()
+      if (self.manifest != None):
+        self.manifest.flush()
+
+      return rec_dict
 
+    # Main loop over all original records for which to generate duplicates - -
+    #
+    for (rec_index, num_dups) in zip(rec_index_array, num_dups_array):
+      org_rec_id_to_mod = org_rec_id_list[rec_index]
       assert (num_dups > 0) and (num_dups <= self.max_num_dup_per_rec)
+      self.process_records(num_dup_rec_created, num_dups, org_rec_id_to_mod, rec_dict,
+                           seed)
 
-      # Check if there are still 'enough' duplicates to generate
-      #
-      if (num_dups <= (self.number_of_mod_records-total_num_dups)):
+    self.event_log.flush()
+    if (self.manifest != None):
+      self.manifest.flush()
 
-        # Select next record for which to generate duplicates
-        #
-        org_rec_id = org_rec_id_list[org_rec_i]
-        org_rec_i += 1
-        dup_rec_num_dict[org_rec_id] = num_dups
-        total_num_dups += num_dups
+    return rec_dict
+
+  # ---------------------------------------------------------------------------
+
+  def plan_duplicates(self, seed=None):
+    """Decide for all original records at once which of them are to receive
+       duplicates and how many.
+
+       Returns two arrays of equal length, the first containing the indices
+       (into the list of original records) of the selected original records
+       in a random order, the second the number of duplicates for each of
+       them. The numbers of duplicates sum to 'number_of_mod_records'.
+
+       Rather than drawing the number of duplicates record by record, the
+       numbers for all records that can possibly be needed are drawn in one
+       call (sampling from the cumulative duplicate distribution), and the
+       total is then adjusted: the numbers are cut off once enough duplicates
+       are planned (reducing the last number to fit), and if not enough
+       duplicates are planned even with all records selected, randomly chosen
+       records are given one more duplicate (up to 'max_num_dup_per_rec')
+       until the total is reached.
+
+       If a seed is given the random numbers are drawn from a random number
+       stream derived from it, otherwise from the global 'random' module.
+    """
 
-    assert total_num_dups == sum(dup_rec_num_dict.values())
+    if (seed == None):
+      rng = random
+    else:
+      rng = random_streams.keyed_random(seed, 'plan')
 
-    # Deal with the case where every original record has a number of duplicates
-    # but not enough duplicates are generated in total
+    num_org_rec = self.number_of_org_records
+    num_mod_rec = self.number_of_mod_records
+
+    # Each selected record receives at least one duplicate, so at most this
+    # many records need to be selected
     #
-    org_rec_id_list = list(rec_dict.keys())
-    random.shuffle(org_rec_id_list)
+    num_sel_rec = min(num_org_rec, num_mod_rec)
 
-    while (total_num_dups < self.number_of_mod_records):
-      org_rec_id = random.choice(org_rec_id_list)
+    # Draw the number of duplicates for all these records at once
+    #
+    num_dup_list = [num_dup for (num_dup, prob) in self.prob_dist_list]
+    cum_prob_list = [prob for (num_dup, prob) in self.prob_dist_list[1:]] + \
+                    [1.0]
 
-      # If possible, increase number of duplicates for this record by 1
-      #
-      if (dup_rec_num_dict[org_rec_id] < self.max_num_dup_per_rec):
-        dup_rec_num_dict[org_rec_id] = dup_rec_num_dict[org_rec_id]+1
-        total_num_dups += 1
+    num_dups_array = array.array('I', rng.choices(num_dup_list,
+                                                  cum_weights=cum_prob_list,
+                                                  k=num_sel_rec))
+
+    # Cut off the numbers of duplicates once the total is reached
+    #
+    total_num_dups_list = list(itertools.accumulate(num_dups_array))
+    i = bisect.bisect_left(total_num_dups_list, num_mod_rec)
+    if (i < len(total_num_dups_list)):
+      num_dups_array[i] -= (total_num_dups_list[i] - num_mod_rec)
+      del num_dups_array[i+1:]
+
+    # Deal with the case where every original record has a number of
+    # duplicates but not enough duplicates are planned in total, add one
+    # duplicate to randomly selected records that can take more
+    #
+    num_missing_dups = num_mod_rec - sum(num_dups_array)
+
+    while (num_missing_dups > 0):
+      free_index_list = [i for i in range(len(num_dups_array)) if \
+                         num_dups_array[i] < self.max_num_dup_per_rec]
+      for i in rng.sample(free_index_list, min(num_missing_dups,
+                                               len(free_index_list))):
+        num_dups_array[i] += 1
+        num_missing_dups -= 1
 
-    assert sum(dup_rec_num_dict.values()) == self.number_of_mod_records
+    assert sum(num_dups_array) == num_mod_rec
+
+    # Randomly select the records which receive these duplicates
+    #
+    rec_index_array = array.array('I', rng.sample(range(num_org_rec),
+                                                  len(num_dups_array)))
 
     # Generate a histogram of number of duplicates per record
     #
+    self.log_dup_histogram(collections.Counter(num_dups_array))
+
+    return (rec_index_array, num_dups_array)
+
+  # ---------------------------------------------------------------------------
+
+  def corrupt_records_stream(self, rec_iter, num_workers=None, seed=None,
+                             start_shard=0, shard_done_fn=None):
+    """Streaming version of 'corrupt_records' which never holds more than a
+       small window of original records (and their duplicates) in memory.
+
+       The given iterator must provide (record identifier, record list) pairs,
+       exactly 'number_of_org_records' of them, for example as read line by
+       line from a CSV file. The method is a generator which yields each
+       original record as (record identifier, record list) pair, followed
+       directly by the pairs of the duplicates generated for it.
+
+       Rather than shuffling all record identifiers, the records that receive
+       duplicates are chosen while streaming (selection sampling), each record
+       being selected with probability
+
+         remaining duplicates / (remaining records * mean duplicates per record)
+
+       and the number of duplicates of a selected record is drawn from the
+       'num_dup_dist' distribution as in 'corrupt_records'. Records are forced
+       to take duplicates once the remaining records would otherwise not be
+       able to hold all remaining duplicates, so exactly
+       'number_of_mod_records' duplicates are always generated.
+
+       The 'seed' and 'num_workers' arguments are used as in
+       'corrupt_records'. With a seed, the decision whether a record is
+       selected and how many duplicates it receives is drawn from a random
+       number stream derived from the seed and the record identifier.
+
+       The 'start_shard' and 'shard_done_fn' arguments are used as in
+       'corrupt_records', the records of the shards skipped are not yielded.
+       As 'shard_done_fn' is called before the first record of the next shard
+       is yielded, all records of the shards done have been consumed by
+       then.
+
+       The records are planned with 'plan_duplicates_stream' and then
+       corrupted with 'corrupt_planned_stream', which can also be used on
+       their own (for example run in different threads).
+    """
+
     dup_histo = {}
-    for (org_rec_id_to_mod, num_dups) in dup_rec_num_dict.items():
-      dup_count = dup_histo.get(num_dups, 0) + 1
-      dup_histo[num_dups] = dup_count
-    print('Distribution of number of original records with certain number ' + \
-          'of duplicates:')
-    dup_histo_keys = list(dup_histo.keys())
-    dup_histo_keys.sort()
-    for num_dups in dup_histo_keys:
-      print(' Number of records with %d duplicates: %d' % \
-            (num_dups, dup_histo[num_dups]))
-    print()
 
-    num_dup_rec_created = 0  # Count how many duplicate records have been
-                             # generated
+    (num_workers, seed) = self.choose_engine(num_workers, seed, start_shard,
+                                             shard_done_fn)
 
+    for rec_pair in self.corrupt_planned_stream(
+                      self.plan_duplicates_stream(rec_iter, dup_histo, seed),
+                      dup_histo, num_workers, seed, start_shard,
+                      shard_done_fn):
+      yield rec_pair
 
-    # Main loop over all original records for which to generate duplicates - -
+  # ---------------------------------------------------------------------------
+
+  def corrupt_planned_stream(self, rec_triple_iter, dup_histo,
+                             num_workers=None, seed=None, start_shard=0,
+                             shard_done_fn=None):
+    """Generator which generates the duplicates for the given iterator over
+       (record identifier, number of duplicates, record list) triples (as
+       yielded by 'plan_duplicates_stream'), and yields each original record
+       as (record identifier, record list) pair, followed directly by the
+       pairs of its duplicates. Once all records are done, the given
+       histogram of the number of duplicates per record (as filled by
+       'plan_duplicates_stream') is logged.
+
+       The other arguments are used as in 'corrupt_records_stream', the seed
+       must be the one the records were planned with.
+    """
+
+    (num_workers, seed) = self.choose_engine(num_workers, seed, start_shard,
+                                             shard_done_fn)
+
+    if (num_workers == None):
+      for (org_rec_id, num_dups, rec_list) in rec_triple_iter:
+
+        yield (org_rec_id, rec_list)
+
+        if (num_dups > 0):
+          for dup_rec in self.generate_duplicates(0, num_dups, org_rec_id,
+                                                  rec_list, seed):
+            yield dup_rec
+
+    else:
+      shard_iter = self.make_shards(rec_triple_iter)
+
+      # Skipped shards are still planned, so the histogram of duplicates
+      # covers all records
+      #
+      if (start_shard > 0):
+        shard_iter = itertools.islice(shard_iter, start_shard, None)
+
+      for (num_shards_done, (shard, dup_rec_list_list)) in \
+          enumerate(self.corrupt_shards(shard_iter, num_workers, seed),
+                    start_shard+1):
+
+        # Duplicates are returned in the order of their originals
+        #
+        for ((org_rec_id, num_dups, rec_list), new_dup_rec_list) in \
+            zip(shard, dup_rec_list_list):
+          yield (org_rec_id, rec_list)
+          for dup_rec in new_dup_rec_list:
+            yield dup_rec
+
+        if (shard_done_fn != None):
+          self.shard_done(shard_done_fn, num_shards_done, shard,
+                          dup_rec_list_list)
+
+    self.log_dup_histogram(dup_histo)
+    self.event_log.flush()
+    if (self.manifest != None):
+      self.manifest.flush()
+
+  # ---------------------------------------------------------------------------
+
+  def plan_duplicates_stream(self, rec_iter, dup_histo, seed=None):
+    """Generator which decides for each (record identifier, record list) pair
+       of the given iterator how many duplicates are to be generated for it,
+       and yields (record identifier, number of duplicates, record list)
+       triples (see 'corrupt_records_stream' for details).
+
+       The given histogram dictionary is updated with the number of original
+       records with a certain number of duplicates.
+
+       If a seed is given the random numbers used for a record are drawn from
+       a random number stream derived from the seed and the record
+       identifier, otherwise from the global 'random' module.
+    """
+
+    # Mean number of duplicates of a record that is selected for duplication
     #
-    for (org_rec_id_to_mod, num_dups) in dup_rec_num_dict.items():
-      assert (num_dups > 0) and (num_dups <= self.max_num_dup_per_rec)
-      self.process_records(num_dup_rec_created, num_dups, org_rec_id_to_mod, rec_dict)
+    mean_num_dups = 0.0
+    for i in range(len(self.prob_dist_list)):
+      if (i+1 < len(self.prob_dist_list)):
+        num_dup_prob = self.prob_dist_list[i+1][1] - self.prob_dist_list[i][1]
+      else:
+        num_dup_prob = 1.0 - self.prob_dist_list[i][1]
+      mean_num_dups += self.prob_dist_list[i][0] * num_dup_prob
 
+    # The smallest number of duplicates 'draw_num_dups' can return
+    #
+    min_drawn_num_dups = min(self.num_dup_alias_table.item_list)
 
-    return rec_dict
+    num_org_rec_left = self.number_of_org_records  # Records still to come
+    num_dups_left =    self.number_of_mod_records  # Duplicates still to create
+
+    for (org_rec_id, rec_list) in rec_iter:
+
+      if (num_org_rec_left == 0):
+        raise Exception('Illegal number of records to modify given')
+
+      if (seed == None):
+        rng = random
+      else:
+        rng = random_streams.keyed_random(seed, org_rec_id, 'plan')
+
+      # The minimum number of duplicates this record must take so that all
+      # remaining duplicates can still be generated
+      #
+      min_num_dups = num_dups_left - \
+                     (num_org_rec_left - 1) * self.max_num_dup_per_rec
+
+      if (min_num_dups > 0):
+        is_selected = True
+      elif (num_dups_left == 0):
+        is_selected = False
+      else:
+        select_prob = float(num_dups_left) / \
+                      (num_org_rec_left * mean_num_dups)
+        is_selected = (rng.random() < select_prob)
+        min_num_dups = 1
+
+      num_org_rec_left -= 1
+      num_dups = 0
+
+      if (is_selected == True):
+
+        # Draw a number of duplicates that is still possible to generate,
+        # if no number that can be drawn is small enough the remaining
+        # duplicates are all given to this record (as 'plan_duplicates'
+        # reduces the last number to fit)
+        #
+        if (num_dups_left < min_drawn_num_dups):
+          num_dups = num_dups_left
+        else:
+          num_dups = self.draw_num_dups(rng)
+          while (num_dups > num_dups_left):
+            num_dups = self.draw_num_dups(rng)
+        num_dups = max(num_dups, min_num_dups)
+
+        assert (num_dups > 0) and (num_dups <= self.max_num_dup_per_rec)
+
+        num_dups_left -= num_dups
+        dup_histo[num_dups] = dup_histo.get(num_dups, 0) + 1
+
+      yield (org_rec_id, num_dups, rec_list)
+
+    if (num_org_rec_left != 0):
+      raise Exception('Illegal number of records to modify given')
+    assert num_dups_left == 0
+
+  # ---------------------------------------------------------------------------
+
+  def make_shards(self, rec_triple_iter, shard_size=1000):
+    """Generator which cuts the given iterator over (record identifier,
+       number of duplicates, record list) triples into shards (lists) of at
+       most 'shard_size' triples.
+    """
+
+    shard = []
+
+    for rec_triple in rec_triple_iter:
+      shard.append(rec_triple)
+
+      if (len(shard) == shard_size):
+        yield shard
+        shard = []
+
+    if (shard != []):
+      yield shard
+
+  # ---------------------------------------------------------------------------
+
+  def corrupt_shards(self, shard_iter, num_workers, seed):
+    """Generator which generates the duplicates for the given shards, each a
+       list of (record identifier, number of duplicates, record list) triples,
+       and yields (shard, list of lists of duplicate pairs) tuples in shard
+       order (see 'corrupt_shard').
+
+       If 'num_workers' is larger than 1 the shards are corrupted in a pool
+       of worker processes, with at most two shards per worker in flight at
+       any time. The events logged, manifest entries and corruptor statistics
+       for each shard are collected and added to the event log, manifest and
+       statistics in shard order.
+    """
+
+    base_functions.check_is_integer('num_workers', num_workers)
+    base_functions.check_is_positive('num_workers', num_workers)
+
+    if (seed == None):
+      seed = random.getrandbits(64)
+
+    if (num_workers == 1):
+      for shard in shard_iter:
+        (dup_rec_list_list, event_list, entry_list, shard_stats) = \
+                                              self.corrupt_shard(shard, seed)
+        self.add_shard_results(event_list, entry_list, shard_stats)
+        yield (shard, dup_rec_list_list)
+      return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=num_workers,
+                                                initializer=init_shard_worker,
+                                                initargs=(self,)) as executor:
+      pending = collections.deque()
+
+      for shard in shard_iter:
+        pending.append((shard, executor.submit(corrupt_shard_in_worker,
+                                               shard, seed)))
+
+        if (len(pending) >= 2*num_workers):
+          (done_shard, future) = pending.popleft()
+          (dup_rec_list_list, event_list, entry_list, shard_stats) = \
+                                                           future.result()
+          self.add_shard_results(event_list, entry_list, shard_stats)
+          yield (done_shard, dup_rec_list_list)
+
+      while (len(pending) > 0):
+        (done_shard, future) = pending.popleft()
+        (dup_rec_list_list, event_list, entry_list, shard_stats) = \
+                                                         future.result()
+        self.add_shard_results(event_list, entry_list, shard_stats)
+        yield (done_shard, dup_rec_list_list)
+
+  # ---------------------------------------------------------------------------
+
+  def corrupt_shard(self, shard, seed):
+    """Generate the duplicates for all records in the given shard, and return
+       for each record in the shard the list of its (duplicate record
+       identifier, duplicate record list) pairs, together with the list of
+       events logged, the list of manifest entries (empty if no manifest is
+       kept) and the corruptor statistics of the shard.
+
+       The random numbers are drawn from random number streams derived from
+       the given seed and the record identifiers, so the result does not
+       depend on which other records are in the same shard.
+    """
+
+    main_event_log = self.event_log
+    self.event_log = event_log.EventLog(level=main_event_log.level_name,
+                                        buffer_size=None)
+    main_manifest = self.manifest
+    if (main_manifest != None):
+      self.manifest = manifest.Manifest(None, main_manifest.manifest_format,
+                                        buffer_size=None)
+    main_corruptor_stats = self.corruptor_stats
+    self.corruptor_stats = corruptor_stats.CorruptorStats(self.plan,
+                                                          self.stats_timer_every,
+                                                len(self.candidate_cache_list))
+
+    try:
+      if (self.corruption_mode == 'batched'):
+        dup_rec_list_list = self.generate_duplicates_batch(shard, seed)
+
+      else:
+        dup_rec_list_list = []
+
+        for (org_rec_id, num_dups, rec_list) in shard:
+          if (num_dups > 0):
+            dup_rec_list_list.append(self.generate_duplicates(0, num_dups,
+                                                  org_rec_id, rec_list, seed))
+          else:
+            dup_rec_list_list.append([])
+
+      event_list = self.event_log.take_events()
+      if (self.manifest != None):
+        entry_list = self.manifest.take_entries()
+      else:
+        entry_list = []
+      shard_stats = self.corruptor_stats
+
+    finally:
+      self.event_log = main_event_log
+      self.manifest =  main_manifest
+      self.corruptor_stats = main_corruptor_stats
+
+    return (dup_rec_list_list, event_list, entry_list, shard_stats)
+
+  # ---------------------------------------------------------------------------
+
+  def choose_engine(self, num_workers, seed, start_shard, shard_done_fn):
+    """Return the number of workers and the seed to use for the arguments
+       given to 'corrupt_records' or 'corrupt_records_stream': the sharded
+       engine is always used in the 'batched' corruption mode and for
+       checkpointed runs, and needs a seed (which is drawn if none is given,
+       except when resuming a run).
+    """
+
+    base_functions.check_is_integer('start_shard', start_shard)
+    base_functions.check_is_not_negative('start_shard', start_shard)
+
+    if ((start_shard > 0) and (seed == None)):
+      raise Exception('A seed is needed to resume from shard %d' % \
+                      (start_shard))
+
+    if (((self.corruption_mode == 'batched') or (start_shard > 0) or \
+         (shard_done_fn != None)) and (num_workers == None)):
+      num_workers = 1
+
+    if ((num_workers != None) and (seed == None)):
+      seed = random.getrandbits(64)
+
+    return (num_workers, seed)
+
+  # ---------------------------------------------------------------------------
+
+  def shard_done(self, shard_done_fn, num_shards_done, shard,
+                 dup_rec_list_list):
+    """Flush the event log and manifest, so they hold all events and entries
+       of the shards done, and call the given function for the shard done.
+    """
+
+    self.event_log.flush()
+    if (self.manifest != None):
+      self.manifest.flush()
+
+    shard_done_fn(num_shards_done, shard, dup_rec_list_list)
+
+  # ---------------------------------------------------------------------------
+
+  def add_shard_results(self, event_list, entry_list, shard_stats):
+    """Add the events, manifest entries and corruptor statistics collected
+       for a shard to the event log, the manifest and the statistics.
+    """
+
+    self.event_log.log_events(event_list)
+
+    if (self.manifest != None):
+      self.manifest.add_entries(entry_list)
+
+    self.corruptor_stats.merge(shard_stats)
+
+  # ---------------------------------------------------------------------------
+
+  def draw_num_dups(self, rng=random):
+    """Randomly choose how many duplicates to create for an original record
+       according to the duplicate distribution, using the given random number
+       generator.
+    """
+
+    return self.num_dup_alias_table.sample(rng)
+
+  # ---------------------------------------------------------------------------
+
+  def log_dup_histogram(self, dup_histo):
+    """Log the histogram of the number of original records with a certain
+       number of duplicates.
+    """
+
+    if (self.event_log.level >= event_log.LOG_SUMMARY):
+      self.event_log.log(('histogram', sorted(dup_histo.items())))
+
+  # ---------------------------------------------------------------------------
+
+  def process_records(self, num_dup_rec_created, num_dups, org_rec_id_to_mod, rec_dict,
+                      seed=None):
+    """Generate the duplicates for a single original record and insert them
+       into the given record dictionary.
+    """
+
+    for (dup_rec_id, dup_rec_list) in \
+        self.generate_duplicates(num_dup_rec_created, num_dups,
+                                 org_rec_id_to_mod, rec_dict[org_rec_id_to_mod],
+                                 seed):
+      rec_dict[dup_rec_id] = dup_rec_list
+
+  # ---------------------------------------------------------------------------
+
+  def generate_duplicates(self, num_dup_rec_created, num_dups, org_rec_id_to_mod,
+                          rec_to_mod_list, seed=None):
+    """Generate the given number of modified (duplicate) records for a single
+       original record, and return them as a list of (duplicate record
+       identifier, duplicate record) pairs. Duplicate records are
+       'DuplicateRecord' objects (see module 'dup_record'), which only store
+       the values in which they differ from the original record.
+
+       The original record list is not modified.
+
+       Duplicates that are the same as the original record or one of its
+       other duplicates are generated again, at most 'max_dup_tries' times,
+       after which 'dup_fail_policy' decides if the last duplicate is kept or
+       no further duplicates are generated for this record (so fewer than
+       'num_dups' duplicates may be returned).
+
+       If a seed is given, each attempt to generate a duplicate draws the
+       attributes and corruptors to use from a random number stream keyed by
+       the seed, the original record identifier and the attempt number, and
+       each corruptor draws its random numbers from a stream keyed by these
+       and the name of the attribute it modifies. Otherwise all random numbers
+       are drawn from the global 'random' module.
+    """
+
+    # Check once which events are to be logged, so no events are created at
+    # lower verbosity levels
+    #
+    log_full =      (self.event_log.level >= event_log.LOG_FULL)
+    keep_manifest = (self.manifest != None)
+
+    # The duplicates of this record, generated one attempt after the other
+    # (see module 'dup_attempt')
+    #
+    rec_dups = dup_attempt.RecordDuplicates(org_rec_id_to_mod, num_dups,
+                                            rec_to_mod_list)
+    if (num_dups == 0):
+      rec_dups.is_done = True
+    elif (log_full == True):
+      rec_dups.event_list.append(('record', org_rec_id_to_mod, num_dups))
+
+    corruption_plan = self.plan
+    attr_col_tuple =       corruption_plan.attr_col_tuple
+    attr_is_record_tuple = corruption_plan.attr_is_record_tuple
+    corruptor_tuple =      corruption_plan.corruptor_tuple
+
+    # Corruptor statistics, counted in the preallocated arrays directly
+    #
+    stats =       self.corruptor_stats
+    call_array =  stats.call_array
+    timer_every = stats.timer_every
 
-  def process_records(self, num_dup_rec_created, num_dups, org_rec_id_to_mod, rec_dict):
-    print()
-    print('Generating %d modified (duplicate) records for record "%s"' % \
-          (num_dups, org_rec_id_to_mod))
-    rec_to_mod_list = rec_dict[org_rec_id_to_mod]
-    d = 0  # Loop counter for duplicates for this record
-    this_dup_rec_list = []  # A list of all duplicates for this record
     # Loop to create duplicate records - - - - - - - - - - - - - - - - - - - -
-    while (d < num_dups):
+    while (rec_dups.is_done == False):
 
-      # Create a duplicate of the original record
+      # Create a duplicate of the original record (which only stores the
+      # values modified), with the random number streams of this attempt
       #
-      dup_rec_list = rec_to_mod_list[:]  # Make copy of original record
+      attempt = dup_attempt.DuplicateAttempt(rec_dups, seed, corruption_plan)
+
+      # Now apply desired number of modifications to this record
+      while (self.select_modification(attempt, seed) == True):
+        mod_attr_id =      attempt.mod_attr_id
+        corruptor_id =     attempt.corruptor_id
+        corruptor_method = corruptor_tuple[corruptor_id]
+        attr_rng =         attempt.attr_rng_list[mod_attr_id]
+
+        # Count the call, and decide if it is to be timed (the first call
+        # and then one in 'timer_every' calls)
+        #
+        call_array[corruptor_id] += 1
+        is_timed = ((timer_every != None) and \
+                    ((call_array[corruptor_id] - 1) % timer_every == 0))
+
+        if (is_timed == True):
+          start_time = time.perf_counter()
+
+        if attr_is_record_tuple[mod_attr_id]:  # Record level corruptor
+          field_dict = corruptor_method.corrupt_fields(attempt.dup_rec,
+                                                       attr_rng)
+          if (is_timed == True):
+            stats.add_time(corruptor_id, time.perf_counter() - start_time)
 
-      org_rec_num = org_rec_id_to_mod.split('-')[1]
-      dup_rec_id = 'rec-%s-dup-%d' % (org_rec_num, d)
-      print('  Generate identifier for duplicate record based on "%s": %s' \
-            % (org_rec_id_to_mod, dup_rec_id))
+          self.apply_record_modification(attempt, field_dict)
+
+        else:
+          mod_attr_val = attempt.dup_rec[attr_col_tuple[mod_attr_id]]
+          new_attr_val = corruptor_method.corrupt_value(mod_attr_val, attr_rng)
+          if (is_timed == True):
+            stats.add_time(corruptor_id, time.perf_counter() - start_time)
 
-      # Count the number of modifications in this record (counted as the
-      # number of modified attributes)
+          self.apply_value_modification(attempt, mod_attr_val, new_attr_val)
+
+      # Keep the duplicate if it is different from the original record and
+      # all other duplicates for this original record
       #
-      num_mod_in_record = 0
+      self.resolve_attempt(attempt, num_dup_rec_created)
+
+    self.event_log.log_events(rec_dups.event_list)
+    if (keep_manifest == True):
+      self.manifest.add_entries(rec_dups.entry_list)
+
+    return rec_dups.new_dup_rec_list
+
+  # ---------------------------------------------------------------------------
+
+  def generate_duplicates_batch(self, shard, seed):
+    """Batched version of 'generate_duplicates', which generates the
+       duplicates for all records in the given shard (a list of (record
+       identifier, number of duplicates, record list) triples) and returns for
+       each record in the shard the list of its (duplicate record identifier,
+       duplicate record) pairs.
+
+       Rather than applying one modification after the other, the attempts to
+       generate duplicates of all records are worked on together, in waves of
+       three phases:
+
+       1) Plan: for each record as many attempts are started as it still needs
+          duplicates (each with its random number streams, keyed by the seed,
+          the record identifier and the attempt number).
+       2) Execute: in rounds, the next modification (attribute and corruptor)
+          of every unfinished attempt is selected, and then each corruptor is
+          applied to all values selected for it in a single call (see
+          'corrupt_values' of the corruptor base classes), and the results
+          are applied. An attempt is finished once it has the required
+          number of modifications (values that come back unchanged are
+          retried with the next modification of the attempt, as in
+          'generate_duplicates').
+       3) Resolve: the attempts of each record are checked in order against
+          the original record and its duplicates kept so far. Duplicates that
+          are the same are discarded, and a further wave of attempts is
+          started for the records which still need duplicates.
+
+       As the random numbers of an attempt only depend on the seed, the
+       record and the attempt number, and attempts are resolved in order,
+       the duplicates, events and manifest entries are the same as those of
+       'generate_duplicates' with the same seed (a seed is therefore
+       required). Attempts started in the same wave as an attempt after which
+       no further duplicates are generated for a record (see
+       'dup_fail_policy') are discarded.
+    """
+
+    log_full =      (self.event_log.level >= event_log.LOG_FULL)
+    keep_manifest = (self.manifest != None)
+
+    rec_dups_list = []
 
-      # Set the attribute modification counters to zero for all attributes
-      # that can be modified
+    for (org_rec_id, num_dups, rec_list) in shard:
+      rec_dups = dup_attempt.RecordDuplicates(org_rec_id, num_dups, rec_list)
+
+      if (num_dups == 0):
+        rec_dups.is_done = True
+      elif (log_full == True):
+        rec_dups.event_list.append(('record', org_rec_id, num_dups))
+
+      rec_dups_list.append(rec_dups)
+
+    pending_list = [rec_dups for rec_dups in rec_dups_list \
+                    if (rec_dups.is_done == False)]
+
+    while (pending_list != []):
+
+      # Plan: start the attempts of this wave - - - - - - - - - - - - - - - - -
       #
-      attr_mod_count_dict = {}
-      for attr_name in list(self.attr_mod_prob_dict.keys()):
-        attr_mod_count_dict[attr_name] = 0
+      attempt_list = []
+      for rec_dups in pending_list:
+        rec_dups.attempt_list = [dup_attempt.DuplicateAttempt(rec_dups, seed,
+                                                              self.plan) \
+                                 for i in range(rec_dups.num_dups_left())]
+        attempt_list.extend(rec_dups.attempt_list)
+
+      # Execute: apply the modifications, grouped by corruptor - - - - - - - -
+      #
+      self.apply_modifications_batch(attempt_list, seed)
 
-      # Abort generating modifications after a larger number of tries to
-      # prevent an endless loop
-      max_num_tries = self.num_mod_per_rec * 10
-      num_tries = 0
+      # Resolve: keep the attempts which are different duplicates - - - - - -
+      #
+      for rec_dups in pending_list:
+        for attempt in rec_dups.attempt_list:
+          if (rec_dups.is_done == True):
+            break  # Further attempts are discarded
+          self.resolve_attempt(attempt)
+        rec_dups.attempt_list = []
 
-      # Now apply desired number of modifications to this record
-      while ((num_mod_in_record < self.num_mod_per_rec) and
-             (num_tries < max_num_tries)):
-
-        # Randomly modify an attribute value
-        r = random.random()  # Random value between 0.0 and 1.0
-        i = 0
-        while (self.attr_mod_prob_list[i][0] < r):
-          i += 1
-        mod_attr_name = self.attr_mod_prob_list[i][1]
-
-        if (attr_mod_count_dict[mod_attr_name] < self.max_num_mod_per_attr):
-          mod_attr_name_index = self.attribute_name_list.index(mod_attr_name)
-          mod_attr_val = dup_rec_list[mod_attr_name_index]
-
-          # Select an attribute to modify according to probability
-          # distribution of corruption methods
-          #
-          attr_mod_data_list = self.attr_mod_data_dict[mod_attr_name]
-
-          r = random.random()  # Random value between 0.0 and 1.0
-          p_sum = attr_mod_data_list[0][0]
-          i = 0
-          while (r >= p_sum):
-            i += 1
-            p_sum += attr_mod_data_list[i][0]
-          corruptor_method = attr_mod_data_list[i][1]
-          # record level handling =============start================
-          if mod_attr_name == 'crptr-record':
-            mod_rec_list = dup_rec_list[:]
-            new_rec_val = corruptor_method.corrupt_value(mod_rec_list)
-            org_rec_val = rec_to_mod_list[:]
-            if (new_rec_val != org_rec_val):
-              print('  Selected attribute for modification:', mod_attr_name)
-              print('    Selected corruptor:', corruptor_method.name)
-
-              # The following weird string printing construct is to overcome
-              # problems with printing non-ASCII characters
-              #
-              print('      Original record value:', str(org_rec_val)[1:-1])
-              print('      Modified record value:', str(new_rec_val)[1:-1])
-
-              dup_rec_list = new_rec_val
-
-              # One more modification for this attribute
-              #
-              attr_mod_count_dict[mod_attr_name] += 1
-
-              # The number of modifications in a record corresponds to the
-              # number of modified attributes
-              #
-              num_mod_in_record = 0
-
-              for num_attr_mods in list(attr_mod_count_dict.values()):
-                if (num_attr_mods > 0):
-                  num_mod_in_record += 1  # One more modification
-                assert num_mod_in_record <= self.num_mod_per_rec
-
-            num_tries += 1  # One more try to modify record
-
-          # record level handling =============end===============
-          else:
+      pending_list = [rec_dups for rec_dups in pending_list \
+                      if (rec_dups.is_done == False)]
 
-            # Modify the value from the selected attribute
-            #
-            new_attr_val = corruptor_method.corrupt_value(mod_attr_val)
+    # Add the events and manifest entries in the order of the records
+    #
+    dup_rec_list_list = []
 
-            org_attr_val = rec_to_mod_list[mod_attr_name_index]
+    for rec_dups in rec_dups_list:
+      self.event_log.log_events(rec_dups.event_list)
+      if (keep_manifest == True):
+        self.manifest.add_entries(rec_dups.entry_list)
 
-            # If the modified value is different insert it back into modified
-            # record
-            #
-            if (new_attr_val != org_attr_val):
-              print('  Selected attribute for modification:', mod_attr_name)
-              print('    Selected corruptor:', corruptor_method.name)
+      dup_rec_list_list.append(rec_dups.new_dup_rec_list)
+
+    return dup_rec_list_list
+
+  # ---------------------------------------------------------------------------
+
+  def apply_modifications_batch(self, attempt_list, seed):
+    """Apply modifications to the duplicates of the given attempts (see
+       'generate_duplicates_batch') until each attempt has the required
+       number of modified attributes or has run out of tries. In each round
+       the next modification of every unfinished attempt is selected, and
+       each selected corruptor is then called once for all its values.
+    """
+
+    corruption_plan = self.plan
+    attr_col_tuple =       corruption_plan.attr_col_tuple
+    attr_is_record_tuple = corruption_plan.attr_is_record_tuple
+    corruptor_tuple =      corruption_plan.corruptor_tuple
 
-              # The following weird string printing construct is to overcome
-              # problems with printing non-ASCII characters
-              #
-              print('      Original attribute value:', str([org_attr_val])[1:-1])
-              print('      Modified attribute value:', str([new_attr_val])[1:-1])
+    stats =      self.corruptor_stats
+    call_array = stats.call_array
+    is_timed =   (stats.timer_every != None)
 
-              dup_rec_list[mod_attr_name_index] = new_attr_val
+    active_list = attempt_list
 
-              # One more modification for this attribute
-              #
-              attr_mod_count_dict[mod_attr_name] += 1
+    while (active_list != []):
 
-              # The number of modifications in a record corresponds to the
-              # number of modified attributes
-              #
-              num_mod_in_record = 0
+      # Select the next modification of each attempt, grouped by corruptor
+      #
+      step_list_list = [[] for corruptor in corruptor_tuple]
+      next_active_list = []
+
+      for attempt in active_list:
+        if (self.select_modification(attempt, seed) == True):
+          step_list_list[attempt.corruptor_id].append(attempt)
+          next_active_list.append(attempt)
+
+      # Apply each corruptor to all values selected for it
+      #
+      for (corruptor_id, step_list) in enumerate(step_list_list):
+        if (step_list == []):
+          continue
+
+        corruptor_method = corruptor_tuple[corruptor_id]
+        rng_list = [attempt.attr_rng_list[attempt.mod_attr_id] for \
+                    attempt in step_list]
+
+        call_array[corruptor_id] += len(step_list)
+        if (is_timed == True):
+          start_time = time.perf_counter()
+
+        if attr_is_record_tuple[step_list[0].mod_attr_id]:  # Record level
+          field_dict_list = [corruptor_method.corrupt_fields(attempt.dup_rec,
+                                                             attr_rng) for \
+                             (attempt, attr_rng) in zip(step_list, rng_list)]
+          if (is_timed == True):
+            stats.add_batch_time(corruptor_id,
+                                 time.perf_counter() - start_time,
+                                 len(step_list))
+
+          for (attempt, field_dict) in zip(step_list, field_dict_list):
+            self.apply_record_modification(attempt, field_dict)
+
+        else:
+          mod_attr_val_list = [attempt.dup_rec[attr_col_tuple[attempt.mod_attr_id]] \
+                               for attempt in step_list]
+          new_attr_val_list = corruptor_method.corrupt_values(mod_attr_val_list,
+                                                              rng_list)
+          if (is_timed == True):
+            stats.add_batch_time(corruptor_id,
+                                 time.perf_counter() - start_time,
+                                 len(step_list))
+
+          for (attempt, mod_attr_val, new_attr_val) in \
+              zip(step_list, mod_attr_val_list, new_attr_val_list):
+            self.apply_value_modification(attempt, mod_attr_val, new_attr_val)
 
-              for num_attr_mods in list(attr_mod_count_dict.values()):
-                if (num_attr_mods > 0):
-                  num_mod_in_record += 1  # One more modification
-              assert num_mod_in_record <= self.num_mod_per_rec
+      active_list = next_active_list
 
-            num_tries += 1  # One more try to modify record
+  # ---------------------------------------------------------------------------
+
+  def apply_value_modification(self, attempt, mod_attr_val, new_attr_val):
+    """Apply the value returned by the corruptor of the modification selected
+       for the given attempt (see 'select_modification') for the given value
+       of its attribute: count it as unchanged if it is the same, and insert
+       it into the duplicate record (logging the modification and adding it
+       to the manifest modifications of the attempt) if it differs from the
+       original value. Each call counts as one try.
+    """
 
-      # Check if this duplicate is different from all others for this original
-      # record
+    corruption_plan = self.plan
+    mod_attr_id =  attempt.mod_attr_id
+    corruptor_id = attempt.corruptor_id
+    mod_attr_name_index = corruption_plan.attr_col_tuple[mod_attr_id]
+
+    if (new_attr_val == mod_attr_val):
+      self.corruptor_stats.unchanged_array[corruptor_id] += 1
+
+    org_attr_val = attempt.dup_rec.org_rec_list[mod_attr_name_index]
+
+    # If the modified value is different insert it back into modified
+    # record
+    #
+    if (new_attr_val != org_attr_val):
+      mod_attr_name = corruption_plan.attr_name_tuple[mod_attr_id]
+      corruptor_name = corruption_plan.corruptor_tuple[corruptor_id].name
+
+      if (self.event_log.level >= event_log.LOG_CHANGES):
+        attempt.event_list.append(('modify', mod_attr_name, corruptor_name,
+                                   org_attr_val, new_attr_val))
+      if (self.manifest != None):
+        attempt.mod_list.append((mod_attr_name, corruptor_name, mod_attr_val,
+                                 new_attr_val))
+
+      attempt.dup_rec[mod_attr_name_index] = new_attr_val
+
+      # One more modification for this attribute, the number of
+      # modifications in a record corresponds to the number of modified
+      # attributes
       #
-      is_diff = True  # Flag to check if the latest duplicate is different
+      if (attempt.attr_mod_count_array[mod_attr_id] == 0):
+        attempt.num_mod_in_record += 1  # One more modification
+      attempt.attr_mod_count_array[mod_attr_id] += 1
+
+    attempt.num_tries += 1  # One more try to modify record
+
+  # ---------------------------------------------------------------------------
+
+  def apply_record_modification(self, attempt, field_dict):
+    """Apply the field values (a dictionary with column indices as keys)
+       returned by the record level corruptor of the modification selected
+       for the given attempt, as 'apply_value_modification' does for a single
+       value.
+    """
 
-      if (this_dup_rec_list == []):  # No duplicate so far
-        this_dup_rec_list.append(dup_rec_list)
+    corruption_plan = self.plan
+    mod_attr_id =  attempt.mod_attr_id
+    corruptor_id = attempt.corruptor_id
+    dup_rec =      attempt.dup_rec
+
+    new_dup_rec = dup_rec.copy()
+    for (attr_index, new_attr_val) in field_dict.items():
+      new_dup_rec[attr_index] = new_attr_val
+
+    if (new_dup_rec.diff_key() == dup_rec.diff_key()):
+      self.corruptor_stats.unchanged_array[corruptor_id] += 1
+
+    # The modified record is different from the original record if any of
+    # its values are
+    #
+    if (new_dup_rec.is_modified() == True):
+      corruptor_name = corruption_plan.corruptor_tuple[corruptor_id].name
+
+      if (self.event_log.level >= event_log.LOG_CHANGES):
+        attempt.event_list.append(('modify_record',
+                                   corruption_plan.attr_name_tuple[mod_attr_id],
+                                   corruptor_name, dup_rec.org_rec_list[:],
+                                   new_dup_rec.to_list()))
+      if (self.manifest != None):
+        for attr_index in sorted(field_dict):
+          if (field_dict[attr_index] != dup_rec[attr_index]):
+            attempt.mod_list.append((self.attribute_name_list[attr_index],
+                                     corruptor_name, dup_rec[attr_index],
+                                     field_dict[attr_index]))
+
+      attempt.dup_rec = new_dup_rec
+
+      if (attempt.attr_mod_count_array[mod_attr_id] == 0):
+        attempt.num_mod_in_record += 1  # One more modification
+      attempt.attr_mod_count_array[mod_attr_id] += 1
+
+    attempt.num_tries += 1  # One more try to modify record
+
+  # ---------------------------------------------------------------------------
+
+  def select_modification(self, attempt, seed):
+    """Select the next modification (attribute and corruptor identifier) of
+       the given attempt (see module 'dup_attempt'), drawing from its random
+       number stream, and create the random number stream of the attribute
+       for the corruptor if a seed is given. Used by both 'generate_duplicates'
+       and 'generate_duplicates_batch'. Returns False if the attempt already
+       has the required number of modified attributes or has run out of
+       tries (or, with 'without_replacement' sampling, of attributes), and
+       True otherwise.
+    """
+
+    corruption_plan = self.plan
+
+    rng = attempt.rng
+    attr_mod_count_array = attempt.attr_mod_count_array
+
+    without_replacement = (self.attr_sampling == 'without_replacement')
+
+    # Without replacement, the attributes are modified in a random order
+    # drawn before anything else of the attempt. Each attribute is tried
+    # once, so the loop is bounded by the number of attributes only (no try
+    # limit, and no attribute can be modified more than once)
+    #
+    if ((without_replacement == True) and (attempt.attr_order_list == None)):
+      attempt.attr_order_list = sampling.weighted_order(
+                                  corruption_plan.attr_prob_id_tuple, rng)
+      attempt.attr_order_pos = 0
+
+    # Otherwise abort generating modifications after a larger number of
+    # tries to prevent an endless loop
+    max_num_tries = self.num_mod_per_rec * 10
+
+    while ((attempt.num_mod_in_record < self.num_mod_per_rec) and
+           ((without_replacement == True) or
+            (attempt.num_tries < max_num_tries))):
+
+      if (without_replacement == True):
+        if (attempt.attr_order_pos == len(attempt.attr_order_list)):
+          return False  # All attributes have been tried
+        mod_attr_id = attempt.attr_order_list[attempt.attr_order_pos]
+        attempt.attr_order_pos += 1
       else:
-        for check_dup_rec in this_dup_rec_list:
-          if (check_dup_rec == dup_rec_list):  # Same as a previous duplicate
-            is_diff = False
-            print('Same duplicate:', check_dup_rec)
-            print('               ', dup_rec_list)
+        mod_attr_id = corruption_plan.attr_alias_table.sample(rng)
 
-      if (is_diff == True):  # Only keep duplicate records that are different
+      if ((without_replacement == True) or
+          (attr_mod_count_array[mod_attr_id] < self.max_num_mod_per_attr)):
+        if (self.corruptor_filter == None):
+          corruptor_id = \
+                   corruption_plan.attr_corruptor_alias_tuple[mod_attr_id].sample(rng)
+        else:
+          if corruption_plan.attr_is_record_tuple[mod_attr_id]:
+            corruptor_id = self.corruptor_filter.sample(mod_attr_id,
+                                                        attempt.dup_rec, rng)
+          else:
+            corruptor_id = self.corruptor_filter.sample(mod_attr_id,
+                          attempt.dup_rec[corruption_plan.attr_col_tuple[mod_attr_id]],
+                          rng)
+          if (corruptor_id == None):  # No corruptor can modify the value
+            attempt.num_tries += 1
+            continue
 
-        # Safe the record into the overall record dictionary
-        #
-        rec_dict[dup_rec_id] = dup_rec_list
-
-        d += 1
-        num_dup_rec_created += 1
-
-        print('Original record:')
-        print(' ', rec_to_mod_list)
-        print('Record with %d modified attributes' % (num_mod_in_record), end=' ')
-        attr_mod_str = '('
-        for a in self.attribute_name_list:
-          if (attr_mod_count_dict.get(a, 0) > 0):
-            attr_mod_str += '%d in %s, ' % (attr_mod_count_dict[a], a)
-        attr_mod_str = attr_mod_str[:-1] + '):'
-        print(attr_mod_str)
-        print(' ', dup_rec_list)
-        print('%d of %d duplicate records generated so far' % \
-              (num_dup_rec_created, self.number_of_mod_records))
-        print()
+        attempt.mod_attr_id =  mod_attr_id
+        attempt.corruptor_id = corruptor_id
+
+        if ((seed != None) and (attempt.attr_rng_list[mod_attr_id] == None)):
+          attempt.attr_rng_list[mod_attr_id] = random_streams.keyed_random(
+                              seed, attempt.rec_dups.org_rec_id,
+                              attempt.dup_try,
+                              corruption_plan.attr_name_tuple[mod_attr_id])
+
+        return True
+
+    return False
+
+  # ---------------------------------------------------------------------------
+
+  def resolve_attempt(self, attempt, num_dup_rec_created=0):
+    """Check if the duplicate of the given finished attempt is different
+       from the original record and the duplicates kept so far, and keep it
+       if it is (or if 'dup_fail_policy' accepts it). Used by both
+       'generate_duplicates' and 'generate_duplicates_batch'. The events and
+       manifest entry of the attempt are added to those of its record, with
+       the number of duplicates created counted on from the given number.
+    """
+
+    log_changes =   (self.event_log.level >= event_log.LOG_CHANGES)
+    log_full =      (self.event_log.level >= event_log.LOG_FULL)
+    keep_manifest = (self.manifest != None)
+
+    rec_dups = attempt.rec_dups
+    dup_rec =  attempt.dup_rec
+    event_list = rec_dups.event_list
+
+    self.corruptor_stats.num_dup_attempts += 1
+
+    d = len(rec_dups.new_dup_rec_list)  # Number of duplicates kept so far
+    dup_rec_id = 'rec-%s-dup-%d' % (rec_dups.org_rec_num, d)
+    if (log_changes == True):
+      event_list.append(('dup_id', rec_dups.org_rec_id, dup_rec_id))
+    event_list.extend(attempt.event_list)
+
+    rec_dups.num_dup_tries += 1
+    dup_rec_key = dup_rec.diff_key()
+    is_diff = (dup_rec_key not in rec_dups.seen_rec_set)
+
+    if (is_diff == False):
+      self.corruptor_stats.num_same_dups += 1
+      if (log_full == True):
+        event_list.append(('same_dup', dup_rec.to_list(), dup_rec.to_list()))
+
+      if (rec_dups.num_dup_tries >= self.max_dup_tries):
+        if (self.dup_fail_policy == 'accept'):
+          is_diff = True  # Keep this duplicate even though it is the same
+
+        else:
+          if (self.dup_fail_policy == 'log'):
+            event_list.append(('dup_failed', rec_dups.org_rec_id,
+                               rec_dups.num_dups-d, rec_dups.num_dup_tries))
+          rec_dups.is_done = True  # No further duplicates for this record
+          return
+
+    if (is_diff == True):  # Only keep duplicate records that are different
+      rec_dups.seen_rec_set.add(dup_rec_key)
+      rec_dups.num_dup_tries = 0
+
+      rec_dups.new_dup_rec_list.append((dup_rec_id, dup_rec))
+
+      if (keep_manifest == True):
+        rec_dups.entry_list.append((rec_dups.org_rec_id, dup_rec_id,
+                                    attempt.mod_list))
+
+      if (log_full == True):
+        attr_mod_count_list = []
+        for attr_id in self.plan.attr_id_col_order_tuple:
+          if (attempt.attr_mod_count_array[attr_id] > 0):
+            attr_mod_count_list.append((self.plan.attr_name_tuple[attr_id],
+                                        attempt.attr_mod_count_array[attr_id]))
+
+        event_list.append(('duplicate', rec_dups.org_rec_id, dup_rec_id,
+                           rec_dups.rec_list, dup_rec.to_list(),
+                           attempt.num_mod_in_record, attr_mod_count_list,
+                           num_dup_rec_created+d+1, self.number_of_mod_records))
+
+      if (len(rec_dups.new_dup_rec_list) == rec_dups.num_dups):
+        rec_dups.is_done = True
+
+# =============================================================================
+
+# =============================================================================
+# Functions used by the worker processes of the sharded engine (these need to
+# be defined at module level so they can be used by the process pool)
+
+worker_crptr = None  # The Crptr instance used in a worker process
+
+def init_shard_worker(crptr_instance):
+  """Set the Crptr instance to be used by this worker process.
+  """
+
+  global worker_crptr
+  worker_crptr = crptr_instance
+
+# -----------------------------------------------------------------------------
+
+def corrupt_shard_in_worker(shard, seed):
+  """Generate the duplicates for the given shard in a worker process. The
+     counts of the candidate caches of the worker for the shard are added to
+     the corruptor statistics of the shard.
+  """
+
+  cache_list = worker_crptr.candidate_cache_list
+  count_list_list = [cache.counts() for cache in cache_list]
+
+  shard_result = worker_crptr.corrupt_shard(shard, seed)
+
+  for (cache_id, cache) in enumerate(cache_list):
+    shard_result[3].add_cache_counts(cache_id, [count - prev_count for \
+                                  (count, prev_count) in zip(cache.counts(),
+                                                   count_list_list[cache_id])])
+
+  return shard_result
 
 # =============================================================================
\ No newline at end of file
@@ -0,0 +1,138 @@
+# Import necessary modules
+import functools
+import math
+
+import crptr.sampling as sampling
+
+# =============================================================================
+# Probability distributions for the number of duplicates generated for an
+# original record. Each distribution is a function which, given the maximum
+# number of duplicates per record, the ratio of the number of duplicates to the
+# number of original records, and optional (keyword) parameters, returns a
+# list of non-negative weights, where the weight at index i is the weight of
+# generating i+1 duplicates. The weights are normalised (truncated to the
+# maximum number of duplicates) by 'dup_count_pmf', which also caches them, so
+# each distribution is only calculated once for given parameters, in time
+# depending on the maximum number of duplicates only.
+#
+# Further distributions can be added with 'register_distribution'.
+
+distribution_dict = {}  # Keys are distribution names, values functions
+
+def register_distribution(dist_name, dist_function):
+  """Register a distribution function (see above) under the given name, so it
+     can be used as the 'num_dup_dist' of a Crptr object.
+  """
+
+  distribution_dict[dist_name] = dist_function
+
+  # Previously calculated distributions might be for a different function
+  #
+  dup_count_pmf.cache_clear()
+  dup_count_alias_table.cache_clear()
+
+# -----------------------------------------------------------------------------
+
+def uniform_weights(max_num_dup, dup_ratio):
+  """All numbers of duplicates are equally likely.
+  """
+
+  return [1.0] * max_num_dup
+
+# -----------------------------------------------------------------------------
+
+def poisson_weights(max_num_dup, dup_ratio, mean=None):
+  """The number of duplicates minus one follows a Poisson distribution. If no
+     mean (lambda) is given it is set to 1.0 plus the ratio of duplicates to
+     original records.
+  """
+
+  if (mean == None):
+    mean = 1.0 + dup_ratio
+
+  weight_list = [math.exp(-mean)]
+  for i in range(1, max_num_dup):  # Iterative, rather than i! and mean**i
+    weight_list.append(weight_list[-1] * mean / i)
+
+  return weight_list
+
+# -----------------------------------------------------------------------------
+
+def zipf_weights(max_num_dup, dup_ratio, theta=0.5):
+  """The likelihood of a number of duplicates is inversely proportional to
+     the number (to the power of 1-theta). The normalising constant cancels
+     out in the truncation, so it is not calculated.
+  """
+
+  return [1.0 / ((i+1) ** (1.0 - theta)) for i in range(max_num_dup)]
+
+# -----------------------------------------------------------------------------
+
+def geometric_weights(max_num_dup, dup_ratio, p=0.5):
+  """The number of duplicates follows a geometric distribution (the number of
+     trials up to and including the first success with success probability
+     'p').
+  """
+
+  return [((1.0 - p) ** i) * p for i in range(max_num_dup)]
+
+# -----------------------------------------------------------------------------
+
+def negative_binomial_weights(max_num_dup, dup_ratio, r=2.0, p=0.5):
+  """The number of duplicates minus one follows a negative binomial
+     distribution (the number of failures before the 'r'th success with
+     success probability 'p'). Calculated with the log gamma function, so 'r'
+     can be any positive number.
+  """
+
+  return [math.exp(math.lgamma(i + r) - math.lgamma(r) - math.lgamma(i + 1) +
+                   i * math.log(1.0 - p) + r * math.log(p)) \
+          for i in range(max_num_dup)]
+
+# -----------------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=None)
+def dup_count_pmf(dist_name, max_num_dup, dup_ratio, param_tuple=()):
+  """Return a tuple of probabilities (which sum to 1.0), where the probability
+     at index i is the probability to generate i+1 duplicates for a record,
+     for the named distribution truncated to the given maximum number of
+     duplicates. The 'param_tuple' contains the (name, value) pairs of the
+     parameters for the distribution function.
+  """
+
+  if (dist_name not in distribution_dict):
+    raise Exception('Unknown duplicate distribution: %s' % (str(dist_name)))
+
+  weight_list = distribution_dict[dist_name](max_num_dup, dup_ratio,
+                                             **dict(param_tuple))
+
+  if (len(weight_list) != max_num_dup):
+    raise Exception('Distribution "%s" did not return %d weights' % \
+                    (dist_name, max_num_dup))
+
+  weight_sum = sum(weight_list)
+  if ((weight_sum <= 0.0) or (min(weight_list) < 0.0)):
+    raise Exception('Distribution "%s" returned illegal weights: %s' % \
+                    (dist_name, str(weight_list)))
+
+  return tuple([w / weight_sum for w in weight_list])
+
+# -----------------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=None)
+def dup_count_alias_table(dist_name, max_num_dup, dup_ratio, param_tuple=()):
+  """Return an alias table (see module 'sampling') to sample numbers of
+     duplicates from the given distribution in constant time.
+  """
+
+  pmf_tuple = dup_count_pmf(dist_name, max_num_dup, dup_ratio, param_tuple)
+
+  return sampling.AliasTable([(pmf_tuple[i], i+1) for i in range(max_num_dup)])
+
+# -----------------------------------------------------------------------------
+
+register_distribution('uniform',           uniform_weights)
+register_distribution('poisson',           poisson_weights)
+register_distribution('zipf',              zipf_weights)
+register_distribution('geometric',         geometric_weights)
+register_distribution('negative_binomial', negative_binomial_weights)
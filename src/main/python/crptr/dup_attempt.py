@@ -0,0 +1,120 @@
+# Import necessary modules
+import random
+
+import crptr.dup_record as dup_record
+import crptr.random_streams as random_streams
+
+# =============================================================================
+# State of the duplicates being generated, shared by the interleaved engine
+# (see method 'generate_duplicates' of class 'Crptr'), which works on one
+# attempt to generate a duplicate after the other, and the batched engine (see
+# method 'generate_duplicates_batch'), which works on the attempts of many
+# original records at once.
+
+class RecordDuplicates():
+  """The duplicates being generated for one original record: the original
+     record, the number of duplicates wanted, the duplicates kept so far, and
+     the events and manifest entries for the record (which are only added to
+     the event log and manifest once the record is done, or by the batched
+     engine once all records of a shard are done, so they appear in the same
+     order as when the records are processed one by one).
+  """
+
+  __slots__ = ('org_rec_id', 'org_rec_num', 'num_dups', 'rec_list',
+               'seen_rec_set', 'new_dup_rec_list', 'next_dup_try',
+               'num_dup_tries', 'is_done', 'attempt_list', 'event_list',
+               'entry_list')
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, org_rec_id, num_dups, rec_list):
+    """Constructor, no duplicates generated and no attempts made yet.
+    """
+
+    self.org_rec_id =  org_rec_id
+    self.org_rec_num = org_rec_id.split('-')[1]
+    self.num_dups =    num_dups
+    self.rec_list =    rec_list
+
+    # The original record and the duplicates kept so far (as the keys of
+    # their modified values), and the (duplicate record identifier,
+    # duplicate record) pairs kept
+    #
+    self.seen_rec_set = set([dup_record.DuplicateRecord(rec_list).diff_key()])
+    self.new_dup_rec_list = []
+
+    self.next_dup_try =  0      # Number of the next attempt to be made
+    self.num_dup_tries = 0      # Number of attempts for the current duplicate
+    self.is_done =       False  # Set once no further duplicates are wanted
+
+    self.attempt_list = []  # Attempts made but not yet resolved
+    self.event_list =   []
+    self.entry_list =   []
+
+  # ---------------------------------------------------------------------------
+
+  def num_dups_left(self):
+    """Return the number of duplicates still to be generated.
+    """
+
+    if (self.is_done == True):
+      return 0
+
+    return self.num_dups - len(self.new_dup_rec_list)
+
+# =============================================================================
+
+class DuplicateAttempt():
+  """One attempt to generate a duplicate of an original record: the
+     duplicate record modified so far, the random number streams of the
+     attempt (keyed by the seed, the original record identifier and the
+     attempt number, or the global 'random' module without a seed), the
+     modification counters
+     (and order of attributes, see 'attr_sampling' of class 'Crptr'), and the
+     modification (attribute and corruptor identifier) selected next.
+     The events and manifest modifications of the attempt are collected in
+     lists.
+  """
+
+  __slots__ = ('rec_dups', 'dup_try', 'dup_rec', 'rng', 'attr_rng_list',
+               'attr_mod_count_array', 'num_mod_in_record', 'num_tries',
+               'attr_order_list', 'attr_order_pos', 'mod_attr_id',
+               'corruptor_id', 'event_list', 'mod_list')
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, rec_dups, seed, corruption_plan):
+    """Constructor, start the next attempt for the given record duplicates
+       (a 'RecordDuplicates' object), with random number streams keyed by the
+       given seed (or the global 'random' module if the seed is None).
+    """
+
+    self.rec_dups = rec_dups
+    self.dup_try =  rec_dups.next_dup_try
+    rec_dups.next_dup_try += 1
+
+    self.dup_rec = dup_record.DuplicateRecord(rec_dups.rec_list)
+    if (seed == None):
+      self.rng = random
+    else:
+      self.rng = random_streams.keyed_random(seed, rec_dups.org_rec_id,
+                                             self.dup_try)
+    self.attr_rng_list = [None] * corruption_plan.num_attrs
+
+    self.attr_mod_count_array = corruption_plan.new_counter_array()
+    self.num_mod_in_record = 0
+    self.num_tries =         0
+
+    # Order of the attributes to modify (only used if attributes are sampled
+    # without replacement)
+    #
+    self.attr_order_list = None
+    self.attr_order_pos =  0
+
+    self.mod_attr_id =  None
+    self.corruptor_id = None
+
+    self.event_list = []
+    self.mod_list =   []
+
+# =============================================================================
@@ -0,0 +1,197 @@
+# Import necessary modules
+import bisect
+import collections.abc
+
+# =============================================================================
+
+class DuplicateRecord(collections.abc.Sequence):
+  """A duplicate record stored as the differences to its original record:
+     a reference to the (unmodified) original record list, and the indices
+     and new values of the modified attributes (copy on write). A duplicate
+     therefore only needs memory for the values in which it differs from its
+     original.
+
+     The differences are kept in two tuples sorted by attribute index (a
+     duplicate normally differs in a few values only, and tuples need much
+     less memory than a dictionary), so two duplicates of the same original
+     record have the same values exactly if their differences are the same.
+
+     A duplicate record can be used like a (read only) record list: it can
+     be indexed and sliced (a slice is a new list), iterated over (for
+     example to write it to a CSV file), compared to record lists and
+     printed as a list. Values are modified with item assignment, which only
+     changes the differences. Use 'to_list' to expand it into a full record
+     list.
+
+     The original record list must not be modified while duplicates refer
+     to it.
+  """
+
+  # Duplicates are created in large numbers, so no per-object dictionary
+  #
+  __slots__ = ('org_rec_list', 'diff_index_tuple', 'diff_value_tuple')
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, org_rec_list, diff_dict=None):
+    """Constructor, create a duplicate of the given original record list,
+       with the given dictionary of modified values (keys are attribute
+       indices, values the modified values) if given.
+    """
+
+    self.org_rec_list =     org_rec_list
+    self.diff_index_tuple = ()
+    self.diff_value_tuple = ()
+
+    if (diff_dict != None):
+      for (attr_index, value) in diff_dict.items():
+        self[attr_index] = value
+
+  # ---------------------------------------------------------------------------
+
+  def __getitem__(self, index):
+    """Return the value at the given index, or a list of the values in the
+       given slice.
+    """
+
+    if (isinstance(index, slice)):
+      return self.to_list()[index]
+
+    if (index < 0):
+      index += len(self.org_rec_list)
+
+    if (index in self.diff_index_tuple):
+      return self.diff_value_tuple[self.diff_index_tuple.index(index)]
+
+    return self.org_rec_list[index]
+
+  # ---------------------------------------------------------------------------
+
+  def __setitem__(self, index, value):
+    """Set the value at the given index. Setting a value back to the value of
+       the original record removes it from the differences.
+    """
+
+    if (index < 0):
+      index += len(self.org_rec_list)
+    if ((index < 0) or (index >= len(self.org_rec_list))):
+      raise IndexError('Duplicate record index out of range: %d' % (index))
+
+    index_tuple = self.diff_index_tuple
+    value_tuple = self.diff_value_tuple
+
+    i = bisect.bisect_left(index_tuple, index)
+
+    if ((i < len(index_tuple)) and (index_tuple[i] == index)):
+      j = i+1  # Replace the existing difference
+    else:
+      j = i
+
+    if (value == self.org_rec_list[index]):
+      self.diff_index_tuple = index_tuple[:i] + index_tuple[j:]
+      self.diff_value_tuple = value_tuple[:i] + value_tuple[j:]
+    else:
+      self.diff_index_tuple = index_tuple[:i] + (index,) + index_tuple[j:]
+      self.diff_value_tuple = value_tuple[:i] + (value,) + value_tuple[j:]
+
+  # ---------------------------------------------------------------------------
+
+  def __len__(self):
+    """Return the number of attributes of the record.
+    """
+
+    return len(self.org_rec_list)
+
+  # ---------------------------------------------------------------------------
+
+  def __iter__(self):
+    """Iterate over the values of the record.
+    """
+
+    if (self.diff_index_tuple == ()):
+      return iter(self.org_rec_list)
+
+    return iter(self.to_list())
+
+  # ---------------------------------------------------------------------------
+
+  def __eq__(self, other):
+    """Duplicate records are equal to record lists and other duplicate
+       records with the same values.
+    """
+
+    if (isinstance(other, DuplicateRecord)):
+      if (other.org_rec_list is self.org_rec_list):
+        return (self.diff_key() == other.diff_key())
+      return (self.to_list() == other.to_list())
+
+    if (isinstance(other, list)):
+      return (self.to_list() == other)
+
+    return NotImplemented
+
+  __hash__ = None  # Modifiable, like lists
+
+  # ---------------------------------------------------------------------------
+
+  def __repr__(self):
+    """Duplicate records are printed like record lists.
+    """
+
+    return repr(self.to_list())
+
+  # ---------------------------------------------------------------------------
+
+  def copy(self):
+    """Return a new duplicate record with the same values (sharing the
+       original record list).
+    """
+
+    dup_rec = DuplicateRecord(self.org_rec_list)
+    dup_rec.diff_index_tuple = self.diff_index_tuple
+    dup_rec.diff_value_tuple = self.diff_value_tuple
+
+    return dup_rec
+
+  # ---------------------------------------------------------------------------
+
+  def is_modified(self):
+    """Return True if any value of the duplicate differs from the original
+       record.
+    """
+
+    return (self.diff_index_tuple != ())
+
+  # ---------------------------------------------------------------------------
+
+  def diff_dict(self):
+    """Return the differences to the original record as a dictionary, with
+       attribute indices as keys and the modified values as values.
+    """
+
+    return dict(zip(self.diff_index_tuple, self.diff_value_tuple))
+
+  # ---------------------------------------------------------------------------
+
+  def diff_key(self):
+    """Return a hashable key of the modified values, which is the same for
+       two duplicates of the same original record exactly if they have the
+       same values (and empty if the duplicate equals its original).
+    """
+
+    return (self.diff_index_tuple, self.diff_value_tuple)
+
+  # ---------------------------------------------------------------------------
+
+  def to_list(self):
+    """Return the values of the record as a new (full) record list.
+    """
+
+    rec_list = self.org_rec_list[:]
+    for (attr_index, value) in zip(self.diff_index_tuple,
+                                   self.diff_value_tuple):
+      rec_list[attr_index] = value
+
+    return rec_list
+
+# =============================================================================
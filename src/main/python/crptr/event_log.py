@@ -0,0 +1,230 @@
+# Import necessary modules
+import json
+import sys
+
+import crptr.base_functions as base_functions
+
+# Verbosity levels of an event log, each level includes the events of the
+# levels before it
+#
+LOG_OFF =     0  # No events are logged
+LOG_SUMMARY = 1  # Duplicate distribution, histogram and failed duplicates
+LOG_CHANGES = 2  # Plus each modification applied and duplicate identifiers
+LOG_FULL =    3  # Plus original and duplicate records (the original log)
+
+LOG_LEVEL_DICT = {'off':LOG_OFF, 'summary':LOG_SUMMARY,
+                  'changes':LOG_CHANGES, 'full':LOG_FULL}
+
+# Level at which each event type is logged
+#
+EVENT_LEVEL_DICT = {'distribution':  LOG_SUMMARY,
+                    'histogram':     LOG_SUMMARY,
+                    'record':        LOG_FULL,
+                    'dup_id':        LOG_CHANGES,
+                    'modify':        LOG_CHANGES,
+                    'modify_record': LOG_CHANGES,
+                    'same_dup':      LOG_FULL,
+                    'dup_failed':    LOG_SUMMARY,
+                    'duplicate':     LOG_FULL}
+
+# =============================================================================
+
+class EventLog():
+  """Buffered log of the events (selected corruptors, modified values,
+     generated duplicates, etc.) of a Crptr run.
+
+     Events are tuples whose first element is the event type (see
+     EVENT_LEVEL_DICT) followed by the values describing the event. They are
+     kept in a buffer and only formatted and written once the buffer is full
+     (or 'flush' is called), so that generating events costs little more than
+     creating a tuple. The code generating events should check the 'level'
+     attribute before creating events, so that no work at all is done for
+     events which are not logged.
+
+     The arguments that can be set when an EventLog instance is initialised
+     are:
+
+     out_file     The file object to write the events to. If not given the
+                  events are written to the current 'sys.stdout'.
+     level        The verbosity level, one of 'off', 'summary', 'changes' and
+                  'full' (default).
+     log_format   The format events are written in, either 'text' (default,
+                  human readable lines) or 'jsonl' (one JSON list per event).
+     buffer_size  The number of events to buffer before they are written,
+                  default is 10000. If set to None events are never written
+                  automatically but kept in the buffer, see 'take_events'.
+  """
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, out_file=None, level='full', log_format='text',
+               buffer_size=10000):
+    """Constructor, set attributes and check arguments.
+    """
+
+    if (level not in LOG_LEVEL_DICT):
+      raise Exception('Illegal value given for "level": %s' % (str(level)))
+    if (log_format not in ['text', 'jsonl']):
+      raise Exception('Illegal value given for "log_format": %s' % \
+                      (str(log_format)))
+    if (buffer_size != None):
+      base_functions.check_is_integer('buffer_size', buffer_size)
+      base_functions.check_is_positive('buffer_size', buffer_size)
+
+    self.out_file =    out_file
+    self.level_name =  level
+    self.level =       LOG_LEVEL_DICT[level]
+    self.log_format =  log_format
+    self.buffer_size = buffer_size
+
+    self.event_buffer = []
+
+  # ---------------------------------------------------------------------------
+
+  def __getstate__(self):
+    """When pickled (for example to be sent to a worker process) neither the
+       output file nor the buffered events are included.
+    """
+
+    state = self.__dict__.copy()
+    state['out_file'] = None
+    state['event_buffer'] = []
+
+    return state
+
+  # ---------------------------------------------------------------------------
+
+  def log(self, event):
+    """Add the given event tuple to the log if its type is logged at the
+       verbosity level of this log.
+    """
+
+    if (EVENT_LEVEL_DICT[event[0]] <= self.level):
+      self.event_buffer.append(event)
+
+      if ((self.buffer_size != None) and \
+          (len(self.event_buffer) >= self.buffer_size)):
+        self.flush()
+
+  # ---------------------------------------------------------------------------
+
+  def log_events(self, event_list):
+    """Add the given list of events (for example as collected in a worker
+       process) to the log.
+    """
+
+    for event in event_list:
+      self.log(event)
+
+  # ---------------------------------------------------------------------------
+
+  def take_events(self):
+    """Remove all buffered events from the log and return them as a list.
+    """
+
+    event_list = self.event_buffer
+    self.event_buffer = []
+
+    return event_list
+
+  # ---------------------------------------------------------------------------
+
+  def flush(self):
+    """Format and write all buffered events to the output file.
+    """
+
+    if (self.event_buffer == []):
+      return
+
+    event_list = self.take_events()
+
+    if (self.log_format == 'jsonl'):
+      out_str = ''.join([json.dumps(event, ensure_ascii=False) + '\n' \
+                         for event in event_list])
+    else:
+      out_str = ''.join([format_text_event(event) for event in event_list])
+
+    if (self.out_file == None):
+      sys.stdout.write(out_str)
+    else:
+      self.out_file.write(out_str)
+
+# =============================================================================
+
+def format_text_event(event):
+  """Return the given event tuple formatted as human readable text (this is
+     the format of the log output of the original Crptr).
+  """
+
+  event_type = event[0]
+
+  if (event_type == 'distribution'):
+    return 'Probability distribution for number of duplicates per ' + \
+           'record:\n%s\n' % (str(event[1]))
+
+  elif (event_type == 'histogram'):
+    line_list = ['Distribution of number of original records with certain ' + \
+                 'number of duplicates:\n']
+    for (num_dups, num_recs) in event[1]:
+      line_list.append(' Number of records with %d duplicates: %d\n' % \
+                       (num_dups, num_recs))
+    line_list.append('\n')
+    return ''.join(line_list)
+
+  elif (event_type == 'record'):
+    return '\nGenerating %d modified (duplicate) records for record "%s"\n' % \
+           (event[2], event[1])
+
+  elif (event_type == 'dup_id'):
+    return '  Generate identifier for duplicate record based on "%s": %s\n' % \
+           (event[1], event[2])
+
+  elif (event_type in ['modify', 'modify_record']):
+    (attr_name, corruptor_name, org_val, new_val) = event[1:]
+
+    # The following weird string printing construct is to overcome problems
+    # with printing non-ASCII characters
+    #
+    if (event_type == 'modify'):
+      val_type = 'attribute'
+      org_str = str([org_val])[1:-1]
+      new_str = str([new_val])[1:-1]
+    else:
+      val_type = 'record'
+      org_str = str(org_val)[1:-1]
+      new_str = str(new_val)[1:-1]
+
+    return '  Selected attribute for modification: %s\n' % (attr_name) + \
+           '    Selected corruptor: %s\n' % (corruptor_name) + \
+           '      Original %s value: %s\n' % (val_type, org_str) + \
+           '      Modified %s value: %s\n' % (val_type, new_str)
+
+  elif (event_type == 'same_dup'):
+    return 'Same duplicate: %s\n' % (str(event[1])) + \
+           '                %s\n' % (str(event[2]))
+
+  elif (event_type == 'dup_failed'):
+    return 'Could not generate %d more different duplicate(s) for record ' % \
+           (event[2]) + '"%s" in %d attempts, skipping\n' % (event[1], event[3])
+
+  elif (event_type == 'duplicate'):
+    (org_rec_list, dup_rec_list, num_mod_in_record, attr_mod_count_list,
+     num_dup_rec_created, number_of_mod_records) = event[3:]
+
+    attr_mod_str = '('
+    for (attr_name, attr_mod_count) in attr_mod_count_list:
+      attr_mod_str += '%d in %s, ' % (attr_mod_count, attr_name)
+    attr_mod_str = attr_mod_str[:-1] + '):'
+
+    return 'Original record:\n' + \
+           '  %s\n' % (str(org_rec_list)) + \
+           'Record with %d modified attributes %s\n' % (num_mod_in_record,
+                                                        attr_mod_str) + \
+           '  %s\n' % (str(dup_rec_list)) + \
+           '%d of %d duplicate records generated so far\n\n' % \
+           (num_dup_rec_created, number_of_mod_records)
+
+  else:
+    raise Exception('Illegal event type: %s' % (str(event_type)))
+
+# =============================================================================
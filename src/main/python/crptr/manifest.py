@@ -0,0 +1,156 @@
+# Import necessary modules
+import csv
+import json
+
+import crptr.base_functions as base_functions
+
+# Columns of a manifest written in CSV format, one row per modification
+#
+CSV_HEADER_LIST = ['org_rec_id', 'dup_rec_id', 'attribute', 'corruptor',
+                   'before', 'after']
+
+# =============================================================================
+
+class Manifest():
+  """Machine readable ground truth of the duplicates generated by a Crptr
+     run: for each duplicate the identifiers of the original and duplicate
+     record, and for each modification applied to it the attribute, the name
+     of the corruptor and the value before and after the modification.
+
+     Entries are (original record identifier, duplicate record identifier,
+     list of (attribute name, corruptor name, value before, value after)
+     tuples) triples, added when a duplicate has been generated. Like the
+     events of an EventLog, they are kept in a buffer and only formatted and
+     written once the buffer is full (or 'flush' is called), so the manifest
+     is written incrementally while duplicates are generated.
+
+     Modifications of record level corruptors (see module 'corrupt_records')
+     are listed per attribute they changed.
+
+     The arguments that can be set when a Manifest instance is initialised
+     are:
+
+     out_file         The file object to write the manifest to (opened with
+                      newline='' for the 'csv' format). Can be None if the
+                      entries are only collected, see 'take_entries'.
+     manifest_format  The format the manifest is written in, either 'jsonl'
+                      (default, one JSON object per duplicate) or 'csv' (one
+                      row per modification, see CSV_HEADER_LIST, with a row
+                      with empty modification columns for a duplicate without
+                      modifications).
+     buffer_size      The number of duplicates to buffer before their entries
+                      are written, default is 10000. If set to None entries
+                      are never written automatically but kept in the buffer,
+                      see 'take_entries'.
+  """
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, out_file, manifest_format='jsonl', buffer_size=10000):
+    """Constructor, set attributes and check arguments.
+    """
+
+    if (manifest_format not in ['jsonl', 'csv']):
+      raise Exception('Illegal value given for "manifest_format": %s' % \
+                      (str(manifest_format)))
+    if (buffer_size != None):
+      base_functions.check_is_integer('buffer_size', buffer_size)
+      base_functions.check_is_positive('buffer_size', buffer_size)
+
+    self.out_file =        out_file
+    self.manifest_format = manifest_format
+    self.buffer_size =     buffer_size
+
+    self.entry_buffer = []
+    self.header_written = False
+
+  # ---------------------------------------------------------------------------
+
+  def __getstate__(self):
+    """When pickled (for example to be sent to a worker process) neither the
+       output file nor the buffered entries are included.
+    """
+
+    state = self.__dict__.copy()
+    state['out_file'] = None
+    state['entry_buffer'] = []
+
+    return state
+
+  # ---------------------------------------------------------------------------
+
+  def add(self, org_rec_id, dup_rec_id, mod_list):
+    """Add the entry for a generated duplicate to the manifest, with the
+       given list of (attribute name, corruptor name, value before, value
+       after) modifications.
+    """
+
+    self.entry_buffer.append((org_rec_id, dup_rec_id, mod_list))
+
+    if ((self.buffer_size != None) and \
+        (len(self.entry_buffer) >= self.buffer_size)):
+      self.flush()
+
+  # ---------------------------------------------------------------------------
+
+  def add_entries(self, entry_list):
+    """Add the given list of entries (for example as collected in a worker
+       process) to the manifest.
+    """
+
+    for (org_rec_id, dup_rec_id, mod_list) in entry_list:
+      self.add(org_rec_id, dup_rec_id, mod_list)
+
+  # ---------------------------------------------------------------------------
+
+  def take_entries(self):
+    """Remove all buffered entries from the manifest and return them as a
+       list.
+    """
+
+    entry_list = self.entry_buffer
+    self.entry_buffer = []
+
+    return entry_list
+
+  # ---------------------------------------------------------------------------
+
+  def flush(self):
+    """Format and write all buffered entries to the output file.
+    """
+
+    if ((self.manifest_format == 'csv') and (self.header_written == False)):
+      csv.writer(self.out_file).writerow(CSV_HEADER_LIST)
+      self.header_written = True
+
+    if (self.entry_buffer == []):
+      return
+
+    entry_list = self.take_entries()
+
+    if (self.manifest_format == 'jsonl'):
+      line_list = []
+      for (org_rec_id, dup_rec_id, mod_list) in entry_list:
+        mod_dict_list = []
+        for (attr_name, corruptor_name, before_val, after_val) in mod_list:
+          mod_dict_list.append({'attribute': attr_name,
+                                'corruptor': corruptor_name,
+                                'before':    before_val,
+                                'after':     after_val})
+
+        line_list.append(json.dumps({'org_rec_id':    org_rec_id,
+                                     'dup_rec_id':    dup_rec_id,
+                                     'modifications': mod_dict_list},
+                                    ensure_ascii=False) + '\n')
+      self.out_file.write(''.join(line_list))
+
+    else:
+      row_list = []
+      for (org_rec_id, dup_rec_id, mod_list) in entry_list:
+        if (mod_list == []):
+          row_list.append([org_rec_id, dup_rec_id, '', '', '', ''])
+        for mod_tuple in mod_list:
+          row_list.append([org_rec_id, dup_rec_id] + list(mod_tuple))
+      csv.writer(self.out_file).writerows(row_list)
+
+# =============================================================================
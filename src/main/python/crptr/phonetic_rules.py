@@ -0,0 +1,306 @@
+# Import necessary modules
+from crptr.aho_corasick import AhoCorasick
+
+# Kinds of the conditions on the characters before (precondition) and after
+# (postcondition) a pattern
+#
+COND_NONE =      0  # No condition ('None')
+COND_VOWEL =     1  # A vowel ('V')
+COND_CONSONANT = 2  # Not a vowel ('C')
+COND_CONTEXT =   3  # Character sequences at an offset (such as 'n;-1;e;i')
+COND_FALSE =     4  # Any other condition, which never holds
+
+VOWELS = 'aeiouy'
+
+# =============================================================================
+
+class PhoneticRules():
+  """Compiled form of the rule table of a 'CorruptValuePhonetic' object,
+     which returns the phonetic modifications possible for a string without
+     evaluating every rule of the table on it.
+
+     The original patterns of the rules are compiled into an Aho-Corasick
+     automaton (see module 'aho_corasick'), so a single scan of a string
+     finds all positions of all patterns, and only rules whose pattern occurs
+     in the string are evaluated. The conditions of a rule are parsed into
+     tuples when the table is compiled (rather than split on every call), and
+     are checked at these positions.
+
+     The rules are applied as by the method '__get_transformation__' of class
+     'CorruptValuePhonetic', including its particular behaviour: a rule only
+     checks occurrences of its pattern up to the first one starting at one
+     of the last two positions of the string, the existence and start
+     conditions only check their first, second, fourth, ... character
+     sequence, a negated start condition checks if a sequence occurs
+     anywhere in the string, a rule is left out if its modification (in the
+     'orgpat>newpat>where' form) is contained in the modifications found
+     before, and no rules apply to strings with non-ASCII characters.
+
+     Compiled rules are tuples, so objects of this class can be pickled.
+  """
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, replace_table):
+    """Constructor, compile the given list of rule tuples (each with the
+       seven columns of the phonetic lookup file).
+    """
+
+    self.rule_list = []  # Compiled rules, in the order of the table
+
+    pattern_rule_dict = {}  # Keys are patterns, values lists of rule numbers
+
+    for (rule_num, rule_tuple) in enumerate(replace_table):
+      (where, org_pat, new_pat, pre_cond, post_cond, exist_cond,
+       start_cond) = rule_tuple
+
+      change_tuple = (org_pat, new_pat, where.lower())
+
+      self.rule_list.append((where, len(org_pat), change_tuple,
+                             '>'.join(change_tuple),
+                             self.compile_position_cond(pre_cond),
+                             self.compile_position_cond(post_cond),
+                             self.compile_exist_cond(exist_cond),
+                             self.compile_start_cond(start_cond)))
+
+      pattern_rule_dict.setdefault(org_pat, []).append(rule_num)
+
+    self.pattern_rule_dict = pattern_rule_dict
+    self.automaton = AhoCorasick(list(pattern_rule_dict.keys()))
+
+  # ---------------------------------------------------------------------------
+
+  def compile_position_cond(self, cond_str):
+    """Return a (kind, context tuple) pair for the given precondition or
+       postcondition, where the context tuple holds (negated flag, offset,
+       tuple of character sequences) triples. As when the rules are applied
+       one by one, only the first two parts of a condition with parts
+       separated by '|' are used.
+    """
+
+    if (cond_str == 'None'):
+      return (COND_NONE, ())
+    elif (cond_str == 'V'):
+      return (COND_VOWEL, ())
+    elif (cond_str == 'C'):
+      return (COND_CONSONANT, ())
+    elif (';' not in cond_str):
+      return (COND_FALSE, ())
+
+    if ('|' in cond_str):
+      part_list = cond_str.split('|')[:2]
+    else:
+      part_list = [cond_str]
+
+    context_list = []
+
+    for part_str in part_list:
+      rl = part_str.split(';')
+      context_list.append((rl[0] == 'n', int(rl[1]), tuple(rl[2:])))
+
+    return (COND_CONTEXT, tuple(context_list))
+
+  # ---------------------------------------------------------------------------
+
+  def compile_exist_cond(self, cond_str):
+    """Return None if there is no existence condition, otherwise a (negated
+       flag, is Slavo-Germanic flag, tuple of character sequences) triple.
+    """
+
+    if (cond_str == 'None'):
+      return None
+
+    rl = cond_str.split(';')
+
+    if (rl[1] == 'slavo'):
+      return (rl[0] == 'n', True, ())
+
+    return (rl[0] == 'n', False, self.doubling_index_tuple(rl))
+
+  # ---------------------------------------------------------------------------
+
+  def compile_start_cond(self, cond_str):
+    """Return None if there is no start condition, otherwise a (negated
+       flag, tuple of character sequences) pair.
+    """
+
+    if (cond_str == 'None'):
+      return None
+
+    rl = cond_str.split(';')
+
+    return (rl[0] == 'n', self.doubling_index_tuple(rl))
+
+  # ---------------------------------------------------------------------------
+
+  def doubling_index_tuple(self, rl):
+    """Return the values of the given list at indices 1, 2, 4, 8, ... (the
+       character sequences of existence and start conditions which are
+       checked).
+    """
+
+    val_list = []
+
+    i = 1
+    while (i < len(rl)):
+      val_list.append(rl[i])
+      i += i
+
+    return tuple(val_list)
+
+  # ---------------------------------------------------------------------------
+
+  def changes(self, in_str):
+    """Return the list of (original pattern, new pattern, where) tuples of
+       the phonetic modifications possible for the given string, in the
+       order of the rule table (without duplicate modifications).
+    """
+
+    if (not all(ord(c) < 128 for c in in_str)):
+      return []
+
+    pos_list_dict = {}  # Keys are patterns, values positions in the string
+
+    for (pat_start, pat_len) in self.automaton.find_all(in_str):
+      org_pat = in_str[pat_start:pat_start+pat_len]
+      pos_list_dict.setdefault(org_pat, []).append(pat_start)
+
+    if (pos_list_dict == {}):
+      return []
+
+    rule_num_list = []
+    for (org_pat, pos_list) in pos_list_dict.items():
+      pos_list.sort()
+      rule_num_list.extend(self.pattern_rule_dict[org_pat])
+    rule_num_list.sort()
+
+    change_list = []
+    changes_str = ''
+
+    for rule_num in rule_num_list:
+      rule = self.rule_list[rule_num]
+      change_str = rule[3]
+
+      if (self.rule_applies(rule, in_str, pos_list_dict)):
+        if (changes_str.find(change_str) == -1):
+          changes_str += change_str + ';'
+          change_list.append(rule[2])
+
+    return change_list
+
+  # ---------------------------------------------------------------------------
+
+  def rule_applies(self, rule, in_str, pos_list_dict):
+    """Check if the given compiled rule applies to at least one of the
+       positions (checked one after the other) of its pattern in the given
+       string.
+    """
+
+    (where, pat_len, change_tuple, change_str, pre_cond, post_cond,
+     exist_cond, start_cond) = rule
+
+    if ((exist_cond != None) and \
+        (not self.exist_cond_holds(exist_cond, in_str))):
+      return False
+
+    if ((start_cond != None) and \
+        (not self.start_cond_holds(start_cond, in_str))):
+      return False
+
+    str_len = len(in_str)
+
+    for pat_start in pos_list_dict[change_tuple[0]]:
+      pat_end = pat_start + pat_len
+
+      if (((where == 'ALL') or \
+           ((where == 'START') and (pat_start == 0)) or \
+           ((where == 'MIDDLE') and (pat_start > 0) and (pat_end < str_len)) or \
+           ((where == 'END') and (pat_end == str_len))) and \
+          ((pre_cond[0] == COND_NONE) or ((pat_start > 0) and \
+           self.position_cond_holds(pre_cond, in_str, pat_start, pat_len,
+                                    pat_start-1))) and \
+          ((post_cond[0] == COND_NONE) or ((pat_end < str_len) and \
+           self.position_cond_holds(post_cond, in_str, pat_start, pat_len,
+                                    pat_end)))):
+        return True
+
+      if (pat_start+1 >= str_len-1):  # No further positions are checked
+        return False
+
+    return False
+
+  # ---------------------------------------------------------------------------
+
+  def position_cond_holds(self, cond, in_str, pat_start, pat_len, char_pos):
+    """Check if the given compiled precondition or postcondition holds for
+       the pattern at the given position, where 'char_pos' is the position
+       of the character before or after the pattern.
+    """
+
+    (cond_kind, context_tuple) = cond
+
+    if (cond_kind == COND_VOWEL):
+      return (in_str[char_pos] in VOWELS)
+    elif (cond_kind == COND_CONSONANT):
+      return (in_str[char_pos] not in VOWELS)
+    elif (cond_kind == COND_FALSE):
+      return False
+
+    for (is_negated, offset, seq_tuple) in context_tuple:
+      if (offset < 0):
+        index = pat_start + offset
+      else:
+        index = pat_start + (pat_len-1) + offset
+
+      is_found = False
+      for seq in seq_tuple:
+        if (in_str[index:(index+len(seq))] == seq):
+          is_found = True
+          break
+
+      if (is_negated == True):
+        if ((is_found == True) or (seq_tuple == ())):
+          return False
+      elif (is_found == False):
+        return False
+
+    return True
+
+  # ---------------------------------------------------------------------------
+
+  def exist_cond_holds(self, cond, in_str):
+    """Check if the given compiled existence condition holds for the given
+       string.
+    """
+
+    (is_negated, is_slavo, seq_tuple) = cond
+
+    if (is_slavo == True):
+      is_found = ((in_str.find('w') > -1) or (in_str.find('k') > -1) or \
+                  (in_str.find('cz') > -1) or (in_str.find('witz') > -1))
+      return (is_found != is_negated)
+
+    is_found = any([(seq in in_str) for seq in seq_tuple])
+
+    if (is_negated == True):
+      return ((is_found == False) and (seq_tuple != ()))
+
+    return is_found
+
+  # ---------------------------------------------------------------------------
+
+  def start_cond_holds(self, cond, in_str):
+    """Check if the given compiled start condition holds for the given
+       string (a negated condition holds if none of its character sequences
+       occurs anywhere in the string).
+    """
+
+    (is_negated, seq_tuple) = cond
+
+    if (is_negated == True):
+      return ((seq_tuple != ()) and \
+              (not any([(seq in in_str) for seq in seq_tuple])))
+
+    return any([in_str.startswith(seq) for seq in seq_tuple])
+
+# =============================================================================
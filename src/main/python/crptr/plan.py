@@ -0,0 +1,149 @@
+# Import necessary modules
+import array
+
+import crptr.sampling as sampling
+
+# Name of the pseudo attribute whose corruptors modify whole records
+#
+RECORD_ATTR_NAME = 'crptr-record'
+
+# =============================================================================
+
+class CorruptionPlan():
+  """Compiled form of the attribute and corruptor settings of a Crptr
+     object, built once when the Crptr object is initialised so that no
+     dictionaries need to be built and no lists searched while duplicates
+     are generated.
+
+     Attributes that can be modified (i.e. that have a probability larger
+     than 0.0) are given integer identifiers 0, 1, ... in the order in which
+     they appear in the attribute probability dictionary (the order the
+     attribute alias table is built in), and each distinct corruptor object
+     an integer identifier in the order in which it is first listed for the
+     attributes in column order.
+     The plan contains:
+
+     attr_name_tuple         The names of the attributes that can be modified,
+                             indexed by attribute identifier.
+     attr_col_tuple          For each attribute identifier the index of the
+                             attribute in the records (the column index).
+     attr_id_col_order_tuple The attribute identifiers in the order of their
+                             column indices.
+     attr_is_record_tuple    For each attribute identifier if the attribute is
+                             the record level pseudo attribute 'crptr-record'.
+     corruptor_tuple         The corruptor objects, indexed by corruptor
+                             identifier.
+     attr_prob_tuple         For each attribute identifier the probability
+                             that the attribute is selected for modification.
+     attr_prob_id_tuple      The (probability, attribute identifier) pairs of
+                             the attributes, which the alias table is built
+                             from (and which 'attr_sampling' without
+                             replacement orders).
+     attr_alias_table        Alias table to sample attribute identifiers.
+     attr_corruptor_alias_tuple  For each attribute identifier an alias table
+                             to sample corruptor identifiers.
+     attr_corruptor_prob_tuple   For each attribute identifier a tuple of the
+                             (probability, corruptor identifier) pairs its
+                             alias table was built from (without pairs with
+                             probability 0.0).
+
+     Plan objects can not be modified once they are built, and they can be
+     pickled (for example to be sent to worker processes).
+  """
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, attribute_name_list, attr_mod_prob_dict,
+               attr_mod_data_dict):
+    """Constructor, compile the given (already checked) attribute list,
+       attribute probability dictionary and attribute modification data
+       dictionary (as given to a Crptr object).
+    """
+
+    # Attribute identifiers follow the order of the probability dictionary,
+    # which the attribute alias table is built in, so the same random
+    # numbers select the same attributes as when it was sampled directly
+    #
+    attr_name_list = []
+    attr_col_list =  []
+    for (attr_name, attr_prob) in attr_mod_prob_dict.items():
+      if (attr_prob > 0.0):
+        attr_name_list.append(attr_name)
+        attr_col_list.append(attribute_name_list.index(attr_name))
+
+    # Attribute identifiers in the order of the columns, which the counts of
+    # modified attributes are logged in
+    #
+    attr_id_col_order_list = sorted(range(len(attr_name_list)),
+                                    key=lambda attr_id: attr_col_list[attr_id])
+
+    # Corruptor identifiers in the order the corruptors are first listed
+    # for the attributes in column order
+    #
+    corruptor_list = []
+
+    for attr_id in attr_id_col_order_list:
+      attr_name = attr_name_list[attr_id]
+      if (attr_name not in attr_mod_data_dict):
+        raise Exception('No corruptors given in "attr_mod_data_dict" for ' + \
+                        'attribute "%s"' % (attr_name))
+
+      for (corruptor_prob, corruptor) in attr_mod_data_dict[attr_name]:
+        if (not any([check_corruptor is corruptor for check_corruptor \
+                     in corruptor_list])):
+          corruptor_list.append(corruptor)
+
+    attr_corruptor_alias_list = []
+    attr_corruptor_prob_list =  []
+
+    for attr_name in attr_name_list:
+      prob_corruptor_id_list = []
+      for (corruptor_prob, corruptor) in attr_mod_data_dict[attr_name]:
+        for (i, check_corruptor) in enumerate(corruptor_list):
+          if (check_corruptor is corruptor):
+            corruptor_id = i
+        prob_corruptor_id_list.append((corruptor_prob, corruptor_id))
+
+      attr_corruptor_alias_list.append(
+                                 sampling.AliasTable(prob_corruptor_id_list))
+      attr_corruptor_prob_list.append(tuple([(corruptor_prob, corruptor_id) \
+                     for (corruptor_prob, corruptor_id) in prob_corruptor_id_list \
+                     if (corruptor_prob > 0.0)]))
+
+    self.__dict__['attr_name_tuple'] =      tuple(attr_name_list)
+    self.__dict__['attr_col_tuple'] =       tuple(attr_col_list)
+    self.__dict__['attr_id_col_order_tuple'] = tuple(attr_id_col_order_list)
+    self.__dict__['attr_is_record_tuple'] = tuple([attr_name == \
+                                 RECORD_ATTR_NAME for attr_name in attr_name_list])
+    self.__dict__['corruptor_tuple'] =      tuple(corruptor_list)
+    self.__dict__['num_attrs'] =            len(attr_name_list)
+    self.__dict__['attr_prob_tuple'] =      tuple([attr_mod_prob_dict[attr_name] \
+                                                   for attr_name in attr_name_list])
+    self.__dict__['attr_prob_id_tuple'] =   tuple([(attr_mod_prob_dict[attr_name],
+                                                    attr_id) for (attr_id,
+                                           attr_name) in enumerate(attr_name_list)])
+    self.__dict__['attr_alias_table'] =     sampling.AliasTable(
+                                              list(self.attr_prob_id_tuple))
+    self.__dict__['attr_corruptor_alias_tuple'] = \
+                                             tuple(attr_corruptor_alias_list)
+    self.__dict__['attr_corruptor_prob_tuple'] = \
+                                             tuple(attr_corruptor_prob_list)
+
+  # ---------------------------------------------------------------------------
+
+  def __setattr__(self, name, value):
+    """Plan objects can not be modified.
+    """
+
+    raise Exception('A CorruptionPlan can not be modified')
+
+  # ---------------------------------------------------------------------------
+
+  def new_counter_array(self):
+    """Return a new array of counters (integers set to 0), one per attribute
+       identifier.
+    """
+
+    return array.array('i', [0]) * self.num_attrs
+
+# =============================================================================
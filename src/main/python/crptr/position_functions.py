@@ -1,28 +1,49 @@
 # Import necessary modules
+import functools
+import math
 import random
 
 # =============================================================================
 # Helper functions to randomly select a position for where to apply a
 # modification
 
-def position_mod_uniform(in_str):
+def position_mod_uniform(in_str, rng=None):
   """Select any position in the given input string with uniform likelihood.
 
      Return 0 is the string is empty.
+
+     The random numbers are drawn from the given random number generator, or
+     from the global 'random' module if no generator is given (this applies
+     to all position functions).
   """
 
+  if (rng == None):
+    rng = random
+
   if (in_str == ''):  # Empty input string
     return 0
 
   max_pos = len(in_str)-1
 
-  pos = random.randint(0, max_pos)  # String positions start at 0
+  pos = rng.randint(0, max_pos)  # String positions start at 0
 
   return pos
 
 # -----------------------------------------------------------------------------
 
-def position_mod_normal(in_str):
+def position_mod_none(in_str, rng=None):
+  """Dummy position function for corruptors which do not make use of a
+     position. Always returns 0.
+
+     Defined at module level (rather than inside the corruptor constructors)
+     so corruptors can be pickled and sent to worker processes.
+  """
+
+  return 0
+
+# -----------------------------------------------------------------------------
+
+def position_mod_normal(in_str, rng=None):
   """Select any position in the given input string with normally distributed
      likelihood where the average of the normal distribution is set to one
      character behind the middle of the string, and the standard deviation is
@@ -35,6 +56,9 @@ def position_mod_normal(in_str):
      Return 0 is the string is empty.
   """
 
+  if (rng == None):
+    rng = random
+
   if (in_str == ''):  # Empty input string
     return 0
 
@@ -51,8 +75,107 @@ def position_mod_normal(in_str):
   if mid_pos > max_pos:
     mid_pos = max_pos
 
-  pos = int(round(random.gauss(mid_pos, std_dev)))
+  pos = int(round(rng.gauss(mid_pos, std_dev)))
   while ((pos < 0) or (pos > max_pos)):
-    pos = int(round(random.gauss(mid_pos, std_dev)))
+    pos = int(round(rng.gauss(mid_pos, std_dev)))
 
   return pos
+
+# =============================================================================
+# The probability of each position of a string to be selected by a position
+# function, so a position can be sampled among those where a modification is
+# possible (for example with a match index, see 'CorruptValueOCR') rather
+# than by trying positions until a modification is possible.
+
+def position_weights_uniform(in_str):
+  """Return the weights of the positions of the given string for
+     'position_mod_uniform', all the same.
+  """
+
+  return [1.0] * max(len(in_str), 1)
+
+# -----------------------------------------------------------------------------
+
+def position_weights_none(in_str):
+  """Return the weights of the positions of the given string for
+     'position_mod_none', which always selects the first position.
+  """
+
+  return [1.0] + [0.0] * (len(in_str)-1)
+
+# -----------------------------------------------------------------------------
+
+@functools.lru_cache(maxsize=256)
+def normal_weight_tuple(str_len):
+  """Return the weights of the positions of a string of the given length
+     for 'position_mod_normal': the probability that the rounded normally
+     distributed value falls on each position, normalised over the positions
+     of the string (as values outside are drawn again).
+  """
+
+  if (str_len <= 1):
+    return (1.0,)
+
+  mid_pos = (str_len - 1) / 2.0 + 1
+  std_dev = str_len / 6.0
+  max_pos = str_len - 1
+
+  if mid_pos > max_pos:
+    mid_pos = max_pos
+
+  def normal_cdf(x):
+    return 0.5 * (1.0 + math.erf((x - mid_pos) / (std_dev * math.sqrt(2.0))))
+
+  weight_list = [normal_cdf(pos + 0.5) - normal_cdf(pos - 0.5) for pos in \
+                 range(str_len)]
+  weight_sum = sum(weight_list)
+
+  return tuple([weight / weight_sum for weight in weight_list])
+
+# -----------------------------------------------------------------------------
+
+def position_weights_normal(in_str):
+  """Return the weights of the positions of the given string for
+     'position_mod_normal'.
+  """
+
+  return list(normal_weight_tuple(len(in_str)))
+
+# -----------------------------------------------------------------------------
+
+# Weight functions of the position functions, further ones can be added with
+# 'register_position_weights'
+#
+position_weights_dict = {position_mod_uniform: position_weights_uniform,
+                         position_mod_none:    position_weights_none,
+                         position_mod_normal:  position_weights_normal}
+
+def register_position_weights(position_function, weights_function):
+  """Register the function which returns the list of weights of the
+     positions of a string for the given position function.
+  """
+
+  position_weights_dict[position_function] = weights_function
+
+# -----------------------------------------------------------------------------
+
+def has_position_weights(position_function):
+  """Check if the weights of the given position function are known.
+  """
+
+  return position_function in position_weights_dict
+
+# -----------------------------------------------------------------------------
+
+def position_weights(position_function, in_str):
+  """Return a list with the (not necessarily normalised) probability of
+     each position of the given string to be selected by the given position
+     function (a list with one weight for an empty string, as position
+     functions return 0 for it).
+  """
+
+  if (position_function not in position_weights_dict):
+    raise Exception('No position weights registered for position ' + \
+                    'function: %s' % (str(position_function)))
+
+  return position_weights_dict[position_function](in_str)
@@ -0,0 +1,54 @@
+# Import necessary modules
+import hashlib
+import random
+
+# =============================================================================
+# Keyed random number streams. Rather than drawing all random numbers from the
+# single global stream of the 'random' module (where the numbers drawn for one
+# record depend on all draws made for the records before it), a separate
+# stream is derived from a seed and a key (such as record identifier,
+# duplicate index and attribute name). Any record can then be corrupted
+# independently, in any order or in parallel, and re-run on its own.
+
+def stream_seed(seed, *key):
+  """Derive a 128 bit integer seed from the given seed and key values by
+     hashing them (with BLAKE2b), so that different keys give unrelated
+     streams and the same key always gives the same stream (independent of
+     Python's string hash randomisation).
+  """
+
+  key_str = '\x1f'.join([str(seed)] + [str(key_val) for key_val in key])
+  digest = hashlib.blake2b(key_str.encode('utf-8'), digest_size=16).digest()
+
+  return int.from_bytes(digest, 'little')
+
+# -----------------------------------------------------------------------------
+
+def keyed_random(seed, *key):
+  """Return a new random number generator (a 'random.Random' instance) whose
+     stream is determined by the given seed and key values only.
+  """
+
+  return random.Random(stream_seed(seed, *key))
+
+# -----------------------------------------------------------------------------
+
+def rng_list(rng, num_values):
+  """Return a list with a random number generator for each of the given
+     number of values to be corrupted in a batch (see 'corrupt_values' of the
+     corruptor base classes): 'rng' is either a list with one generator per
+     value (for example keyed streams), a single generator used for all
+     values in turn, or None for the global 'random' module.
+  """
+
+  if (isinstance(rng, (list, tuple))):
+    if (len(rng) != num_values):
+      raise Exception('Number of random number generators (%d) differs ' % \
+                      (len(rng)) + 'from number of values (%d)' % \
+                      (num_values))
+    return rng
+
+  if (rng == None):
+    rng = random
+
+  return [rng] * num_values
@@ -0,0 +1,289 @@
+# Import necessary modules
+import array
+import collections.abc
+
+# =============================================================================
+
+class DictColumn():
+  """A column of a record table whose values are dictionary encoded: each
+     distinct value is stored once, and each row stores the (integer) code of
+     its value in an array. Suited to columns with few distinct values (such
+     as sex, month names, occupations or places).
+
+     Codes are stored in an array of the smallest integer type that can hold
+     them (one byte per row for up to 256 distinct values).
+  """
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self):
+    """Constructor, create an empty column.
+    """
+
+    self.code_array =       array.array('B')
+    self.value_list =       []  # Distinct values, indexed by code
+    self.value_index_dict = {}  # Keys are values, values their codes
+
+  # ---------------------------------------------------------------------------
+
+  def encode(self, value):
+    """Return the code of the given value, adding it if it is new.
+    """
+
+    code = self.value_index_dict.get(value)
+
+    if (code == None):
+      code = len(self.value_list)
+      self.value_list.append(value)
+      self.value_index_dict[value] = code
+
+      # Use a larger integer type once the codes do not fit anymore
+      #
+      if (code == 256):
+        self.code_array = array.array('H', self.code_array)
+      elif (code == 65536):
+        self.code_array = array.array('I', self.code_array)
+
+    return code
+
+  # ---------------------------------------------------------------------------
+
+  def append(self, value):
+    """Append the given value as a new row.
+    """
+
+    code = self.encode(value)  # Might replace the code array
+
+    self.code_array.append(code)
+
+  # ---------------------------------------------------------------------------
+
+  def get(self, row):
+    """Return the value of the given row.
+    """
+
+    return self.value_list[self.code_array[row]]
+
+  # ---------------------------------------------------------------------------
+
+  def set(self, row, value):
+    """Set the value of the given row.
+    """
+
+    self.code_array[row] = self.encode(value)
+
+  # ---------------------------------------------------------------------------
+
+  def num_distinct_values(self):
+    """Return the number of distinct values stored in this column.
+    """
+
+    return len(self.value_list)
+
+# =============================================================================
+
+class StringColumn():
+  """A column of a record table whose (string) values are stored UTF-8
+     encoded one after the other in a single byte array, with the end
+     position of the value of each row stored in an array. Suited to columns
+     with many distinct values (such as identifiers).
+
+     Values of rows that are set after they have been appended are kept in a
+     dictionary (as records are normally only appended this is rarely used).
+  """
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self):
+    """Constructor, create an empty column.
+    """
+
+    self.data =      bytearray()
+    self.end_array = array.array('I')
+    self.set_value_dict = {}  # Keys are rows, values their (set) values
+
+  # ---------------------------------------------------------------------------
+
+  def append(self, value):
+    """Append the given value as a new row.
+    """
+
+    if (not isinstance(value, str)):
+      raise Exception('Value is not a string: %s (%s)' % \
+                      (str(value), type(value)))
+
+    self.data += value.encode('utf-8')
+
+    if ((len(self.data) > 0xFFFFFFFF) and (self.end_array.typecode == 'I')):
+      self.end_array = array.array('Q', self.end_array)
+
+    self.end_array.append(len(self.data))
+
+  # ---------------------------------------------------------------------------
+
+  def get(self, row):
+    """Return the value of the given row.
+    """
+
+    if (row in self.set_value_dict):
+      return self.set_value_dict[row]
+
+    if (row == 0):
+      start = 0
+    else:
+      start = self.end_array[row-1]
+
+    return self.data[start:self.end_array[row]].decode('utf-8')
+
+  # ---------------------------------------------------------------------------
+
+  def set(self, row, value):
+    """Set the value of the given row.
+    """
+
+    if (not isinstance(value, str)):
+      raise Exception('Value is not a string: %s (%s)' % \
+                      (str(value), type(value)))
+
+    self.set_value_dict[row] = value
+
+# =============================================================================
+
+class RecordTable(collections.abc.MutableMapping):
+  """A table of records stored column by column, which can be used by Crptr
+     in place of a dictionary of records (with record identifiers as keys and
+     lists of attribute values as values) while using a fraction of the
+     memory.
+
+     Each record is stored in a row with an integer row number, a dictionary
+     maps record identifiers to row numbers. Records are read and written as
+     lists of attribute values (a new list is created each time a record is
+     read, so modifying it does not modify the table).
+
+     Columns are dictionary encoded (see DictColumn) as long as the number of
+     distinct values in a column is at most 'dict_encode_ratio' times the
+     number of rows, otherwise the column is converted to a string column
+     (see StringColumn). This is checked every time 'check_num_rows' rows
+     have been added, so small tables are dictionary encoded only.
+
+     Deleted records are only removed from the identifier dictionary, their
+     rows remain in the columns.
+  """
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, attribute_name_list, dict_encode_ratio=0.1,
+               check_num_rows=65536):
+    """Constructor, create an empty table with the given attributes.
+    """
+
+    self.attribute_name_list = list(attribute_name_list)
+    self.column_list = [DictColumn() for attr_name in attribute_name_list]
+
+    self.dict_encode_ratio = dict_encode_ratio
+    self.check_num_rows =    check_num_rows
+
+    self.rec_id_row_dict = {}  # Keys are record identifiers, values rows
+    self.num_rows = 0
+
+  # ---------------------------------------------------------------------------
+
+  def __getitem__(self, rec_id):
+    """Return the list of attribute values of the record with the given
+       identifier.
+    """
+
+    row = self.rec_id_row_dict[rec_id]
+
+    return [column.get(row) for column in self.column_list]
+
+  # ---------------------------------------------------------------------------
+
+  def __setitem__(self, rec_id, rec_list):
+    """Set the attribute values of the record with the given identifier to
+       the given list, adding the record if it is new.
+    """
+
+    if (len(rec_list) != len(self.column_list)):
+      raise Exception('Record "%s" has %d values but the table has %d ' % \
+                      (rec_id, len(rec_list), len(self.column_list)) + \
+                      'attributes')
+
+    row = self.rec_id_row_dict.get(rec_id)
+
+    if (row != None):
+      for (column, value) in zip(self.column_list, rec_list):
+        column.set(row, value)
+
+    else:
+      for (column, value) in zip(self.column_list, rec_list):
+        column.append(value)
+
+      self.rec_id_row_dict[rec_id] = self.num_rows
+      self.num_rows += 1
+
+      if ((self.num_rows % self.check_num_rows) == 0):
+        self.check_encodings()
+
+  # ---------------------------------------------------------------------------
+
+  def __delitem__(self, rec_id):
+    """Delete the record with the given identifier.
+    """
+
+    del self.rec_id_row_dict[rec_id]
+
+  # ---------------------------------------------------------------------------
+
+  def __iter__(self):
+    """Iterate over the identifiers of the records in the table, in the order
+       in which they were added.
+    """
+
+    return iter(self.rec_id_row_dict)
+
+  # ---------------------------------------------------------------------------
+
+  def __len__(self):
+    """Return the number of records in the table.
+    """
+
+    return len(self.rec_id_row_dict)
+
+  # ---------------------------------------------------------------------------
+
+  def __contains__(self, rec_id):
+    """Check if a record with the given identifier is in the table.
+    """
+
+    return rec_id in self.rec_id_row_dict
+
+  # ---------------------------------------------------------------------------
+
+  def check_encodings(self):
+    """Convert dictionary encoded columns with too many distinct values into
+       string columns.
+    """
+
+    max_num_values = self.dict_encode_ratio * self.num_rows
+
+    for (i, column) in enumerate(self.column_list):
+      if (isinstance(column, DictColumn) and \
+          (column.num_distinct_values() > max_num_values)):
+        string_column = StringColumn()
+        for row in range(self.num_rows):
+          string_column.append(column.get(row))
+        self.column_list[i] = string_column
+
+  # ---------------------------------------------------------------------------
+
+  def remove_column(self, attr_name):
+    """Remove the column of the given attribute from the table.
+    """
+
+    attr_index = self.attribute_name_list.index(attr_name)
+
+    del self.attribute_name_list[attr_index]
+    del self.column_list[attr_index]
+
+# =============================================================================
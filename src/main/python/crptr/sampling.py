@@ -0,0 +1,139 @@
+# Import necessary modules
+import math
+import random
+
+import crptr.base_functions as base_functions
+
+# =============================================================================
+
+class AliasTable():
+  """Alias table (Walker's alias method, with Vose's construction) to sample
+     items from a discrete probability distribution in constant time, using a
+     single uniform random number per sample.
+
+     The table is built from a list of (probability, item) pairs. Items with a
+     probability of 0.0 are dropped, so they can never be sampled. The
+     probabilities are normalised, so they do not need to sum to 1.0 exactly.
+
+     The table is a plain object, it can therefore be pickled (for example to
+     be used in worker processes).
+  """
+
+  # ---------------------------------------------------------------------------
+
+  def __init__(self, prob_item_list):
+    """Constructor, build the alias table from the given list of
+       (probability, item) pairs.
+    """
+
+    base_functions.check_is_list('prob_item_list', prob_item_list)
+
+    self.item_list = []  # The items with a probability larger than 0.0
+    weight_list = []
+
+    for (item_prob, item) in prob_item_list:
+      if (item_prob < 0.0):
+        raise Exception('Negative probability given for item: %s' % \
+                        (str(item)))
+      if (item_prob > 0.0):
+        self.item_list.append(item)
+        weight_list.append(item_prob)
+
+    self.num_items = len(self.item_list)
+
+    if (self.num_items == 0):
+      raise Exception('No item with a probability larger than 0.0 given')
+
+    # Scale the probabilities so their average is 1.0
+    #
+    weight_sum = sum(weight_list)
+    scaled_list = [w * self.num_items / weight_sum for w in weight_list]
+
+    # Probability to keep the item in a slot (otherwise take its alias)
+    #
+    self.prob_list =  [1.0] * self.num_items
+    self.alias_list = list(range(self.num_items))
+
+    small_list = [i for i in range(self.num_items) if scaled_list[i] < 1.0]
+    large_list = [i for i in range(self.num_items) if scaled_list[i] >= 1.0]
+
+    while ((small_list != []) and (large_list != [])):
+      small_i = small_list.pop()
+      large_i = large_list.pop()
+
+      self.prob_list[small_i] =  scaled_list[small_i]
+      self.alias_list[small_i] = large_i
+
+      # The large item gives away the probability mass the small slot lacks
+      #
+      scaled_list[large_i] = (scaled_list[large_i] + scaled_list[small_i]) - 1.0
+
+      if (scaled_list[large_i] < 1.0):
+        small_list.append(large_i)
+      else:
+        large_list.append(large_i)
+
+    # Remaining slots (left over due to rounding errors) keep their item
+    #
+    for i in small_list + large_list:
+      self.prob_list[i] = 1.0
+
+  # ---------------------------------------------------------------------------
+
+  def sample_index(self, rng=random):
+    """Return the index (into 'item_list') of a randomly sampled item, using
+       one random number drawn from the given random number generator.
+    """
+
+    u = rng.random() * self.num_items
+    slot = int(u)
+    if (slot == self.num_items):  # Possible due to rounding only
+      slot -= 1
+
+    if ((u - slot) < self.prob_list[slot]):
+      return slot
+    else:
+      return self.alias_list[slot]
+
+  # ---------------------------------------------------------------------------
+
+  def sample(self, rng=random):
+    """Return a randomly sampled item, using one random number drawn from the
+       given random number generator.
+    """
+
+    return self.item_list[self.sample_index(rng)]
+
+# =============================================================================
+
+def weighted_order(prob_item_list, rng=random):
+  """Return the items of the given list of (probability, item) pairs in a
+     random order, as sampled one after the other without replacement with
+     the probabilities as weights: the first item is a given item with its
+     probability (normalised), the second is drawn the same way from the
+     remaining items, and so on. The first k items of the order are therefore
+     a weighted sample of k distinct items. Items with a probability of 0.0
+     are dropped.
+
+     This uses the method of Efraimidis and Spirakis, which gives each item
+     the key u ** (1/p) for a uniform random number u and its probability p,
+     and orders the items by decreasing key (one random number is drawn from
+     the given random number generator per item). The logarithm of the key,
+     log(u) / p, is used, so small probabilities do not underflow.
+  """
+
+  key_item_list = []
+
+  for (item_prob, item) in prob_item_list:
+    if (item_prob < 0.0):
+      raise Exception('Negative probability given for item: %s' % \
+                      (str(item)))
+    if (item_prob > 0.0):
+      u = 1.0 - rng.random()  # In (0, 1], so the logarithm is defined
+      key_item_list.append((math.log(u) / item_prob, item))
+
+  key_item_list.sort(key=lambda key_item: key_item[0], reverse=True)
+
+  return [item for (key, item) in key_item_list]
+
+# =============================================================================
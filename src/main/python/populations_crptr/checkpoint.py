@@ -0,0 +1,202 @@
+#!/usr/bin/python
+#
+# Checkpoints of an example population corruptor run, so that a run which is
+# interrupted can be resumed (see --resume of population_corruptor.py) and
+# gives the same output as a run that was not interrupted.
+#
+# The state is kept in a JSON file in the output directory of the run: the
+# files already corrupted and, for the file being corrupted, the seed used,
+# the number of shards of records done (see Crptr.corrupt_records) and the
+# sizes of the output files written so far. As the random numbers used for a
+# record only depend on the seed and the record identifier, a resumed run
+# plans the duplicates again, skips the shards done and cuts the output files
+# back to their sizes at the checkpoint.
+
+import csv
+import json
+import os
+import time
+
+STATE_FILE = "checkpoint.json"
+
+class Checkpoint:
+    # State of a checkpointed run, see above
+
+    def __init__(self, outputDir, state):
+        self.stateFile = os.path.join(outputDir, STATE_FILE)
+        self.state = state
+
+    @staticmethod
+    def create(outputDir, inputDir, logFile, config, interval):
+        checkpoint = Checkpoint(outputDir, {'inputDir': inputDir, 'logFile': logFile, 'config': config,
+                                            'interval': interval, 'filesDone': [], 'current': None})
+        checkpoint.save()
+
+        return checkpoint
+
+    @staticmethod
+    def load(outputDir):
+        with open(os.path.join(outputDir, STATE_FILE), 'r', encoding='utf-8') as f:
+            state = json.load(f)
+
+        return Checkpoint(outputDir, state)
+
+    def matchesConfig(self, config):
+        # The configuration is compared as it is stored, i.e. with tuples
+        # turned into lists
+        return self.state['config'] == json.loads(json.dumps(config))
+
+    def save(self):
+        # Written to a temporary file first, so an interruption while saving
+        # leaves the previous state
+        tempFile = self.stateFile + ".tmp"
+
+        with open(tempFile, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(tempFile, self.stateFile)
+
+    def isDone(self, filename):
+        return filename in self.state['filesDone']
+
+    def forFile(self, filename):
+        return FileCheckpoint(self, filename)
+
+
+class FileCheckpoint:
+    # Checkpoints of one file corrupted by runner.runCrptr. The files written
+    # while corrupting are opened through it, and its shardDone method is
+    # passed to Crptr, which calls it after each shard of records. The state
+    # is saved at most every 'interval' seconds of the run
+
+    def __init__(self, checkpoint, filename):
+        self.checkpoint = checkpoint
+        self.filename = filename
+
+        current = checkpoint.state['current']
+        if current is not None and current['file'] == filename:
+            self.resumeState = current
+        else:
+            self.resumeState = None
+
+        self.files = {}
+        self.seed = None
+        self.pending = None
+        self.lastSaveTime = time.monotonic()
+
+    def resuming(self):
+        return self.resumeState is not None
+
+    def shardsDone(self):
+        return self.resumeState['shardsDone'] if self.resumeState is not None else 0
+
+    def open(self, key, path, **kwargs):
+        # Opens a file written while corrupting, when resuming cut back to the
+        # size it had at the checkpoint
+        if self.resumeState is not None:
+            os.truncate(path, self.resumeState['sizes'][key])
+            f = open(path, 'a', **kwargs)
+        else:
+            f = open(path, 'w', **kwargs)
+
+        self.files[key] = f
+
+        return f
+
+    def cutBack(self):
+        # Drops what a resumed run wrote again while it was set up (such as
+        # the events logged when Crptr is created)
+        for key, f in self.files.items():
+            f.flush()
+            f.truncate(self.resumeState['sizes'][key])
+
+    def openDuplicates(self, outputFile):
+        # Duplicates of the shards done, kept until the output file is
+        # written in one go at the end (when not streaming)
+        return self.open('duplicates', outputFile + ".checkpoint", newline='', encoding='utf-8')
+
+    def openOutput(self, outputFile):
+        # Streamed output, opened before the records flow so that every
+        # checkpoint saved includes its size (see shardDone)
+        return self.open('output', outputFile, newline='', encoding='utf-8')
+
+    def readDuplicates(self):
+        # Yields the (rec-id, record) pairs of the duplicates kept by an
+        # earlier run, before further duplicates are added
+        with open(self.files['duplicates'].name, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.reader(f):
+                yield row[0], row[1:]
+
+    def shardDone(self, numShardsDone, shard, dupRecListList):
+        if 'duplicates' in self.files:
+            csv.writer(self.files['duplicates']).writerows([[dupRecId] + list(dupRec)
+                                                            for dupRecList in dupRecListList
+                                                            for dupRecId, dupRec in dupRecList])
+
+        if time.monotonic() - self.lastSaveTime < self.checkpoint.state['interval']:
+            return
+
+        sizes = self.sizes()
+
+        if 'output' in self.files:
+            # Streamed output, the last records of the shard can still be on
+            # their way to the output file (see beforeRecord)
+            self.pending = (numShardsDone, recordIndex(shard[-1][0]), sizes)
+        else:
+            self.save(numShardsDone, sizes)
+
+    def beforeRecord(self, recId):
+        # Called for each streamed record before it is written (possibly in
+        # another thread than shardDone, see pipeline.runPipeline), the
+        # pending checkpoint is saved once the records of the next shard
+        # arrive
+        pending = self.pending
+
+        if pending is not None and recordIndex(recId) > pending[1]:
+            numShardsDone, lastIndex, sizes = pending
+            self.pending = None
+
+            self.files['output'].flush()
+            sizes['output'] = self.files['output'].tell()
+
+            self.save(numShardsDone, sizes)
+
+    def sizes(self):
+        # Sizes of the files written with the events and duplicates, the size
+        # of streamed output is taken by beforeRecord
+        sizes = {}
+
+        for key, f in self.files.items():
+            if key != 'output':
+                f.flush()
+                sizes[key] = f.tell()
+
+        return sizes
+
+    def save(self, numShardsDone, sizes):
+        self.checkpoint.state['current'] = {'file': self.filename, 'seed': self.seed,
+                                            'shardsDone': numShardsDone, 'sizes': sizes}
+        self.checkpoint.save()
+        self.lastSaveTime = time.monotonic()
+
+    def done(self):
+        self.close()
+
+        if 'duplicates' in self.files:
+            os.remove(self.files['duplicates'].name)
+
+        self.checkpoint.state['filesDone'].append(self.filename)
+        self.checkpoint.state['current'] = None
+        self.checkpoint.save()
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+
+def recordIndex(recId):
+    # Index of the original record of a record identifier such as rec-12-org
+    # or rec-12-dup-0
+    return int(recId.split('-')[1])
@@ -18,4 +18,17 @@ class Config:
     PURPOSE = "default"
     LOOKUP_FILES_DIR = "src/main/resources/lookup-files"
     DETERMINISTIC = False
-    SEED = None
\ No newline at end of file
+    SEED = None
+    STREAMING = False
+    NUM_WORKERS = None
+    LOG_LEVEL = "full"
+    LOG_FORMAT = "text"
+    MANIFEST_FORMAT = "jsonl"
+    CORRUPTION_MODE = "interleaved"
+    FILTER_CORRUPTORS = False
+    ATTR_SAMPLING = "with_replacement"
+    PIPELINE_THREADS = False
+    CANDIDATE_CACHE_SIZE = None
+    PHONETIC_VARIANT_TABLE = None
+    KEYBOARD_LAYOUT = None
+    CHECKPOINT_INTERVAL = None
@@ -0,0 +1,178 @@
+#!/usr/bin/python
+#
+# Dry-run estimator for the example population corruptor. Rather than
+# corrupting a whole file, it corrupts random samples of its rows, times each
+# selected corruptor on the sampled values, and extrapolates the wall time,
+# peak memory and output size of corrupting the full file.
+
+import concurrent.futures
+import contextlib
+import csv
+import io
+import os
+import random
+import resource
+import tempfile
+import time
+
+from crptr.plan import RECORD_ATTR_NAME
+from populations_crptr import utils
+
+def writeSample(inputFile, sampleFile, sampleSize, seed = 0):
+    # Writes a uniform random sample (reservoir sampling, so the file is read
+    # once) of sampleSize rows of the input file, in the original row order
+    rng = random.Random(seed)
+    sample = []
+
+    with open(inputFile, 'r', newline='', encoding='utf-8') as f:
+        dataset = csv.reader(f)
+        header = next(dataset)
+
+        for count, row in enumerate(dataset):
+            if count < sampleSize:
+                sample.append((count, row))
+            else:
+                i = rng.randrange(count + 1)
+                if i < sampleSize:
+                    sample[i] = (count, row)
+
+    sample.sort(key=lambda pair: pair[0])
+
+    with open(sampleFile, 'w', newline='', encoding='utf-8') as f:
+        outputWriter = csv.writer(f)
+        outputWriter.writerow(header)
+        outputWriter.writerows([row for count, row in sample])
+
+    return len(sample)
+
+def runSample(sampleFile, outputDir, corruptorFn, corruptorArgs, options):
+    # Corrupts the sample file, returning the wall time, the peak RSS and the
+    # RSS before corrupting (both in bytes), the output size and the Crptr
+    # instance. Run in a process of its own (see measureSample), so the peak
+    # RSS is that of this run only
+    outputFile = os.path.join(outputDir, 'records.csv')
+    logFile = os.path.join(outputDir, 'log.txt')
+
+    baseMemory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    startTime = time.perf_counter()
+
+    # The corruptor definitions print while they are set up
+    with contextlib.redirect_stdout(io.StringIO()):
+        crptrInstance = corruptorFn(sampleFile, outputFile, logFile, *corruptorArgs, **options)
+
+    wallTime = time.perf_counter() - startTime
+    peakMemory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    outputSize = 0
+    for name in os.listdir(outputDir):
+        if name != os.path.basename(logFile):
+            outputSize += os.path.getsize(os.path.join(outputDir, name))
+
+    return wallTime, peakMemory, baseMemory, outputSize, crptrInstance
+
+def measureSample(sampleFile, outputDir, corruptorFn, corruptorArgs, options):
+    with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(runSample, sampleFile, outputDir, corruptorFn, corruptorArgs, options).result()
+
+def timeCorruptors(crptrInstance, sampleFile, seed = 0):
+    # Times each selected corruptor on the sampled values of the attributes it
+    # is selected for, returns (attribute, corruptor name, probability to be
+    # used for a modification, seconds per value) tuples
+    records = [r for recId, r in utils.readRecordStream(sampleFile)]
+    rng = random.Random(seed)
+
+    timings = []
+
+    for attribute, attributeProbability in crptrInstance.attr_mod_prob_dict.items():
+        if attributeProbability <= 0.0 or attribute not in crptrInstance.attribute_name_list:
+            continue
+
+        if attribute == RECORD_ATTR_NAME:
+            values = [r[:] for r in records]
+        else:
+            index = crptrInstance.attribute_name_list.index(attribute)
+            values = [r[index] for r in records]
+
+        for corruptorProbability, corruptor in crptrInstance.attr_mod_data_dict[attribute]:
+            if corruptorProbability <= 0.0:
+                continue
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                startTime = time.perf_counter()
+                corruptor.corrupt_values(values, rng)
+                seconds = (time.perf_counter() - startTime) / len(values)
+
+            timings.append((attribute, corruptor.name, attributeProbability * corruptorProbability, seconds))
+
+    return timings
+
+def fitLine(x1, y1, x2, y2):
+    # Fixed and per-unit cost of a measure taken at two sizes (the per-unit
+    # cost is not allowed to become negative due to measuring noise)
+    perUnit = max(0.0, (y2 - y1) / float(x2 - x1)) if x2 != x1 else y2 / float(x2)
+    fixed = max(0.0, y2 - perUnit * x2)
+
+    return fixed, perUnit
+
+def estimateFile(inputFile, corruptorFn, corruptorArgs, sampleSize = 2000, numWorkers = None, options = {}):
+    # Returns a dictionary with the estimates for corrupting the given file
+    # with the given corruptor function and arguments (as passed to it after
+    # the input, output and log file)
+    numberOfRecords = utils.countRecords(inputFile)
+    options = dict(options, numWorkers=None, logLevel='off', logFormat='text', streaming=False)
+
+    with tempfile.TemporaryDirectory() as tempDir:
+        sizes = []
+        measures = []
+
+        # Measure at two sample sizes to separate fixed costs (such as loading
+        # lookup files) from costs per record (not too far apart, as slow but
+        # rarely used corruptors make the time of small samples vary a lot)
+        for size in [max(1, sampleSize // 2), sampleSize]:
+            sampleFile = os.path.join(tempDir, 'sample.csv')
+            size = writeSample(inputFile, sampleFile, min(size, numberOfRecords))
+            outputDir = tempfile.mkdtemp(dir=tempDir)
+            sizes.append(size)
+            measures.append(measureSample(sampleFile, outputDir, corruptorFn, corruptorArgs, options))
+
+        crptrInstance = measures[-1][4]
+        timings = timeCorruptors(crptrInstance, sampleFile)
+
+    estimate = {'records': numberOfRecords, 'sampled': sizes[-1], 'workers': numWorkers or 1,
+                'timings': timings}
+
+    for key, measureIndex in [('wallTime', 0), ('peakMemory', 1), ('outputSize', 3)]:
+        fixed, perRecord = fitLine(sizes[0], measures[0][measureIndex], sizes[1], measures[1][measureIndex])
+        estimate[key] = fixed + perRecord * numberOfRecords
+
+    # Time spent in the corruptors, which is what worker processes share: the
+    # expected time of one modification times the modifications made
+    secondsPerModification = sum([probability * seconds for attribute, name, probability, seconds in timings])
+    totalProbability = sum([probability for attribute, name, probability, seconds in timings])
+    if totalProbability > 0.0:
+        secondsPerModification /= totalProbability
+
+    numberToModify = int(numberOfRecords * crptrInstance.number_of_mod_records / float(sizes[-1]))
+    corruptionTime = min(estimate['wallTime'],
+                         numberToModify * crptrInstance.num_mod_per_rec * secondsPerModification)
+    estimate['corruptionTime'] = corruptionTime
+
+    # Each worker process needs the memory of a process before it corrupts
+    # (interpreter and modules) in addition to its records
+    baseMemory = measures[-1][2]
+
+    if numWorkers is not None and numWorkers > 1:
+        estimate['wallTime'] -= corruptionTime * (1.0 - 1.0 / numWorkers)
+        estimate['peakMemory'] += numWorkers * baseMemory
+
+    return estimate
+
+def printEstimate(inputFile, estimate):
+    print(f"Dry run for {inputFile}: {estimate['records']} records (sampled {estimate['sampled']})")
+    print("  Corruptor timings (mean per value):")
+    for attribute, name, probability, seconds in estimate['timings']:
+        print(f"    {attribute:30.30} {name:30.30} {seconds * 1e6:10.1f} us  (p={probability:.3f})")
+    print(f"  Estimated for {estimate['records']} records with {estimate['workers']} worker(s):")
+    print(f"    Wall time:       {estimate['wallTime']:10.1f} s (of which corruptors {estimate['corruptionTime']:.1f} s)")
+    print(f"    Peak memory:     {estimate['peakMemory'] / 1e6:10.1f} MB")
+    print(f"    Output size:     {estimate['outputSize'] / 1e6:10.1f} MB")
@@ -5,33 +5,18 @@
 # This script reads in files in the format created by Tom Dalton
 # ValiPop outputs population records in this form when config includes: output_record_format = TD
 
-from crptr.crptr import Crptr
 from populations_crptr.corruptor_definitions.birth_corruptor_td import BirthCorruptorTD
 from populations_crptr.corruptor_definitions.death_corruptor_td import DeathCorruptorTD
 from populations_crptr.corruptor_definitions.marriage_corruptor_td import MarriageCorruptorTD
+from populations_crptr import runner
 from populations_crptr import utils
-import csv
-import sys
 
 def birthCorruptor(inputFile, outputFile, logFile, lookupFilesDir, deterministic, seed, proportionOfRecordsToCorrupt,
-                   maxModificationsPerAttribute, numberOfModificationsPerRecord, recordLevelProportion):
-    # Set stdout to logfile
-    so = sys.stdout
-    logOutput = open(logFile, 'w')
-    sys.stdout = logOutput
-
-    dataset = list(csv.DictReader(open(inputFile)))
-
-    # add crptr ids
-    dataset = utils.addCryptIDs(dataset)
-
-    dataset = utils.convertFromListOfDictsToDictOfLists(dataset)
-    labels = utils.extractLabels(dataset)
+                   maxModificationsPerAttribute, numberOfModificationsPerRecord, recordLevelProportion, **options):
+    labels = utils.readLabels(inputFile)
 
     corruptor = BirthCorruptorTD(labels, lookupFilesDir)
 
-    utils.setDeterminism(deterministic, seed)
-
     # data corruption
     numberOfCorruptibleAttributes = 14
 
@@ -113,64 +98,19 @@ def birthCorruptor(inputFile, outputFile, logFile, lookupFilesDir, deterministic
 
     }
 
-    numberOfRecords = len(dataset)
-    numberToModify = int(numberOfRecords * proportionOfRecordsToCorrupt)
-    print("Records to be corrupted: " + str(numberToModify))
-
-    crptrInstance = Crptr(number_of_org_records=numberOfRecords,
-                                         number_of_mod_records=numberToModify,
-                                         attribute_name_list=labels,
-                                         max_num_dup_per_rec=1,
-                                         num_dup_dist='uniform',
-                                         max_num_mod_per_attr=maxModificationsPerAttribute,
-                                         num_mod_per_rec=numberOfModificationsPerRecord,
-                                         attr_mod_prob_dict=columnProbabilities,
-                                         attr_mod_data_dict=selectedCorruptors
-                                         )
-
-    records = crptrInstance.corrupt_records(dataset)
-    # end of data corruption
-
-    # remove original versions for corrupter records
-    utils.removeOrigonalRecordsForWhichDuplicateExists(records, labels)
-
-    # remove crptr ids
-    utils.removeCryptIDs(records, labels)
-
-    # Output corrupted data
-    utils.outputDictToCSV(labels, records, outputFile)
-
-    # Reset stdout
-    sys.stdout = so
-    logOutput.close()
+    return runner.runCrptr(inputFile, outputFile, logFile, labels, columnProbabilities, selectedCorruptors,
+                           deterministic, seed, proportionOfRecordsToCorrupt, maxModificationsPerAttribute,
+                           numberOfModificationsPerRecord, **options)
 
 
 
 def deathCorruptor(inputFile, outputFile, logFile, lookupFilesDir, deterministic, seed, proportionOfRecordsToCorrupt,
-                   maxModificationsPerAttribute, numberOfModificationsPerRecord, recordLevelProportion):
-    
-    # Set stdout to logfile
-    so = sys.stdout
-    logOutput = open(logFile, 'w')
-    sys.stdout = logOutput
-
-    # records = Utils.readInFile(inputFile)
-
-    records = list(csv.DictReader(open(inputFile)))
-
-    # handle commas
-    # records = Utils.removeCommas(records)
+                   maxModificationsPerAttribute, numberOfModificationsPerRecord, recordLevelProportion, **options):
 
-    # add crptr ids
-    records = utils.addCryptIDs(records)
-
-    records = utils.convertFromListOfDictsToDictOfLists(records)
-    labels = utils.extractLabels(records)
+    labels = utils.readLabels(inputFile)
 
     corruptor = DeathCorruptorTD(labels, lookupFilesDir)
 
-    utils.setDeterminism(deterministic, seed)
-
     # data corruption
     numberOfCorruptibleAttributes = 19
 
@@ -276,63 +216,18 @@ def deathCorruptor(inputFile, outputFile, logFile, lookupFilesDir, deterministic
 
     }
 
-    numberOfRecords = len(records)
-    numberToModify = int(numberOfRecords * proportionOfRecordsToCorrupt)
-    print("Records to be corrupted: " + str(numberToModify))
-
-    crptrInstance = Crptr(number_of_org_records=numberOfRecords,
-                                         number_of_mod_records=numberToModify,
-                                         attribute_name_list=labels,
-                                         max_num_dup_per_rec=1,
-                                         num_dup_dist='uniform',
-                                         max_num_mod_per_attr=maxModificationsPerAttribute,
-                                         num_mod_per_rec=numberOfModificationsPerRecord,
-                                         attr_mod_prob_dict=columnProbabilities,
-                                         attr_mod_data_dict=selectedCorruptors
-                                         )
-
-    records = crptrInstance.corrupt_records(records)
-    # end of data corruption
-
-    # remove original versions for corrupter records
-    utils.removeOrigonalRecordsForWhichDuplicateExists(records, labels)
-
-    # remove crptr ids
-    utils.removeCryptIDs(records, labels)
-
-    # Output corrupted data
-    utils.outputDictToCSV(labels, records, outputFile)
-
-    # Reset stdout
-    sys.stdout = so
-    logOutput.close()
+    return runner.runCrptr(inputFile, outputFile, logFile, labels, columnProbabilities, selectedCorruptors,
+                           deterministic, seed, proportionOfRecordsToCorrupt, maxModificationsPerAttribute,
+                           numberOfModificationsPerRecord, **options)
 
 
 def marriageCorruptor(inputFile, outputFile, logFile, lookupFilesDir, deterministic, seed, proportionOfRecordsToCorrupt,
-                   maxModificationsPerAttribute, numberOfModificationsPerRecord, recordLevelProportion):
-    
-    # Set stdout to logfile
-    so = sys.stdout
-    logOutput = open(logFile, 'w')
-    sys.stdout = logOutput
-
-    # records = Utils.readInFile(inputFile)
-
-    records = list(csv.DictReader(open(inputFile)))
+                   maxModificationsPerAttribute, numberOfModificationsPerRecord, recordLevelProportion, **options):
 
-    # handle commas
-    # records = Utils.removeCommas(records)
-
-    # add crptr ids
-    records = utils.addCryptIDs(records)
-
-    records = utils.convertFromListOfDictsToDictOfLists(records)
-    labels = utils.extractLabels(records)
+    labels = utils.readLabels(inputFile)
 
     corruptor = MarriageCorruptorTD(labels, lookupFilesDir)
 
-    utils.setDeterminism(deterministic, seed)
-
     # data corruption
     numberOfCorruptibleAttributes = 28
 
@@ -441,34 +336,6 @@ def marriageCorruptor(inputFile, outputFile, logFile, lookupFilesDir, determinis
 
     }
 
-    numberOfRecords = len(records)
-    numberToModify = int(numberOfRecords * proportionOfRecordsToCorrupt)
-    print("Records to be corrupted: " + str(numberToModify))
-
-    crptrInstance = Crptr(number_of_org_records=numberOfRecords,
-                                         number_of_mod_records=numberToModify,
-                                         attribute_name_list=labels,
-                                         max_num_dup_per_rec=1,
-                                         num_dup_dist='uniform',
-                                         max_num_mod_per_attr=maxModificationsPerAttribute,
-                                         num_mod_per_rec=numberOfModificationsPerRecord,
-                                         attr_mod_prob_dict=columnProbabilities,
-                                         attr_mod_data_dict=selectedCorruptors
-                                         )
-
-    records = crptrInstance.corrupt_records(records)
-    # end of data corruption
-
-    # remove original versions for corrupter records
-    utils.removeOrigonalRecordsForWhichDuplicateExists(records, labels)
-
-    # remove crptr ids
-    utils.removeCryptIDs(records, labels)
-
-    # Output corrupted data
-    utils.outputDictToCSV(labels, records, outputFile)
-
-    # Reset stdout
-    sys.stdout = so
-    logOutput.close()
-    
\ No newline at end of file
+    return runner.runCrptr(inputFile, outputFile, logFile, labels, columnProbabilities, selectedCorruptors,
+                           deterministic, seed, proportionOfRecordsToCorrupt, maxModificationsPerAttribute,
+                           numberOfModificationsPerRecord, **options)
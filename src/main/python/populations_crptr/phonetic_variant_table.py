@@ -0,0 +1,86 @@
+#!/usr/bin/python
+#
+# This script writes a phonetic variant table (see CorruptValuePhonetic) for
+# the distinct forenames and surnames of a records directory in TD format, or
+# for the names in a list, so runs that use the table (see
+# PHONETIC_VARIANT_TABLE in config.py) do not check the phonetic rules for
+# these names again.
+
+import argparse
+import csv
+import os
+from populations_crptr.config import Config
+from crptr.corrupt_values.corrupt_value_phonetic import CorruptValuePhonetic
+
+FILES = ["birth_records.csv", "marriage_records.csv", "death_records.csv"]
+
+def main(output_filepath, filepath=None, names_filepath=None):
+    names = set()
+
+    if filepath is not None:
+        if not os.path.isdir(filepath):
+            print(f"Error: {filepath} is not a directory")
+            return
+
+        names.update(read_population_names(filepath))
+
+    if names_filepath is not None:
+        if not os.path.exists(names_filepath):
+            print(f"File not found: {names_filepath}")
+            return
+
+        names.update(read_name_list(names_filepath))
+
+    corruptor = CorruptValuePhonetic(
+        lookup_file_name = Config.LOOKUP_FILES_DIR + '/phonetic-variations.csv',
+        has_header_line = False,
+        unicode_encoding = 'UTF-8'
+    )
+
+    num_names = corruptor.save_variant_table(output_filepath, names)
+
+    print(f"Phonetic variants of {num_names} names written to {output_filepath}")
+
+def read_population_names(input_dir):
+    # The distinct values of the name columns (forenames, surnames and names
+    # of spouses) of the record files in the directory
+    names = set()
+
+    for filename in FILES:
+        input_filepath = f"{input_dir}/{filename}"
+        if not os.path.exists(input_filepath):
+            print(f"Skipping, file not found: {input_filepath}")
+            continue
+
+        with open(input_filepath, 'r', newline='', encoding='utf-8') as f:
+            dataset = csv.reader(f)
+            labels = next(dataset)
+            name_columns = [i for i, label in enumerate(labels) if "name" in label.lower()]
+
+            for row in dataset:
+                for i in name_columns:
+                    if i < len(row):
+                        names.add(row[i])
+
+    return names
+
+def read_name_list(names_filepath):
+    # One name per line
+    with open(names_filepath, 'r', encoding='utf-8') as f:
+        return set(line.rstrip('\r\n') for line in f)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="phonetic_variant_table.py",
+                                     description="Writes the phonetic variants of the names of a directory of "
+                                                 "records in TD format, or of a list of names, to a table.")
+    parser.add_argument("filepath", nargs="?", help="directory containing the record files")
+    parser.add_argument("--names", metavar="NAMES_FILE", default=None,
+                        help="file with further names, one per line")
+    parser.add_argument("--output", metavar="TABLE_FILE", required=True,
+                        help="table file to write (gzip compressed if it ends with .gz)")
+    args = parser.parse_args()
+
+    if args.filepath is None and args.names is None:
+        parser.error("a records directory or --names is required")
+
+    main(args.output, args.filepath, args.names)
@@ -0,0 +1,158 @@
+#!/usr/bin/python
+#
+# Stages of the streamed corruption of a records file. Each stage takes an
+# iterator of items and yields items, so stages can be composed into a
+# pipeline through which the records flow from the reader to the writer one
+# at a time, and memory stays flat however large the file:
+#
+#   readCSV -> assignIds -> planDuplicates -> corruptRecords
+#           -> removeOriginals -> removeIds -> writeCSV
+#
+# With runPipeline(..., threaded=True) every stage runs in a thread of its
+# own, connected to the next stage by a bounded queue, so reading, corrupting
+# (which can itself be spread over worker processes, see numWorkers of
+# corruptRecords) and writing overlap.
+
+import csv
+import queue
+import threading
+
+from populations_crptr import utils
+
+BATCH_SIZE = 1000  # Items passed through a queue at a time
+QUEUE_SIZE = 8     # Batches a queue holds before the stage feeding it waits
+
+def readCSV(inputFile):
+    # Source, yields the rows of a CSV file after its header
+    with open(inputFile, 'r', newline='', encoding='utf-8') as f:
+        dataset = csv.reader(f)
+        next(dataset)
+
+        for row in dataset:
+            yield row
+
+def assignIds(rows):
+    # Yields (rec-id, record) pairs with the crptr ids, as readRecordStream
+    for count, row in enumerate(rows):
+        row.append("original")
+        yield "rec-" + str(count) + "-org", row
+
+def planDuplicates(crptrInstance, dupHisto, seed):
+    # Yields (rec-id, number of duplicates, record) triples
+    def stage(records):
+        return crptrInstance.plan_duplicates_stream(records, dupHisto, seed)
+
+    return stage
+
+def corruptRecords(crptrInstance, dupHisto, numWorkers, seed, startShard = 0, shardDoneFn = None):
+    # Yields each original record followed by its duplicates, the seed must
+    # be the one the records were planned with
+    def stage(triples):
+        return crptrInstance.corrupt_planned_stream(triples, dupHisto, numWorkers, seed, startShard, shardDoneFn)
+
+    return stage
+
+def removeOriginals(records):
+    return utils.removeOrigonalRecordsInStream(records)
+
+def removeIds(labels):
+    # Removes the crptr ids from the records and (when the pipeline is
+    # composed) from the given labels
+    def stage(records):
+        return utils.removeCryptIDsInStream(records, labels)
+
+    return stage
+
+def writeCSV(labels, outputFile):
+    # Sink, writes the records after a header of the given labels
+    def sink(records):
+        utils.outputStreamToCSV(labels, records, outputFile)
+
+    return sink
+
+def runPipeline(source, stages, sink, threaded = False):
+    # Composes the stages, feeds the items of the source through them and
+    # passes the result to the sink, returning what the sink returns. The
+    # stages are composed before any items flow, in the calling thread
+    queues = []
+    items = source
+
+    try:
+        for stage in stages:
+            if threaded:
+                items = QueuedStage(items)
+                queues.append(items)
+
+            items = stage(items)
+
+        if threaded:
+            items = QueuedStage(items)
+            queues.append(items)
+
+        return sink(items)
+    finally:
+        for q in queues:
+            q.stop()
+
+class QueuedStage:
+    # Iterates over the given items in a thread of its own and passes them on
+    # through a bounded queue, in batches to keep the cost per item low. An
+    # exception raised while iterating is raised again in the consumer
+
+    def __init__(self, items, batchSize = BATCH_SIZE, queueSize = QUEUE_SIZE):
+        self.queue = queue.Queue(maxsize=queueSize)
+        self.stopped = threading.Event()
+
+        self.thread = threading.Thread(target=self.produce, args=(items, batchSize), daemon=True)
+        self.thread.start()
+
+    def produce(self, items, batchSize):
+        try:
+            batch = []
+
+            for item in items:
+                batch.append(item)
+
+                if len(batch) == batchSize:
+                    self.put(('items', batch))
+                    batch = []
+
+            self.put(('items', batch))
+            self.put(('end', None))
+        except StoppedError:
+            pass
+        except BaseException as e:
+            try:
+                self.put(('error', e))
+            except StoppedError:
+                pass
+
+    def put(self, message):
+        # Waits for room in the queue, unless the consumer has stopped
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(message, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+        raise StoppedError()
+
+    def __iter__(self):
+        while True:
+            kind, value = self.queue.get()
+
+            if kind == 'items':
+                for item in value:
+                    yield item
+            elif kind == 'end':
+                return
+            else:
+                raise value
+
+    def stop(self):
+        # Lets the producing thread end once the consumer is done (or failed)
+        self.stopped.set()
+
+class StoppedError(Exception):
+    pass
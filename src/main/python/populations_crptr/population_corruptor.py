@@ -7,11 +7,21 @@
 # version of the records.
 
 from datetime import datetime
+import argparse
+import json
 import os
-import sys
 from populations_crptr.config import Config
+from populations_crptr import estimator
+from populations_crptr.checkpoint import Checkpoint
+from crptr.corruptor_stats import format_stats
+
+FILES = ["birth_records.csv", "marriage_records.csv", "death_records.csv"]
+
+def main(filepath, dry_run=False, sample_size=2000, num_workers=None, resume=None):
+    if resume is not None:
+        resume_run(resume)
+        return
 
-def main(filepath):
     # Check input directory exists and is a directory
     if not os.path.exists(filepath):
         print(f"Directory not found: {filepath}")
@@ -21,6 +31,10 @@ def main(filepath):
         print(f"Error: {filepath} is not a directory")
         return
 
+    if dry_run:
+        estimate_files(filepath, sample_size, num_workers)
+        return
+
     print (f"Running crptr for {filepath}")
 
     # Generate output directory
@@ -31,15 +45,46 @@ def main(filepath):
 
     # Generate logfile path
     log_filepath = f"{output_filepath}/{Config.PURPOSE}{timestamp_str}.log"
+
+    checkpoint = None
+    if Config.CHECKPOINT_INTERVAL is not None:
+        checkpoint = Checkpoint.create(output_filepath, filepath, log_filepath, checkpoint_config(),
+                                       Config.CHECKPOINT_INTERVAL)
+
+    corrupt_files(filepath, output_filepath, log_filepath, checkpoint)
+
+def resume_run(output_filepath):
+    # Continues a checkpointed run from its last checkpoint, with the same
+    # configuration
+    if not os.path.exists(os.path.join(output_filepath, "checkpoint.json")):
+        print(f"No checkpoint found in: {output_filepath}")
+        return
+
+    checkpoint = Checkpoint.load(output_filepath)
+
+    if not checkpoint.matchesConfig(checkpoint_config()):
+        print(f"Error: the configuration differs from the one of the run in {output_filepath}")
+        return
+
+    print (f"Resuming crptr for {checkpoint.state['inputDir']}")
+
+    corrupt_files(checkpoint.state['inputDir'], output_filepath, checkpoint.state['logFile'], checkpoint)
+
+def corrupt_files(filepath, output_filepath, log_filepath, checkpoint=None):
+    corruptor_fns = [Config.CORRUPTORS.birthCorruptor, Config.CORRUPTORS.marriageCorruptor,
+                     Config.CORRUPTORS.deathCorruptor]
+
     # Corrupts files
-    files = ["birth_records.csv", "marriage_records.csv", "death_records.csv"]
-    corrupt_file(filepath, output_filepath, files[0], log_filepath, Config.CORRUPTORS.birthCorruptor)
-    corrupt_file(filepath, output_filepath, files[1], log_filepath, Config.CORRUPTORS.marriageCorruptor)
-    corrupt_file(filepath, output_filepath, files[2], log_filepath, Config.CORRUPTORS.deathCorruptor)
+    for filename, corruptor_fn in zip(FILES, corruptor_fns):
+        if checkpoint is not None and checkpoint.isDone(filename):
+            print (f"Skipping, already corrupted: {filepath}/{filename}")
+            continue
+
+        corrupt_file(filepath, output_filepath, filename, log_filepath, corruptor_fn, checkpoint)
 
     print(f"Results output to {output_filepath}")
 
-def corrupt_file(input_dir, output_dir, filename, log_filepath, corruptor_fn):
+def corrupt_file(input_dir, output_dir, filename, log_filepath, corruptor_fn, checkpoint=None):
     start_time = datetime.now()
 
     # Checks input file exists
@@ -50,21 +95,81 @@ def corrupt_file(input_dir, output_dir, filename, log_filepath, corruptor_fn):
 
     print_timestamp(f"Corrupting {input_filepath}...")
 
-    corruptor_fn(
+    file_checkpoint = None
+    if checkpoint is not None:
+        file_checkpoint = checkpoint.forFile(filename)
+        if file_checkpoint.resuming():
+            print(f"Resuming after {file_checkpoint.shardsDone()} shards of records")
+
+    crptr_instance = corruptor_fn(
         input_filepath,
         f"{output_dir}/records/{filename}",
         log_filepath,
-        Config.LOOKUP_FILES_DIR,
-        Config.DETERMINISTIC,
-        Config.SEED,
-        Config.PROFILE.PROPORTION_TO_CORRUPT,
-        Config.PROFILE.MAX_MODIFICATIONS_PER_ATTR,
-        Config.PROFILE.MODIFICATIONS_PER_RECORD,
-        Config.PROFILE.RECORD_LEVEL_PROPORTION
+        *corruptor_args(),
+        checkpoint=file_checkpoint,
+        **corruptor_options()
     )
 
     print_time_elapsed(start_time)
 
+    # Dump the corruptor statistics, so slow or ineffective corruptors show
+    stats = crptr_instance.stats()
+    stats_filepath = f"{output_dir}/{os.path.splitext(filename)[0]}_stats.json"
+    with open(stats_filepath, 'w', encoding='utf-8') as f:
+        json.dump(stats, f, indent=2)
+
+    print(format_stats(stats), end="")
+
+def corruptor_args():
+    # Arguments of the corruptor functions after the input, output and log file
+    return (Config.LOOKUP_FILES_DIR,
+            Config.DETERMINISTIC,
+            Config.SEED,
+            Config.PROFILE.PROPORTION_TO_CORRUPT,
+            Config.PROFILE.MAX_MODIFICATIONS_PER_ATTR,
+            Config.PROFILE.MODIFICATIONS_PER_RECORD,
+            Config.PROFILE.RECORD_LEVEL_PROPORTION)
+
+def corruptor_options():
+    return dict(streaming=Config.STREAMING,
+                numWorkers=Config.NUM_WORKERS,
+                logLevel=Config.LOG_LEVEL,
+                logFormat=Config.LOG_FORMAT,
+                manifestFormat=Config.MANIFEST_FORMAT,
+                corruptionMode=Config.CORRUPTION_MODE,
+                filterCorruptors=Config.FILTER_CORRUPTORS,
+                attrSampling=Config.ATTR_SAMPLING,
+                pipelineThreads=Config.PIPELINE_THREADS,
+                candidateCacheSize=Config.CANDIDATE_CACHE_SIZE,
+                phoneticVariantTable=Config.PHONETIC_VARIANT_TABLE,
+                keyboardLayout=Config.KEYBOARD_LAYOUT)
+
+def checkpoint_config():
+    # Configuration a checkpointed run is resumed with, which must not change
+    return dict(corruptors=Config.CORRUPTORS.__name__,
+                profile=Config.PROFILE.__name__,
+                args=corruptor_args(),
+                options=corruptor_options())
+
+def estimate_files(input_dir, sample_size, num_workers):
+    # Dry run, estimates the cost of corrupting each file from samples of it
+    # rather than corrupting it
+    if num_workers is None:
+        num_workers = Config.NUM_WORKERS
+
+    corruptor_fns = [Config.CORRUPTORS.birthCorruptor, Config.CORRUPTORS.marriageCorruptor,
+                     Config.CORRUPTORS.deathCorruptor]
+
+    for filename, corruptor_fn in zip(FILES, corruptor_fns):
+        input_filepath = f"{input_dir}/{filename}"
+        if not os.path.exists(input_filepath):
+            print (f"Skipping, file not found: {input_filepath}")
+            continue
+
+        estimate = estimator.estimateFile(input_filepath, corruptor_fn, corruptor_args(), sample_size,
+                                          num_workers, corruptor_options())
+        estimator.printEstimate(input_filepath, estimate)
+
 def print_timestamp(string):
     now = datetime.now()
     print(f"{now.strftime('%Y/%m/%d %H-%M-%S')}.{now.microsecond // 1000:03d} :: ", end="")
@@ -80,7 +185,20 @@ def print_time_elapsed(start_time):
     print(f"Elapsed time: {int(hours):02}-{int(minutes):02}-{int(seconds):02}-{milliseconds:03}")
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python population_corruptor.py <filepath>")
-    else:
-        main(sys.argv[1])
\ No newline at end of file
+    parser = argparse.ArgumentParser(prog="population_corruptor.py",
+                                     description="Corrupts a directory of records in TD format.")
+    parser.add_argument("filepath", nargs="?", help="directory containing the record files")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="estimate wall time, peak memory and output size from samples instead of corrupting")
+    parser.add_argument("--sample-size", type=int, default=2000,
+                        help="number of rows sampled per file in a dry run (default 2000)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="number of worker processes to estimate for (default NUM_WORKERS of the config)")
+    parser.add_argument("--resume", metavar="OUTPUT_DIR", default=None,
+                        help="continue the checkpointed run in the given results directory from its last checkpoint")
+    args = parser.parse_args()
+
+    if args.filepath is None and args.resume is None:
+        parser.error("the following arguments are required: filepath")
+
+    main(args.filepath, args.dry_run, args.sample_size, args.workers, args.resume)
\ No newline at end of file
@@ -0,0 +1,212 @@
+#!/usr/bin/python
+#
+# Shared driver for the example corruptors. The example corruptors define the
+# column probabilities and corruptor groupings for a record type, this module
+# reads the records, runs Crptr over them and writes out the corrupted records.
+
+from crptr.candidate_cache import CandidateCache
+from crptr.corrupt_values.corrupt_value_keyboard import CorruptValueKeyboard
+from crptr.corrupt_values.corrupt_value_phonetic import CorruptValuePhonetic
+from crptr.crptr import Crptr
+from crptr.event_log import EventLog
+from crptr.manifest import Manifest
+from populations_crptr import pipeline
+from populations_crptr import utils
+import csv
+import os
+import random
+import sys
+
+def runCrptr(inputFile, outputFile, logFile, labels, columnProbabilities, selectedCorruptors, deterministic, seed,
+             proportionOfRecordsToCorrupt, maxModificationsPerAttribute, numberOfModificationsPerRecord,
+             streaming=False, numWorkers=None, logLevel='full', logFormat='text', manifestFormat=None,
+             corruptionMode='interleaved', filterCorruptors=False, attrSampling='with_replacement',
+             pipelineThreads=False, candidateCacheSize=None, phoneticVariantTable=None, keyboardLayout=None,
+             checkpoint=None):
+    # With a checkpoint (see checkpoint.FileCheckpoint) the files written are
+    # opened through it, and when resuming, cut back to their sizes at the
+    # checkpoint and continued after the shards of records done
+    resuming = checkpoint is not None and checkpoint.resuming()
+
+    # Set stdout to logfile
+    so = sys.stdout
+    logOutput = openOutput(checkpoint, 'log', logFile)
+    sys.stdout = logOutput
+
+    # Text events are written to the logfile, JSONL events to a separate file
+    # next to it
+    eventOutput = None
+    if logFormat == 'jsonl':
+        eventOutput = openOutput(checkpoint, 'events', os.path.splitext(logFile)[0] + '.jsonl', encoding='utf-8')
+
+    # The ground truth manifest is written next to the output file
+    manifestOutput = None
+    if manifestFormat is not None:
+        manifestOutput = openOutput(checkpoint, 'manifest',
+                                    os.path.splitext(outputFile)[0] + '_manifest.' + manifestFormat,
+                                    newline='', encoding='utf-8')
+
+    try:
+        eventLog = EventLog(out_file=eventOutput, level=logLevel, log_format=logFormat)
+
+        manifest = None
+        if manifestOutput is not None:
+            manifest = Manifest(manifestOutput, manifest_format=manifestFormat)
+            # The CSV header was written before the checkpoint
+            manifest.header_written = resuming
+
+        if resuming:
+            usedSeed = checkpoint.resumeState['seed']
+            random.seed(usedSeed)
+        else:
+            usedSeed = utils.setDeterminism(deterministic, seed)
+
+        startShard = 0
+        shardDoneFn = None
+        if checkpoint is not None:
+            checkpoint.seed = usedSeed
+            startShard = checkpoint.shardsDone()
+            shardDoneFn = checkpoint.shardDone
+
+        if streaming:
+            numberOfRecords = utils.countRecords(inputFile)
+        else:
+            # read records with crptr ids into a compact record table
+            records = utils.readRecordTable(inputFile)
+
+            numberOfRecords = len(records)
+
+        numberToModify = int(numberOfRecords * proportionOfRecordsToCorrupt)
+        print("Records to be corrupted: " + str(numberToModify))
+
+        if phoneticVariantTable is not None:
+            useVariantTable(selectedCorruptors, phoneticVariantTable)
+
+        if keyboardLayout is not None:
+            useKeyboardLayout(selectedCorruptors, keyboardLayout)
+
+        if candidateCacheSize is not None:
+            useCandidateCache(selectedCorruptors, CandidateCache(candidateCacheSize))
+
+        crptrInstance = Crptr(number_of_org_records=numberOfRecords,
+                              number_of_mod_records=numberToModify,
+                              attribute_name_list=labels,
+                              max_num_dup_per_rec=1,
+                              num_dup_dist='uniform',
+                              max_num_mod_per_attr=maxModificationsPerAttribute,
+                              num_mod_per_rec=numberOfModificationsPerRecord,
+                              attr_mod_prob_dict=columnProbabilities,
+                              attr_mod_data_dict=selectedCorruptors,
+                              event_log=eventLog,
+                              manifest=manifest,
+                              corruption_mode=corruptionMode,
+                              filter_corruptors=filterCorruptors,
+                              attr_sampling=attrSampling
+                              )
+
+        if resuming:
+            checkpoint.cutBack()
+
+        if streaming:
+            # Crptr keeps using labels while the stream is written, so the
+            # crptr ids are removed from a copy
+            outputLabels = labels[:]
+
+            dupHisto = {}
+            stages = [pipeline.assignIds,
+                      pipeline.planDuplicates(crptrInstance, dupHisto, usedSeed),
+                      pipeline.corruptRecords(crptrInstance, dupHisto, numWorkers, usedSeed, startShard, shardDoneFn),
+                      pipeline.removeOriginals,
+                      pipeline.removeIds(outputLabels)]
+
+            if checkpoint is None:
+                sink = pipeline.writeCSV(outputLabels, outputFile)
+            else:
+                # Opened before any stage runs, so the checkpoint knows the
+                # output is streamed from the first shard on, even when the
+                # stages run in threads of their own
+                csvfile = checkpoint.openOutput(outputFile)
+                sink = lambda records: outputStreamToCSVCheckpointed(outputLabels, records, csvfile, checkpoint)
+
+            pipeline.runPipeline(pipeline.readCSV(inputFile), stages, sink, pipelineThreads)
+        else:
+            if checkpoint is not None:
+                # Duplicates of the shards done by an earlier run are read
+                # back before further ones are added
+                checkpoint.openDuplicates(outputFile)
+                doneDuplicates = list(checkpoint.readDuplicates())
+
+            records = crptrInstance.corrupt_records(records, numWorkers, usedSeed, startShard, shardDoneFn)
+            # end of data corruption
+
+            if checkpoint is not None:
+                for recId, r in doneDuplicates:
+                    records[recId] = r
+
+            # remove original versions for corrupter records
+            utils.removeOrigonalRecordsForWhichDuplicateExists(records, labels)
+
+            # remove crptr ids
+            utils.removeCryptIDs(records, labels)
+
+            # Output corrupted data
+            utils.outputDictToCSV(labels, records, outputFile)
+
+        if checkpoint is not None:
+            checkpoint.done()
+    finally:
+        # Reset stdout
+        sys.stdout = so
+        logOutput.close()
+        if eventOutput is not None:
+            eventOutput.close()
+        if manifestOutput is not None:
+            manifestOutput.close()
+        if checkpoint is not None:
+            checkpoint.close()
+
+    return crptrInstance
+
+def useCandidateCache(selectedCorruptors, cache):
+    # Shares the cache between all the selected corruptors that can use one
+    for corruptorList in selectedCorruptors.values():
+        for prob, corruptor in corruptorList:
+            if getattr(corruptor, 'has_candidates', False):
+                corruptor.set_candidate_cache(cache)
+
+def useVariantTable(selectedCorruptors, tableFile):
+    # Loads the phonetic variant table into the selected phonetic corruptors
+    for corruptorList in selectedCorruptors.values():
+        for prob, corruptor in corruptorList:
+            if isinstance(corruptor, CorruptValuePhonetic) and not corruptor.variant_dict:
+                corruptor.load_variant_table(tableFile)
+
+def useKeyboardLayout(selectedCorruptors, layoutFile):
+    # Loads the keyboard layout into the selected keyboard corruptors that do
+    # not have one yet
+    for corruptorList in selectedCorruptors.values():
+        for prob, corruptor in corruptorList:
+            if isinstance(corruptor, CorruptValueKeyboard) and corruptor.key_option_dict is None:
+                corruptor.load_layout(layoutFile)
+
+def openOutput(checkpoint, key, path, **kwargs):
+    if checkpoint is None:
+        return open(path, 'w', **kwargs)
+
+    return checkpoint.open(key, path, **kwargs)
+
+def outputStreamToCSVCheckpointed(labels, records, csvfile, checkpoint):
+    # As utils.outputStreamToCSV, but writes to the output file opened
+    # through the checkpoint (see FileCheckpoint.openOutput), which continues
+    # the output of an earlier run when resuming, and lets the checkpoint see
+    # each record before it is written
+    with csvfile:
+        outputWriter = csv.writer(csvfile, delimiter=',',
+                                  quotechar='"', quoting=csv.QUOTE_MINIMAL)
+
+        if not checkpoint.resuming():
+            outputWriter.writerow(labels)
+
+        for recId, record in records:
+            checkpoint.beforeRecord(recId)
+            outputWriter.writerow(record)
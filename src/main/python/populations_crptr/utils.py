@@ -2,6 +2,8 @@ import csv
 import random
 import time
 
+from crptr.record_table import RecordTable
+
 def readInFile(inputFile):
     recordsDict = {}
     with open(inputFile, "r") as f:
@@ -21,6 +23,45 @@ def readInFileAsDict(inputFile):
         dataset_file = csv.DictReader(f)
     return list(dataset_file)
 
+def readLabels(inputFile):
+    # Labels of the records as used by Crptr, i.e. the CSV header plus the
+    # crptr-record column added by addCryptIDs
+    with open(inputFile, 'r', newline='', encoding='utf-8') as f:
+        labels = next(csv.reader(f))
+
+    labels.append("crptr-record")
+
+    return labels
+
+def countRecords(inputFile):
+    with open(inputFile, 'r', newline='', encoding='utf-8') as f:
+        count = sum(1 for row in csv.reader(f))
+
+    return count - 1
+
+def readRecordStream(inputFile):
+    # Yields (rec-id, record) pairs in the same form as addCryptIDs and
+    # convertFromListOfDictsToDictOfLists produce, one line at a time
+    with open(inputFile, 'r', newline='', encoding='utf-8') as f:
+        dataset = csv.reader(f)
+        next(dataset)
+
+        count = 0
+        for row in dataset:
+            row.append("original")
+            yield "rec-" + str(count) + "-org", row
+            count += 1
+
+def readRecordTable(inputFile):
+    # Reads all records into a (column-wise, compact) RecordTable, keyed and
+    # laid out as readRecordStream yields them
+    records = RecordTable(readLabels(inputFile))
+
+    for recId, r in readRecordStream(inputFile):
+        records[recId] = r
+
+    return records
+
 def extractLabels(data, idColumnLabel = "rec-id"):
     #print data[idColumnLabel]
     labels = data[idColumnLabel]
@@ -126,14 +167,27 @@ def removeCryptIDs(dataset, labels):
     #     if None in i:
     #         print i
 
-    for r in list(dataset.values()):
-        del r[labels.index('crptr-record')]
+    if isinstance(dataset, RecordTable):
+        dataset.remove_column('crptr-record')
+    else:
+        # new lists rather than deleting in place, as duplicates refer to
+        # the (unmodified) lists of their originals
+        index = labels.index('crptr-record')
+        for recId, r in list(dataset.items()):
+            dataset[recId] = r[:index] + r[index + 1:]
 
     del labels[labels.index('crptr-record')]
 
     return dataset
 
 
+def removeCryptIDsInStream(records, labels):
+    index = labels.index('crptr-record')
+    del labels[index]
+
+    return ((recId, r[:index] + r[index + 1:]) for recId, r in records)
+
+
 def removeCryptIDsInFiles(inputFile, outputFile):
 
     with open(inputFile, 'r', newline='', encoding='utf-8') as f:
@@ -180,6 +234,24 @@ def removeOrigonalRecordsForWhichDuplicateExists(dataset, labels):
 
     return dataset
 
+def removeOrigonalRecordsInStream(records):
+    # Streaming version of removeOrigonalRecordsForWhichDuplicateExists,
+    # expects the duplicates of a record to directly follow the original (as
+    # yielded by Crptr.corrupt_records_stream)
+    held = None
+
+    for r in records:
+        if "dup" in r[0]:
+            held = None
+            yield r
+        else:
+            if held is not None:
+                yield held
+            held = r
+
+    if held is not None:
+        yield held
+
 def removeOrigonalRecordsForWhichDuplicateExistsInFiles(inputFile, outputFile):
 
     with open(inputFile, 'r', newline='', encoding='utf-8') as f:
@@ -226,6 +298,17 @@ def outputDictToCSV(labels, dict, outputFile, encoding = 'utf-8'):
 
 
 
+def outputStreamToCSV(labels, records, outputFile, encoding = 'utf-8'):
+    with open(outputFile, 'w', newline='', encoding=encoding) as csvfile:
+        outputWriter = csv.writer(csvfile, delimiter=',',
+                                quotechar='"', quoting=csv.QUOTE_MINIMAL)
+
+        outputWriter.writerow(labels)
+
+        for rec_id, record in records:
+            outputWriter.writerow(record)
+
+
 def setDeterminism(deterministic, seed = None):
     if deterministic:
         random.seed(seed)
@@ -234,3 +317,5 @@ def setDeterminism(deterministic, seed = None):
         random.seed(seed)
 
     print("Used seed: " + str(seed))
+
+    return seed
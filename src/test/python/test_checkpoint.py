@@ -0,0 +1,124 @@
+#!/usr/bin/python
+#
+# Checks that a checkpointed run of the example population corruptor which is
+# interrupted and resumed gives the same output as a run that was not
+# interrupted. Run from the repository root with
+#
+#   PYTHONPATH=src/main/python python -m unittest discover -s src/test/python
+
+import glob
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from crptr.crptr import Crptr
+from populations_crptr import checkpoint as checkpointModule
+from populations_crptr import population_corruptor
+from populations_crptr import runner
+from populations_crptr.config import Config
+
+RESOURCES_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "main", "resources")
+INPUT_DIR = os.path.join(RESOURCES_DIR, "example-inputs", "TD_300")
+
+SHARD_SIZE = 40
+
+class Interrupted(Exception):
+    pass
+
+class CheckpointResumeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.outputDir = tempfile.mkdtemp()
+        self.savedConfig = dict(vars(Config))
+        self.patches = []
+
+        Config.LOOKUP_FILES_DIR = os.path.join(RESOURCES_DIR, "lookup-files")
+        Config.DETERMINISTIC = True
+        Config.SEED = 42
+        Config.STREAMING = True
+        Config.CHECKPOINT_INTERVAL = 0
+
+        # Small shards, so TD_300 is corrupted in several of them
+        makeShards = Crptr.make_shards
+        self.patch(Crptr, 'make_shards', lambda crptr, recTripleIter, shard_size=SHARD_SIZE:
+                   makeShards(crptr, recTripleIter, SHARD_SIZE))
+
+    def tearDown(self):
+        for obj, name, value in reversed(self.patches):
+            setattr(obj, name, value)
+
+        for name, value in self.savedConfig.items():
+            if not name.startswith('__'):
+                setattr(Config, name, value)
+
+        shutil.rmtree(self.outputDir)
+
+    def patch(self, obj, name, value):
+        self.patches.append((obj, name, getattr(obj, name)))
+        setattr(obj, name, value)
+
+    def runCorruptor(self, purpose):
+        Config.OUTPUT_DIR = self.outputDir
+        Config.PURPOSE = purpose
+        population_corruptor.main(INPUT_DIR)
+
+        return glob.glob(os.path.join(self.outputDir, purpose, "*"))[0]
+
+    def interruptAfterShards(self, numShards):
+        # Interrupts the run once the given number of shards are done, after
+        # their checkpoint was taken
+        shardDone = checkpointModule.FileCheckpoint.shardDone
+        numDone = [0]
+
+        def interruptingShardDone(fileCheckpoint, *args):
+            shardDone(fileCheckpoint, *args)
+            numDone[0] += 1
+            if numDone[0] == numShards:
+                raise Interrupted()
+
+        self.patch(checkpointModule.FileCheckpoint, 'shardDone', interruptingShardDone)
+
+    def readRecords(self, runDir):
+        records = {}
+
+        for path in sorted(glob.glob(os.path.join(runDir, "records", "*.csv"))):
+            with open(path, 'rb') as f:
+                records[os.path.basename(path)] = f.read()
+
+        return records
+
+    def checkResume(self, numShards):
+        expected = self.readRecords(self.runCorruptor("uninterrupted"))
+
+        self.interruptAfterShards(numShards)
+        with self.assertRaises(Interrupted):
+            self.runCorruptor("interrupted")
+        checkpointModule.FileCheckpoint.shardDone = self.patches.pop()[2]
+
+        runDir = glob.glob(os.path.join(self.outputDir, "interrupted", "*"))[0]
+        population_corruptor.main(None, resume=runDir)
+
+        self.assertEqual(expected, self.readRecords(runDir))
+
+    def testStreamedResume(self):
+        self.checkResume(3)
+
+    def testThreadedStreamedResume(self):
+        Config.PIPELINE_THREADS = True
+
+        # The output is only written once the sink starts, which may be after
+        # the first shards are done and checkpointed in the other threads
+        outputStream = runner.outputStreamToCSVCheckpointed
+
+        def lateOutputStream(*args):
+            time.sleep(0.5)
+            return outputStream(*args)
+
+        self.patch(runner, 'outputStreamToCSVCheckpointed', lateOutputStream)
+
+        self.checkResume(3)
+
+if __name__ == "__main__":
+    unittest.main()